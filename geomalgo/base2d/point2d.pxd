@@ -29,19 +29,19 @@ cdef inline bint point2d_equal(CPoint2D* A, CPoint2D* B):
 
 
 cdef void subtract_points2d(CVector2D* AB, const CPoint2D* B,
-                            const CPoint2D* A)
+                            const CPoint2D* A) nogil
 
 cdef void point2d_plus_vector2d(CPoint2D* result, CPoint2D* start,
-                                double factor, CVector2D* vector)
+                                double factor, CVector2D* vector) nogil
 
-cdef inline double is_left(CPoint2D* A, CPoint2D* B, CPoint2D* P):
+cdef inline double is_left(CPoint2D* A, CPoint2D* B, CPoint2D* P) nogil:
     return (B.x - A.x) * (P.y - A.y) \
          - (P.x - A.x) * (B.y - A.y)
 
-cdef inline double point2d_distance(CPoint2D* A, CPoint2D* B):
+cdef inline double point2d_distance(CPoint2D* A, CPoint2D* B) nogil:
     return sqrt(point2d_square_distance(A, B))
 
-cdef inline double point2d_square_distance(CPoint2D* A, CPoint2D* B):
+cdef inline double point2d_square_distance(CPoint2D* A, CPoint2D* B) nogil:
     return (B.x-A.x)**2 + (B.y-A.y)**2
 
 
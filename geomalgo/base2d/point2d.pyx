@@ -27,12 +27,12 @@ cdef void del_point2d(CPoint2D* cpoint2d):
 
 
 cdef void subtract_points2d(CVector2D* AB, const CPoint2D* B,
-                            const CPoint2D * A):
+                            const CPoint2D * A) nogil:
     AB.x = B.x - A.x
     AB.y = B.y - A.y
 
 cdef void point2d_plus_vector2d(CPoint2D* result, CPoint2D* start,
-                                double factor, CVector2D* vector):
+                                double factor, CVector2D* vector) nogil:
     result.x = start.x + factor*vector.x
     result.y = start.y + factor*vector.y
 
@@ -14,7 +14,7 @@ cdef CSegment2D* new_segment2d()
 
 cdef void del_segment2d(CSegment2D* csegment2d)
 
-cdef inline void segment2d_set(CSegment2D* AB, CPoint2D* A, CPoint2D* B):
+cdef inline void segment2d_set(CSegment2D* AB, CPoint2D* A, CPoint2D* B) nogil:
     AB.A = A
     AB.B = B
 
@@ -25,10 +25,13 @@ cdef inline void segment2d_set(CSegment2D* AB, CPoint2D* A, CPoint2D* B):
 
 
 cdef double segment2d_distance_point2d(CSegment2D* AB, CVector2D* u,
-                                       CPoint2D* P)
+                                       CPoint2D* P) nogil
 
 cdef double segment2d_square_distance_point2d(CSegment2D* AB, CVector2D* u,
-                                              CPoint2D* P)
+                                              CPoint2D* P) nogil
+
+cdef double segment2d_project_point2d(CSegment2D* AB, CVector2D* u,
+                                     CPoint2D* P, CPoint2D* Q) nogil
 
 cdef double segment2d_where(CPoint2D* A, CVector2D* AB, CPoint2D* P)
 
@@ -32,12 +32,12 @@ cdef void del_segment2d(CSegment2D* csegment2d):
 
 
 cdef double segment2d_distance_point2d(CSegment2D* AB, CVector2D* u,
-                                       CPoint2D* P):
+                                       CPoint2D* P) nogil:
     return sqrt(segment2d_square_distance_point2d(AB, u, P))
 
 
 cdef double segment2d_square_distance_point2d(CSegment2D* AB, CVector2D* u,
-                                              CPoint2D* P):
+                                              CPoint2D* P) nogil:
     cdef:
         CPoint2D Pb
         CVector2D w
@@ -61,6 +61,33 @@ cdef double segment2d_square_distance_point2d(CSegment2D* AB, CVector2D* u,
     return point2d_square_distance(P, &Pb)
 
 
+cdef double segment2d_project_point2d(CSegment2D* AB, CVector2D* u,
+                                     CPoint2D* P, CPoint2D* Q) nogil:
+    """
+    Set Q to the point of segment AB nearest to P, and return the square
+    distance PQ.
+    """
+    cdef:
+        CVector2D w
+        double c1, c2
+
+    subtract_points2d(&w, P, AB.A)
+
+    c1 = dot_product2d(&w, u)
+    c2 = dot_product2d(u, u)
+
+    if c1 <= 0:
+        Q.x = AB.A.x
+        Q.y = AB.A.y
+    elif c2 <= c1:
+        Q.x = AB.B.x
+        Q.y = AB.B.y
+    else:
+        point2d_plus_vector2d(Q, AB.A, c1 / c2, u)
+
+    return point2d_square_distance(P, Q)
+
+
 cdef double segment2d_where(CPoint2D* A, CVector2D* AB, CPoint2D* P):
     if AB.x != 0.:
         return (P.x - A.x) / AB.x
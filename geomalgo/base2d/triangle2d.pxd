@@ -21,7 +21,7 @@ cdef void del_triangle2d(CTriangle2D* ctri2d)
 
 
 cdef inline void triangle2d_set(CTriangle2D* ABC,
-                                CPoint2D* A, CPoint2D* B, CPoint2D* C):
+                                CPoint2D* A, CPoint2D* B, CPoint2D* C) nogil:
     ABC.A = A
     ABC.B = B
     ABC.C = C
@@ -33,14 +33,19 @@ cdef inline void triangle2d_set(CTriangle2D* ABC,
 
 
 cdef bint triangle2d_includes_point2d(CTriangle2D* ABC, CPoint2D* P,
-                                      double edge_width_square)
+                                      double edge_width_square) nogil
 
 
 cdef int triangle2d_on_edges(CTriangle2D* ABC, CPoint2D* P,
-                             double edge_width_square)
+                             double edge_width_square) nogil
 
 
-cdef inline double triangle2d_signed_area(CTriangle2D* T):
+cdef bint triangle2d_overlaps_box(CTriangle2D* ABC,
+                                  double xmin, double xmax,
+                                  double ymin, double ymax) nogil
+
+
+cdef inline double triangle2d_signed_area(CTriangle2D* T) nogil:
     return 0.5 * is_left(T.A, T.B, T.C)
 
 
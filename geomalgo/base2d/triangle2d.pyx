@@ -9,6 +9,7 @@ from .segment2d cimport (
     CSegment2D, segment2d_square_distance_point2d, segment2d_set
 )
 from .polygon2d cimport CPolygon2D
+from .boundingbox cimport BoundingBox
 
 
 # ============================================================================
@@ -31,7 +32,7 @@ cdef void del_triangle2d(CTriangle2D* ctri2d):
 
 
 cdef bint triangle2d_includes_point2d(CTriangle2D* ABC, CPoint2D* P,
-                                      double edge_width_square):
+                                      double edge_width_square) nogil:
 
     # inclusion.winding.polygon2d_winding_point2d specialized for triangle,
     # just for optimisation.
@@ -70,7 +71,7 @@ cdef bint triangle2d_includes_point2d(CTriangle2D* ABC, CPoint2D* P,
 
 
 cdef int triangle2d_on_edges(CTriangle2D* ABC, CPoint2D* P,
-                             double edge_width_square):
+                             double edge_width_square) nogil:
     """
     Return which triangle edge point P is on (0, 1 or 2), or -1
     """
@@ -96,6 +97,60 @@ cdef int triangle2d_on_edges(CTriangle2D* ABC, CPoint2D* P,
     return -1
 
 
+cdef inline bint edge_separates_box(CPoint2D* P0, CPoint2D* P1, CPoint2D* Q,
+                                    double xc, double yc,
+                                    double hx, double hy) nogil:
+    """
+    Whether the line (P0, P1) separates vertex Q from the box of center
+    (xc, yc) and half sizes (hx, hy).
+    """
+    cdef:
+        # Normal of edge [P0, P1].
+        double nx = P0.y - P1.y
+        double ny = P1.x - P0.x
+        # Projection of the edge (P0 and P1 share it) and of vertex Q.
+        double e = nx*P0.x + ny*P0.y
+        double q = nx*Q.x + ny*Q.y
+        # Projection of the box.
+        double c = nx*xc + ny*yc
+        double r = hx*fabs(nx) + hy*fabs(ny)
+
+    if q >= e:
+        return c + r < e
+    else:
+        return c - r > e
+
+
+cdef bint triangle2d_overlaps_box(CTriangle2D* ABC,
+                                  double xmin, double xmax,
+                                  double ymin, double ymax) nogil:
+    """
+    Whether triangle ABC and the box overlap, using separating axis theorem.
+
+    A triangle touching the box boundary overlaps the box.
+    """
+    cdef:
+        double xc = 0.5*(xmin + xmax)
+        double yc = 0.5*(ymin + ymax)
+        double hx = 0.5*(xmax - xmin)
+        double hy = 0.5*(ymax - ymin)
+
+    # Box axes.
+    if max(ABC.A.x, ABC.B.x, ABC.C.x) < xmin or \
+       min(ABC.A.x, ABC.B.x, ABC.C.x) > xmax or \
+       max(ABC.A.y, ABC.B.y, ABC.C.y) < ymin or \
+       min(ABC.A.y, ABC.B.y, ABC.C.y) > ymax:
+        return False
+
+    # Triangle edge normals.
+    if edge_separates_box(ABC.A, ABC.B, ABC.C, xc, yc, hx, hy) or \
+       edge_separates_box(ABC.B, ABC.C, ABC.A, xc, yc, hx, hy) or \
+       edge_separates_box(ABC.C, ABC.A, ABC.B, xc, yc, hx, hy):
+        return False
+
+    return True
+
+
 cdef void triangle2d_gradx_grady_det(CTriangle2D* tri, double signed_area,
                                      double gradx[3], double grady[3],
                                      double det[3]):
@@ -201,6 +256,10 @@ cdef class Triangle2D:
         return triangle2d_includes_point2d(&self.ctri2d, point.cpoint2d,
                                            edge_width**2)
 
+    def overlaps_box(Triangle2D self, BoundingBox box):
+        return triangle2d_overlaps_box(&self.ctri2d, box.xmin, box.xmax,
+                                       box.ymin, box.ymax)
+
     def interpolate(Triangle2D self, double[:] data, Point2D P):
         cdef:
             double f0, f1, f2
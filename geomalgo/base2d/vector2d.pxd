@@ -39,7 +39,7 @@ cdef inline double cross_product2d(CVector2D *u, CVector2D *v):
     return u.x*v.y - u.y*v.x
 
 
-cdef inline double dot_product2d(CVector2D *u, CVector2D *v):
+cdef inline double dot_product2d(CVector2D *u, CVector2D *v) nogil:
     return u.x*v.x + u.y*v.y
 
 
@@ -1,3 +1,4 @@
 from .grid2d.grid2d cimport (
-    Grid2D, Cell2D, coord_to_index, compute_index
+    Grid2D, Cell2D, coord_to_index, compute_index, compute_morton_index,
+    compute_hilbert_index
 )
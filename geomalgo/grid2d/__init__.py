@@ -1,5 +1,9 @@
-from .grid2d import compute_index, compute_row_col, coord_to_index, Cell2D, Grid2D
+from .grid2d import (
+    compute_index, compute_row_col, coord_to_index, compute_morton_index,
+    compute_hilbert_index, Cell2D, Grid2D,
+)
 
 __all__ = [
-    'compute_index', 'compute_row_col', 'coord_to_index', 'Cell2D', 'Grid2D',
+    'compute_index', 'compute_row_col', 'coord_to_index',
+    'compute_morton_index', 'compute_hilbert_index', 'Cell2D', 'Grid2D',
 ]
@@ -2,15 +2,65 @@ from libc.math cimport floor
 
 from ..base2d cimport CPoint2D
 
-cpdef inline int coord_to_index(val, minval, delta):
+cpdef inline int coord_to_index(double val, double minval,
+                                double delta) nogil:
     """ Point coordinate to box index, in a given coordinate """
     return <int> floor( (val-minval) / delta)
 
 
-cpdef inline int compute_index(int nx, int ix, int iy):
+cpdef inline int compute_index(int nx, int ix, int iy) nogil:
     return iy*nx + ix
 
 
+cpdef inline unsigned long long compute_morton_index(unsigned int ix,
+                                                     unsigned int iy) nogil:
+    """ Interleave bits of ix and iy (Z-order curve) """
+    cdef:
+        unsigned long long x = ix, y = iy
+
+    x = (x | (x << 16)) & 0x0000FFFF0000FFFFULL
+    x = (x | (x << 8))  & 0x00FF00FF00FF00FFULL
+    x = (x | (x << 4))  & 0x0F0F0F0F0F0F0F0FULL
+    x = (x | (x << 2))  & 0x3333333333333333ULL
+    x = (x | (x << 1))  & 0x5555555555555555ULL
+
+    y = (y | (y << 16)) & 0x0000FFFF0000FFFFULL
+    y = (y | (y << 8))  & 0x00FF00FF00FF00FFULL
+    y = (y | (y << 4))  & 0x0F0F0F0F0F0F0F0FULL
+    y = (y | (y << 2))  & 0x3333333333333333ULL
+    y = (y | (y << 1))  & 0x5555555555555555ULL
+
+    return x | (y << 1)
+
+
+cpdef inline unsigned long long compute_hilbert_index(unsigned int n,
+                                                      unsigned int ix,
+                                                      unsigned int iy) nogil:
+    """ Index of cell (ix, iy) along Hilbert curve of a n*n grid, n=2**k """
+    cdef:
+        unsigned int s, rx, ry, tmp
+        unsigned long long d = 0
+
+    s = n // 2
+    while s > 0:
+        rx = (ix & s) > 0
+        ry = (iy & s) > 0
+        d += (<unsigned long long> s) * s * ((3 * rx) ^ ry)
+
+        # Rotate quadrant.
+        if ry == 0:
+            if rx == 1:
+                ix = n-1 - ix
+                iy = n-1 - iy
+            tmp = ix
+            ix = iy
+            iy = tmp
+
+        s //= 2
+
+    return d
+
+
 cdef class Grid2D:
     cdef public:
         double xmin
@@ -27,6 +77,8 @@ cdef class Grid2D:
 
     cdef void c_find_cell(Grid2D self, Cell2D cell, CPoint2D* P)
 
+    cdef void c_find_ix_iy(Grid2D self, CPoint2D* P, int* ix, int* iy) nogil
+
 
 cdef class Cell2D:
     cdef public:
@@ -7,8 +7,9 @@ It supports finding which cell contains a given 2D point.
 
 import numpy as np
 import matplotlib.pyplot as plt
+from cython cimport floating
 
-from ..base2d cimport Point2D
+from ..base2d cimport CPoint2D, Point2D
 
 
 cpdef (int, int) compute_row_col(int index, int nx):
@@ -39,6 +40,13 @@ cdef class Grid2D:
         cell.ix = coord_to_index(P.x, self.xmin, self.dx)
         cell.iy = coord_to_index(P.y, self.ymin, self.dy)
 
+    cdef void c_find_ix_iy(Grid2D self, CPoint2D* P, int* ix, int* iy) nogil:
+        """
+        Same as c_find_cell, but without the GIL and without Cell2D object.
+        """
+        ix[0] = coord_to_index(P.x, self.xmin, self.dx)
+        iy[0] = coord_to_index(P.y, self.ymin, self.dy)
+
     def find_cell(Grid2D self, Point2D P):
         cdef:
             Cell2D cell = Cell2D()
@@ -46,6 +54,53 @@ cdef class Grid2D:
         cell.index = compute_index(self.nx, cell.ix, cell.iy)
         return cell
 
+    def cell_keys(Grid2D self, floating[:] x, floating[:] y,
+                  curve='hilbert'):
+        """
+        Return index along a space filling curve of cells containing points.
+
+        x and y are both float32 or float64 arrays.
+
+        Points out of the grid are given the key of the nearest cell.
+
+        Parameters
+        ----------
+        curve:
+            'hilbert' or 'morton' (Z-order curve).
+        """
+        cdef:
+            int IP, ix, iy
+            int NP = x.shape[0]
+            unsigned int n = 1
+            bint hilbert
+            unsigned long long[:] keys = np.empty(NP, dtype='uint64')
+            CPoint2D P
+
+        if curve == 'hilbert':
+            hilbert = True
+        elif curve == 'morton':
+            hilbert = False
+        else:
+            raise ValueError("curve must be 'hilbert' or 'morton', got: {}"
+                             .format(curve))
+
+        # Hilbert curve is defined on a n*n grid, with n a power of 2.
+        while n < self.nx or n < self.ny:
+            n *= 2
+
+        for IP in range(NP):
+            P.x = x[IP]
+            P.y = y[IP]
+            self.c_find_ix_iy(&P, &ix, &iy)
+            ix = min(max(ix, 0), self.nx-1)
+            iy = min(max(iy, 0), self.ny-1)
+            if hilbert:
+                keys[IP] = compute_hilbert_index(n, ix, iy)
+            else:
+                keys[IP] = compute_morton_index(ix, iy)
+
+        return np.asarray(keys)
+
     def plot(self, color='blue', lw=2):
         # Plot vertical lines.
         for x in self.x:
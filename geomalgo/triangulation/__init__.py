@@ -4,14 +4,24 @@ from .boundary_edges import BoundaryEdges
 from .intern_edges import InternEdges
 from .build_edges import build_edges
 from .locator import (
-    build_triangle_to_cell, build_cell_to_triangle, TriangulationLocator,
+    build_triangle_to_cell, build_cell_to_triangle, patch_cell_to_triangle,
+    TriangulationLocator,
 )
+from .quadtree_locator import TriangulationQuadtreeLocator
 from .interpolator import TriangulationInterpolator
+from .rasterizer import rasterize
+from .cache import save_cache, load_cache, compute_mesh_hash
+from .mesh_io import read_gmsh, read_triangle, read_vtk
+from .shared import save_shared, load_shared
 
 __all__ = [
     'Triangulation2D', 'EdgeToTriangles', 'BoundaryEdges', 'InternEdges',
     'build_edges', 'build_triangle_to_cell', 'build_cell_to_triangle',
-    'TriangulationLocator', 'TriangulationInterpolator',
+    'patch_cell_to_triangle',
+    'TriangulationLocator', 'TriangulationQuadtreeLocator',
+    'TriangulationInterpolator', 'save_cache', 'load_cache',
+    'compute_mesh_hash', 'rasterize', 'read_gmsh', 'read_triangle',
+    'read_vtk', 'save_shared', 'load_shared',
 ]
 
 
@@ -20,11 +30,17 @@ __all__ = [
 # ==============
 
 
+from .triangulation2d import (
+    compute_vertex_adjacency, compute_rcm_order, compute_hilbert_order
+)
+
 from .util import (
     compute_bounding_box, compute_edge_min_max, compute_centers,
-    compute_signed_area, compute_interpolator
+    compute_signed_area, compute_interpolator, compute_neighbours,
+    update_interpolator, compute_moved_triangles, compute_packed_coordinates
 )
 
 from .locator import (
-    choose_edge_width, choose_bb_grid_distance, build_grid, check_grid
+    choose_edge_width, choose_bb_grid_distance, build_grid, check_grid,
+    choose_grid_size, build_boundary_index
 )
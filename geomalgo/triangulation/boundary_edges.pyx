@@ -22,6 +22,11 @@ cdef class BoundaryEdges:
         self.triangle = np.empty(size, dtype='int32')
         self.next_boundary_edge = np.empty(size, dtype='int32')
 
+        # Optional data, see add_label, compute_length and compute_normal.
+        self.label = None
+        self.length = None
+        self.normal = None
+
     def reorder(BoundaryEdges self, int[:,:] vertices):
         """
 
@@ -0,0 +1,409 @@
+"""
+Save and load mesh topology and locator index to a binary cache file.
+
+Building edges, interpolator arrays and the locator index of a large mesh
+takes time, and gives the same result each time for the same mesh. They can
+be saved once to a cache file, then loaded by each process: arrays are
+memory-mapped (copy-on-write) instead of being read, so loading costs almost
+nothing, and processes share the same pages of the file.
+
+File layout:
+
+    +----------------------------------+
+    | MAGIC (8 bytes)                  |
+    | version, header size (2 uint32)  |
+    | header (JSON)                    |
+    +----------------------------------+  <- aligned on ALIGN bytes
+    | array 0                          |
+    +----------------------------------+  <- aligned on ALIGN bytes
+    | array 1                          |
+    | ...                              |
+    +----------------------------------+
+
+The header stores the mesh hash (see compute_mesh_hash), scalar attributes,
+and the dtype, shape and offset of each array.
+
+A cache is loaded only if its version is CACHE_VERSION and its hash is the
+hash of the triangulation, for example:
+
+    filename = os.path.join(cache_dir, compute_mesh_hash(TG) + '.cache')
+    if os.path.exists(filename):
+        cache = load_cache(filename, TG)
+    else:
+        cache = {'edges': build_edges(TG.trivtx, TG.NV),
+                 'locator': TriangulationLocator(TG)}
+        save_cache(filename, TG, **cache)
+
+"""
+
+import hashlib
+import json
+import os
+import struct
+
+import numpy as np
+
+from ..grid2d cimport Grid2D
+from .triangulation2d cimport Triangulation2D
+from .edge_map cimport EdgeMap
+from .intern_edges cimport InternEdges
+from .boundary_edges cimport BoundaryEdges
+from .locator cimport TriangulationLocator
+
+
+MAGIC = b'GEOMALGO'
+
+# Increment when the file layout or the cached data change.
+CACHE_VERSION = 1
+
+ALIGN = 64
+
+
+def compute_mesh_hash(Triangulation2D TG):
+    """
+    Return a hash of triangulation x, y and trivtx, as an hexadecimal string.
+    """
+    h = hashlib.blake2b(digest_size=20)
+    for a in (TG.x, TG.y, TG.trivtx):
+        a = np.ascontiguousarray(a)
+        h.update(str(a.shape).encode())
+        h.update(a.data)
+    return h.hexdigest()
+
+
+def edges_to_arrays(edges):
+    cdef:
+        InternEdges intern_edges
+        BoundaryEdges boundary_edges
+        EdgeMap edge_map
+
+    intern_edges, boundary_edges, edge_map = edges
+
+    attrs = {'NV': edge_map.NV, 'NE': edge_map.NE}
+    arrays = {
+        'edge_map.bounds': edge_map.bounds,
+        'edge_map.edges': edge_map.edges,
+        'edge_map.location': edge_map.location,
+        'edge_map.idx': edge_map.idx,
+        'intern_edges.vertices': intern_edges.vertices,
+        'intern_edges.triangles': intern_edges.triangles,
+        'boundary_edges.vertices': boundary_edges.vertices,
+        'boundary_edges.triangle': boundary_edges.triangle,
+        'boundary_edges.next_boundary_edge':
+            boundary_edges.next_boundary_edge,
+    }
+
+    # Optional boundary edges data.
+    for name in ['label', 'length', 'normal']:
+        a = getattr(boundary_edges, name)
+        if a is not None:
+            arrays['boundary_edges.' + name] = a
+
+    return attrs, arrays
+
+
+def arrays_to_edges(attrs, arrays):
+    cdef:
+        InternEdges intern_edges = InternEdges.__new__(InternEdges)
+        BoundaryEdges boundary_edges = BoundaryEdges.__new__(BoundaryEdges)
+        EdgeMap edge_map = EdgeMap.__new__(EdgeMap)
+
+    edge_map.NV = attrs['NV']
+    edge_map.NE = attrs['NE']
+    edge_map.bounds = arrays['edge_map.bounds']
+    edge_map.edges = arrays['edge_map.edges']
+    edge_map.location = arrays['edge_map.location']
+    edge_map.idx = arrays['edge_map.idx']
+
+    intern_edges.vertices = arrays['intern_edges.vertices']
+    intern_edges.triangles = arrays['intern_edges.triangles']
+    intern_edges.size = intern_edges.vertices.shape[0]
+    intern_edges.edge_map = edge_map
+
+    boundary_edges.vertices = arrays['boundary_edges.vertices']
+    boundary_edges.triangle = arrays['boundary_edges.triangle']
+    boundary_edges.next_boundary_edge = \
+        arrays['boundary_edges.next_boundary_edge']
+    boundary_edges.size = boundary_edges.vertices.shape[0]
+    boundary_edges.edge_map = edge_map
+
+    for name in ['label', 'length', 'normal']:
+        setattr(boundary_edges, name, arrays.get('boundary_edges.' + name))
+
+    return intern_edges, boundary_edges, edge_map
+
+
+def locator_to_arrays(TriangulationLocator locator):
+    if type(locator) is not TriangulationLocator:
+        raise ValueError('Only TriangulationLocator can be cached, got {}'
+                         .format(type(locator).__name__))
+
+    grid = locator.grid
+    attrs = {
+        'grid': [grid.xmin, grid.xmax, grid.nx, grid.ymin, grid.ymax, grid.ny],
+        'edge_width': locator.edge_width,
+        'overlap': bool(locator.overlap),
+        'pruned': locator.pruned,
+        'max_walk': locator.max_walk,
+        'packed': bool(locator.packed),
+        'barycentric': bool(locator.barycentric),
+    }
+    arrays = {
+        'locator.celltri': locator.celltri,
+        'locator.celltri_idx': locator.celltri_idx,
+        'locator.bounds': locator.bounds,
+    }
+    if locator.neighbours is not None:
+        arrays['locator.neighbours'] = locator.neighbours
+    if locator.packed:
+        arrays['locator.tricoords'] = locator.tricoords
+    if locator.boundary_vertices is not None:
+        grid = locator.boundary_grid
+        attrs['boundary_grid'] = [grid.xmin, grid.xmax, grid.nx,
+                                  grid.ymin, grid.ymax, grid.ny]
+        arrays['locator.boundary_vertices'] = locator.boundary_vertices
+        arrays['locator.boundary_triangle'] = locator.boundary_triangle
+        arrays['locator.celledge'] = locator.celledge
+        arrays['locator.celledge_idx'] = locator.celledge_idx
+    # Same names as the interpolator arrays, which are usually the same
+    # arrays, so that they are saved once.
+    if locator.barycentric:
+        arrays['interpolator.gradx'] = locator.gradx
+        arrays['interpolator.grady'] = locator.grady
+        arrays['interpolator.det'] = locator.det
+
+    return attrs, arrays
+
+
+def arrays_to_locator(Triangulation2D TG, attrs, arrays):
+    cdef:
+        TriangulationLocator locator = \
+            TriangulationLocator.__new__(TriangulationLocator)
+
+    locator.TG = TG
+    locator.grid = Grid2D(*attrs['grid'])
+    locator.edge_width = attrs['edge_width']
+    locator.edge_width_square = locator.edge_width**2
+    locator.overlap = attrs['overlap']
+    locator.pruned = attrs['pruned']
+    locator.max_walk = attrs['max_walk']
+    locator.celltri = arrays['locator.celltri']
+    locator.celltri_idx = arrays['locator.celltri_idx']
+    locator.bounds = arrays['locator.bounds']
+    locator.neighbours = arrays.get('locator.neighbours')
+    locator.packed = attrs['packed']
+    locator.tricoords = arrays.get('locator.tricoords')
+    if 'boundary_grid' in attrs:
+        locator.boundary_grid = Grid2D(*attrs['boundary_grid'])
+    else:
+        locator.boundary_grid = None
+    locator.boundary_vertices = arrays.get('locator.boundary_vertices')
+    locator.boundary_triangle = arrays.get('locator.boundary_triangle')
+    locator.celledge = arrays.get('locator.celledge')
+    locator.celledge_idx = arrays.get('locator.celledge_idx')
+    locator.barycentric = attrs['barycentric']
+    locator.gradx = arrays.get('interpolator.gradx')
+    locator.grady = arrays.get('interpolator.grady')
+    locator.det = arrays.get('interpolator.det')
+    locator.collect_stats = False
+    locator.query_stats = None
+
+    return locator
+
+
+def cache_to_arrays(edges=None, interpolator=None, locator=None):
+    """
+    Return attributes and contiguous arrays storing edges, interpolator and
+    locator (see save_cache).
+    """
+    attrs = {}
+    arrays = {}
+
+    if edges is not None:
+        attrs['edges'], a = edges_to_arrays(edges)
+        arrays.update(a)
+
+    if interpolator is not None:
+        gradx, grady, det = interpolator
+        attrs['interpolator'] = {}
+        arrays['interpolator.gradx'] = gradx
+        arrays['interpolator.grady'] = grady
+        arrays['interpolator.det'] = det
+
+    if locator is not None:
+        attrs['locator'], a = locator_to_arrays(locator)
+        for name in a:
+            if name in arrays and not np.array_equal(arrays[name], a[name]):
+                raise ValueError('Locator {} differs from interpolator one'
+                                 .format(name))
+        arrays.update(a)
+
+    arrays = {name: np.ascontiguousarray(a) for name, a in arrays.items()}
+
+    return attrs, arrays
+
+
+def layout_arrays(header, arrays):
+    """
+    Add the description of arrays to header, and encode it.
+
+    Return the encoded header, array description, data start and total
+    size, as written by write_arrays.
+    """
+    # Compute array offsets, relative to the data start.
+    description = {}
+    offset = 0
+    for name, a in arrays.items():
+        description[name] = {'dtype': a.dtype.str, 'shape': list(a.shape),
+                             'offset': offset}
+        offset += -(-a.nbytes // ALIGN) * ALIGN
+
+    header = json.dumps(dict(header, arrays=description)).encode()
+
+    data_start = len(MAGIC) + 8 + len(header)
+    data_start = -(-data_start // ALIGN) * ALIGN
+
+    return header, description, data_start, data_start + offset
+
+
+def write_arrays(buf, header, arrays):
+    """
+    Write header and arrays to buf, a writable uint8 array of the size
+    returned by layout_arrays.
+    """
+    header, description, data_start, size = layout_arrays(header, arrays)
+
+    start = len(MAGIC) + 8
+    buf[:len(MAGIC)] = np.frombuffer(MAGIC, dtype='uint8')
+    buf[len(MAGIC):start] = np.frombuffer(
+        struct.pack('<II', CACHE_VERSION, len(header)), dtype='uint8')
+    buf[start:start+len(header)] = np.frombuffer(header, dtype='uint8')
+    for name, a in arrays.items():
+        start = data_start + description[name]['offset']
+        buf[start:start+a.nbytes] = a.reshape(-1).view('uint8')
+
+
+def save_cache(filename, Triangulation2D TG, edges=None, interpolator=None,
+               locator=None):
+    """
+    Save data computed for triangulation TG to a cache file.
+
+    Parameters
+    ----------
+    edges:
+        Tuple (intern_edges, boundary_edges, edge_map), as returned by
+        build_edges.
+    interpolator:
+        Tuple (gradx, grady, det), as returned by compute_interpolator.
+    locator:
+        A TriangulationLocator. If it is barycentric, its interpolator
+        arrays must be the same as interpolator ones.
+
+    The file is written to a temporary file, then renamed, so processes
+    never load a partially written cache.
+    """
+    attrs, arrays = cache_to_arrays(edges, interpolator, locator)
+    header, description, data_start, size = layout_arrays(
+        {'hash': compute_mesh_hash(TG), 'attrs': attrs}, arrays)
+
+    tmp_filename = '{}.{}.tmp'.format(filename, os.getpid())
+    with open(tmp_filename, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<II', CACHE_VERSION, len(header)))
+        f.write(header)
+        for name, a in arrays.items():
+            f.seek(data_start + description[name]['offset'])
+            f.write(a.data)
+        f.truncate(size)
+    os.replace(tmp_filename, filename)
+
+
+def read_cache_header(filename):
+    """
+    Return cache file version, header, and data start.
+    """
+    with open(filename, 'rb') as f:
+        return read_header(f.read, filename)
+
+
+def read_header(read, source):
+    """
+    Return version, header, and data start, reading bytes with read(size).
+
+    source is the file or shared memory name, for error messages.
+    """
+    magic = read(len(MAGIC))
+    if magic != MAGIC:
+        raise ValueError('{} is not a geomalgo cache file'.format(source))
+    version, header_size = struct.unpack('<II', read(8))
+    if version != CACHE_VERSION:
+        return version, None, None
+    header = json.loads(read(header_size).decode())
+
+    data_start = len(MAGIC) + 8 + header_size
+    data_start = -(-data_start // ALIGN) * ALIGN
+
+    return version, header, data_start
+
+
+def read_arrays(buf, header, data_start):
+    """
+    Return arrays described in header, as views on buf.
+    """
+    arrays = {}
+    for name, d in header['arrays'].items():
+        dtype = np.dtype(d['dtype'])
+        start = data_start + d['offset']
+        size = int(np.prod(d['shape'])) * dtype.itemsize
+        arrays[name] = buf[start:start+size].view(dtype).reshape(d['shape'])
+    return arrays
+
+
+def arrays_to_cache(Triangulation2D TG, attrs, arrays):
+    """
+    Return the dictionary of objects stored in attrs and arrays (see
+    load_cache).
+    """
+    cache = {}
+
+    if 'edges' in attrs:
+        cache['edges'] = arrays_to_edges(attrs['edges'], arrays)
+
+    if 'interpolator' in attrs:
+        cache['interpolator'] = (arrays['interpolator.gradx'],
+                                 arrays['interpolator.grady'],
+                                 arrays['interpolator.det'])
+
+    if 'locator' in attrs:
+        cache['locator'] = arrays_to_locator(TG, attrs['locator'], arrays)
+
+    return cache
+
+
+def load_cache(filename, Triangulation2D TG):
+    """
+    Load data saved by save_cache for triangulation TG.
+
+    Return a dictionary with the keys given to save_cache among 'edges',
+    'interpolator' and 'locator'. Arrays are memory-mapped in copy-on-write
+    mode: they can be modified, but modifications are not written to the
+    file.
+
+    Raise ValueError if the cache was written by another version of
+    geomalgo, or for another triangulation.
+    """
+    version, header, data_start = read_cache_header(filename)
+
+    if version != CACHE_VERSION:
+        raise ValueError('Cache file {} has version {}, expected {}'
+                         .format(filename, version, CACHE_VERSION))
+
+    mesh_hash = compute_mesh_hash(TG)
+    if header['hash'] != mesh_hash:
+        raise ValueError('Cache file {} is for mesh {}, not for mesh {}'
+                         .format(filename, header['hash'], mesh_hash))
+
+    buf = np.memmap(filename, dtype='uint8', mode='c')
+    arrays = read_arrays(buf, header, data_start)
+
+    return arrays_to_cache(TG, header['attrs'], arrays)
@@ -1,3 +1,5 @@
+from cython cimport floating
+
 from .triangulation2d cimport Triangulation2D
 from .locator cimport TriangulationLocator
 
@@ -22,9 +24,16 @@ cdef class TriangulationInterpolator:
         int[:] triangles
 
         # Interpolation factors
-        double[:,:] factors
+        double[:,::1] factors
 
     cpdef int set_points(TriangulationInterpolator self,
-                         double[:] xpoints, double[:] ypoints)
+                         floating[:] xpoints, floating[:] ypoints,
+                         int num_threads=*)
+
+    cpdef void interpolate(self, floating[:] vertdata,
+                           floating[:] pointdata, fill_value=*,
+                           int num_threads=*) except *
 
-    cpdef void interpolate(self, double[:] tridata, double[:] pointdata)
+    cpdef void interpolate_fields(self, floating[:,:] vertdata,
+                                  floating[:,:] pointdata,
+                                  fill_value=*, int num_threads=*) except *
@@ -1,6 +1,13 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
+from cython cimport floating
+from cython.parallel cimport prange
+cimport openmp
 
-from .util import compute_interpolator
+from .util import (
+    update_interpolator, compute_moved_triangles, set_coordinates
+)
 
 cdef class TriangulationInterpolator:
 
@@ -11,7 +18,12 @@ cdef class TriangulationInterpolator:
                  double[:,:] det=None):
 
         if None in (gradx, grady, det):
-            self.gradx, self.grady, self.det = compute_interpolator(TG)
+            if locator.barycentric:
+                self.gradx = locator.gradx
+                self.grady = locator.grady
+                self.det   = locator.det
+            else:
+                self.gradx, self.grady, self.det = TG.interpolator
         else:
             self.gradx = gradx
             self.grady = grady
@@ -24,18 +36,55 @@ cdef class TriangulationInterpolator:
         self.triangles = np.empty(NP, dtype='int32')
         self.factors = np.empty( (NP, 3), dtype='d')
 
+    def update(TriangulationInterpolator self, double[:] x, double[:] y,
+               moved=None):
+        """
+        Update the locator and interpolator after triangulation vertices
+        moved to (x, y).
+
+        moved is an optional array of NV booleans flagging vertices that
+        moved: gradx, grady and det are recomputed only for triangles having
+        a moved vertex (see also TriangulationLocator.update).
+
+        Point triangles and factors are not updated: call set_points again.
+        """
+        self.locator.update(x, y, moved)
+        if self.locator.TG is not self.TG:
+            set_coordinates(self.TG, x, y)
+
+        # A barycentric locator already updated the arrays it shares.
+        if self.locator.barycentric and \
+           self.gradx.base is self.locator.gradx.base:
+            return
+
+        triangles = compute_moved_triangles(self.TG, moved)
+        update_interpolator(self.TG, triangles,
+                            self.gradx, self.grady, self.det)
+
     cpdef int set_points(TriangulationInterpolator self,
-                         double[:] xpoints, double[:] ypoints):
+                         floating[:] xpoints, floating[:] ypoints,
+                         int num_threads=1):
         """
         Find triangle containing (x,y) and precompute interpolation factors
 
+        xpoints and ypoints are both float32 or float64 arrays.
+
+        If the locator is barycentric, factors are computed by the locator
+        while searching points, with its gradx, grady and det arrays.
+
+        num_threads is the number of threads to split the points across, as
+        in TriangulationLocator.search_points. Each point is processed
+        independently, so result does not depend on num_threads.
         """
 
         cdef:
             int P, T
             int nout=0 # Number of points out of the domain
+            int NP = self.NP
             double x, y
             # Shorter names
+            int[:] triangles = self.triangles
+            double[:,::1] factors = self.factors
             double[:,:] gradx = self.gradx
             double[:,:] grady = self.grady
             double[:,:] det   = self.det
@@ -44,11 +93,29 @@ cdef class TriangulationInterpolator:
         assert ypoints.shape[0] == self.NP
         assert self.triangles.shape[0] == self.NP
 
-        self.locator.search_points(xpoints, ypoints, triangles=self.triangles)
+        if num_threads <= 0:
+            num_threads = openmp.omp_get_max_threads()
+
+        # Python call, which selects search_points float32 or float64
+        # version.
+        locator = <object> self.locator
+
+        if self.locator.barycentric:
+            locator.search_points(xpoints, ypoints, triangles=triangles,
+                                  factors=factors, num_threads=num_threads)
+            for P in prange(NP, nogil=True, num_threads=num_threads,
+                            schedule='static'):
+                if triangles[P] == -1:
+                    nout += 1
+            return nout
+
+        locator.search_points(xpoints, ypoints, triangles=triangles,
+                              num_threads=num_threads)
 
         # Loop on all points we want to interpolate on.
-        for P in range(self.NP):
-            T = self.triangles[P]
+        for P in prange(NP, nogil=True, num_threads=num_threads,
+                        schedule='static'):
+            T = triangles[P]
             if T == -1:
                 nout += 1
                 continue
@@ -57,30 +124,313 @@ cdef class TriangulationInterpolator:
             y = ypoints[P]
 
             # Compute interpolation factors.
-            self.factors[P,0] = det[T,0] + x*gradx[T,0] + y*grady[T,0]
-            self.factors[P,1] = det[T,1] + x*gradx[T,1] + y*grady[T,1]
-            self.factors[P,2] = det[T,2] + x*gradx[T,2] + y*grady[T,2]
+            factors[P,0] = det[T,0] + x*gradx[T,0] + y*grady[T,0]
+            factors[P,1] = det[T,1] + x*gradx[T,1] + y*grady[T,1]
+            factors[P,2] = det[T,2] + x*gradx[T,2] + y*grady[T,2]
+
+        return nout
+
+    def update_points(TriangulationInterpolator self,
+                      floating[:] xpoints, floating[:] ypoints, changed,
+                      int num_threads=1):
+        """
+        Same as set_points, but only for points that changed.
+
+        xpoints and ypoints are the coordinates of all the NP points, and
+        changed is either an array of NP booleans flagging points that
+        changed, or an array of their indices (a point may be given several
+        times, it is located once). Only triangles and factors of changed
+        points are computed, so the cost is proportional to the number of
+        changed points.
+
+        If the locator has triangle neighbours, the search of a changed
+        point walks from its previous triangle, as with the hints argument
+        of TriangulationLocator.search_points. Locator query_stats are not
+        updated.
+
+        Return the number of changed points out of the domain.
+        """
+
+        cdef:
+            int I, P, T
+            int NC
+            int nout=0 # Number of changed points out of the domain
+            double x, y
+            double* point_factors
+            Py_ssize_t[:] indices
+            TriangulationLocator locator = self.locator
+            bint walk = locator.neighbours is not None
+            bint barycentric = locator.barycentric
+            # Shorter names
+            int[:] triangles = self.triangles
+            double[:,::1] factors = self.factors
+            double[:,:] gradx = self.gradx
+            double[:,:] grady = self.grady
+            double[:,:] det   = self.det
+
+        assert xpoints.shape[0] == self.NP
+        assert ypoints.shape[0] == self.NP
+
+        changed = np.asarray(changed)
+        if changed.dtype == np.bool_:
+            if changed.shape != (self.NP,):
+                raise ValueError('Expected {} changed flags, got {}'
+                                 .format(self.NP, changed.shape))
+            indices = np.flatnonzero(changed)
+        else:
+            # Unique indices, so that threads do not write the same point,
+            # and nout counts it once.
+            indices = np.unique(changed.astype(np.intp))
+            if indices.shape[0] > 0 and \
+               not 0 <= indices[0] <= indices[indices.shape[0]-1] < self.NP:
+                raise ValueError('Changed point indices must be in [0, {}['
+                                 .format(self.NP))
+        NC = indices.shape[0]
+
+        if num_threads <= 0:
+            num_threads = openmp.omp_get_max_threads()
+
+        for I in prange(NC, nogil=True, num_threads=num_threads,
+                        schedule='static'):
+            P = indices[I]
+            x = xpoints[P]
+            y = ypoints[P]
+
+            point_factors = &factors[P,0] if barycentric else NULL
+            if walk:
+                T = locator.search_point_hint(x, y, triangles[P], NULL,
+                                              point_factors)
+            else:
+                T = locator.search_point(x, y, NULL, point_factors)
+            triangles[P] = T
+
+            if T == -1:
+                nout += 1
+                continue
+
+            if not barycentric:
+                factors[P,0] = det[T,0] + x*gradx[T,0] + y*grady[T,0]
+                factors[P,1] = det[T,1] + x*gradx[T,1] + y*grady[T,1]
+                factors[P,2] = det[T,2] + x*gradx[T,2] + y*grady[T,2]
 
         return nout
 
-    cpdef void interpolate(TriangulationInterpolator self, double[:] vertdata,
-                          double[:] pointdata):
-        """ data are the values defined on all mesh vertices. """
+    def interpolate_series(TriangulationInterpolator self, vertdata,
+                           pointdata, int chunk_size=16, fill_value=None,
+                           int num_threads=1):
+        """
+        Interpolate a time series of vertex data, chunk by chunk.
+
+        Parameters
+        ----------
+        vertdata:
+            Either an array of shape (ntime, NV), typically a np.memmap,
+            read chunk_size snapshots at a time, or an iterable of arrays of
+            shape (NV,) or (n, NV), each being a chunk.
+        pointdata:
+            Output array of shape (ntime, NP), typically a np.memmap opened
+            in write mode. Its dtype (float32 or float64) is the dtype
+            snapshots are converted to.
+        fill_value, num_threads:
+            See interpolate.
+
+        Each chunk is interpolated by a single interpolate_fields call
+        (without the GIL), its snapshots being the fields, while the next
+        chunk is read in a thread. So at most two chunks are in memory, and
+        reading overlaps with computing.
+
+        Return the number of snapshots interpolated.
+        """
+        ntime = pointdata.shape[0]
+        dtype = pointdata.dtype
+
+        if np.shape(pointdata) != (ntime, self.NP):
+            raise ValueError('Expected pointdata of shape (ntime, {}), got {}'
+                             .format(self.NP, np.shape(pointdata)))
+
+        if hasattr(vertdata, 'shape'):
+            if np.shape(vertdata) != (ntime, self.TG.NV):
+                raise ValueError('Expected vertdata of shape ({}, {}), got {}'
+                                 .format(ntime, self.TG.NV,
+                                         np.shape(vertdata)))
+            chunks = (vertdata[start:start+chunk_size]
+                      for start in range(0, ntime, chunk_size))
+        else:
+            chunks = iter(vertdata)
+
+        def read_chunk():
+            # Reading a memory-mapped chunk happens here, when it is
+            # copied (always, so that pages are read in this thread, and
+            # chunks of read-only memmaps are writable).
+            chunk = next(chunks, None)
+            if chunk is None:
+                return None
+            return np.atleast_2d(np.array(chunk, dtype=dtype, order='C'))
+
+        # Python call, which selects interpolate_fields float32 or float64
+        # version.
+        interpolate_fields = (<object> self).interpolate_fields
+
+        start = 0
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            future = pool.submit(read_chunk)
+            while True:
+                chunk = future.result()
+                if chunk is None:
+                    break
+                future = pool.submit(read_chunk)
+
+                if start + chunk.shape[0] > ntime or \
+                   chunk.shape[1] != self.TG.NV:
+                    raise ValueError('Expected vertdata of shape ({}, {}), '
+                                     'got a chunk of shape {} at time {}'
+                                     .format(ntime, self.TG.NV, chunk.shape,
+                                             start))
+
+                # Snapshots of the chunk are the fields.
+                interpolate_fields(chunk.T,
+                                   pointdata[start:start+chunk.shape[0]].T,
+                                   fill_value=fill_value,
+                                   num_threads=num_threads)
+                start += chunk.shape[0]
+
+        if start != ntime:
+            raise ValueError('Expected {} snapshots in vertdata, got {}'
+                             .format(ntime, start))
+
+        return start
+
+    def to_sparse(TriangulationInterpolator self):
+        """
+        Return the interpolation operator of the points set by set_points,
+        as a scipy.sparse.csr_matrix of shape (NP, NV).
+
+        Row P holds the factors of the 3 vertices of the triangle of point
+        P, so that matrix @ vertdata is the pointdata computed by
+        interpolate. Rows of points out of the triangulation are empty.
+
+        The matrix is built from triangles and factors with numpy, without
+        Python loops. scipy is only required by this method.
+        """
+        import scipy.sparse
+
+        triangles = np.asarray(self.triangles)
+        inside = triangles != -1
+
+        indptr = np.zeros(self.NP+1, dtype=np.int64)
+        np.cumsum(3*inside, out=indptr[1:])
+        if indptr[self.NP] < 2**31:
+            indptr = indptr.astype('int32')
+
+        trivtx = np.asarray(self.TG.trivtx)
+        indices = trivtx[triangles[inside]].astype(indptr.dtype).ravel()
+        data = np.asarray(self.factors)[inside].ravel()
+
+        return scipy.sparse.csr_matrix((data, indices, indptr),
+                                       shape=(self.NP, self.TG.NV))
+
+    cpdef void interpolate(TriangulationInterpolator self,
+                           floating[:] vertdata, floating[:] pointdata,
+                           fill_value=None, int num_threads=1) except *:
+        """
+        data are the values defined on all mesh vertices.
+
+        vertdata and pointdata are both float32 or float64 arrays. Values are
+        interpolated in float64, and rounded to float32 when stored.
+
+        pointdata of points out of the triangulation is set to fill_value,
+        or not modified if fill_value is None.
+
+        num_threads is the number of threads to split the points across, as
+        in set_points.
+        """
 
         cdef:
             int V0,V1,V2, T,P
+            int NP = self.NP
+            bint fill = fill_value is not None
+            double value = fill_value if fill else 0.
+            # Shorter names
+            int[:] triangles = self.triangles
+            double[:,::1] factors = self.factors
+            int[:,:] trivtx = self.TG.trivtx
+
+        if vertdata.shape[0] != self.TG.NV or pointdata.shape[0] != self.NP:
+            raise ValueError('Expected vertdata of size {} and pointdata of '
+                             'size {}, got {} and {}'
+                             .format(self.TG.NV, self.NP, vertdata.shape[0],
+                                     pointdata.shape[0]))
+
+        if num_threads <= 0:
+            num_threads = openmp.omp_get_max_threads()
+
+        for P in prange(NP, nogil=True, num_threads=num_threads,
+                        schedule='static'):
+            T = triangles[P]
+            if T == -1:
+                if fill:
+                    pointdata[P] = value
+                continue
+            V0 = trivtx[T,0]
+            V1 = trivtx[T,1]
+            V2 = trivtx[T,2]
+
+            pointdata[P] = vertdata[V0] * factors[P,0] + \
+                           vertdata[V1] * factors[P,1] + \
+                           vertdata[V2] * factors[P,2]
+
+    cpdef void interpolate_fields(TriangulationInterpolator self,
+                                  floating[:,:] vertdata,
+                                  floating[:,:] pointdata,
+                                  fill_value=None,
+                                  int num_threads=1) except *:
+        """
+        Same as interpolate, for several fields at once: vertdata has shape
+        (NV, nfields), and pointdata (NP, nfields).
+
+        triangles, factors and trivtx are read once for all the fields,
+        instead of once per field. Fields are best stored in rows of
+        C-contiguous arrays.
+        """
+
+        cdef:
+            int V0,V1,V2, T,P, k
+            int NP = self.NP
+            int nfields = vertdata.shape[1]
+            double f0, f1, f2
+            bint fill = fill_value is not None
+            double value = fill_value if fill else 0.
+            # Shorter names
+            int[:] triangles = self.triangles
+            double[:,::1] factors = self.factors
+            int[:,:] trivtx = self.TG.trivtx
+
+        if vertdata.shape[0] != self.TG.NV or \
+           pointdata.shape[0] != self.NP or pointdata.shape[1] != nfields:
+            raise ValueError('Expected vertdata of shape ({}, nfields) and '
+                             'pointdata of shape ({}, nfields), got {} and {}'
+                             .format(self.TG.NV, self.NP,
+                                     np.shape(vertdata), np.shape(pointdata)))
 
-        assert vertdata.shape[0] == self.TG.NV
-        assert pointdata.shape[0] == self.NP
+        if num_threads <= 0:
+            num_threads = openmp.omp_get_max_threads()
 
-        for P in range(self.NP):
-            T = self.triangles[P]
+        for P in prange(NP, nogil=True, num_threads=num_threads,
+                        schedule='static'):
+            T = triangles[P]
             if T == -1:
+                if fill:
+                    for k in range(nfields):
+                        pointdata[P,k] = value
                 continue
-            V0 = self.TG.trivtx[T,0]
-            V1 = self.TG.trivtx[T,1]
-            V2 = self.TG.trivtx[T,2]
+            V0 = trivtx[T,0]
+            V1 = trivtx[T,1]
+            V2 = trivtx[T,2]
+            f0 = factors[P,0]
+            f1 = factors[P,1]
+            f2 = factors[P,2]
 
-            pointdata[P] = vertdata[V0] * self.factors[P,0] + \
-                           vertdata[V1] * self.factors[P,1] + \
-                           vertdata[V2] * self.factors[P,2]
+            for k in range(nfields):
+                pointdata[P,k] = vertdata[V0,k] * f0 + \
+                                 vertdata[V1,k] * f1 + \
+                                 vertdata[V2,k] * f2
@@ -1,6 +1,19 @@
+from cython cimport floating
+
 from .triangulation2d cimport Triangulation2D
+from ..base2d cimport CPoint2D, CTriangle2D
 from ..grid2d cimport Grid2D
 
+cdef struct CSearchStats:
+    # Number of triangles tested.
+    int tested
+    # Whether the point was found on a triangle edge, instead of inside a
+    # triangle.
+    bint on_edge
+    # Whether the point is out of the grid.
+    bint out_of_grid
+
+
 cdef class TriangulationLocator:
 
     cdef public:
@@ -10,9 +23,72 @@ cdef class TriangulationLocator:
         double edge_width
         double edge_width_square
 
+        # Triangles of cell I are celltri[celltri_idx[I]:celltri_idx[I+1]].
         int[:] celltri
-        int[:] celltri_idx
+        Py_ssize_t[:] celltri_idx
+
+        # If packed is True, coordinates of triangle T vertices are
+        # tricoords[T,:] = xA, yA, xB, yB, xC, yC (see
+        # compute_packed_coordinates).
+        bint packed
+        double[:,::1] tricoords
+
+        # If barycentric is True, inclusion is tested with interpolator
+        # arrays (see compute_interpolator).
+        bint barycentric
+        double[:,:] gradx
+        double[:,:] grady
+        double[:,:] det
+
+        # Range of cells of each triangle (see build_triangle_to_cell).
+        int[:,:] bounds
+
+        bint overlap
+        Py_ssize_t pruned
+
+        # Triangle neighbours (see compute_neighbours), to walk from hints.
+        int[:,:] neighbours
+        int max_walk
+
+        # Boundary edges (vertices and triangle) and their index on
+        # boundary_grid: edges of cell I are
+        # celledge[celledge_idx[I]:celledge_idx[I+1]] (see search_nearest).
+        int[:,:] boundary_vertices
+        int[:] boundary_triangle
+        Grid2D boundary_grid
+        int[:] celledge
+        Py_ssize_t[:] celledge_idx
+
+        # If collect_stats is True, search_points sets query_stats.
+        bint collect_stats
+        dict query_stats
+
+    cdef void get_triangle(TriangulationLocator self, int T,
+                           CTriangle2D* ABC) nogil
+
+    cdef int barycentric_locate(TriangulationLocator self, int T,
+                                CPoint2D* P, double* factors) nogil
+
+    cdef int search_point(TriangulationLocator self, double x, double y,
+                          CSearchStats* stats, double* factors) nogil
+
+    cdef int search_candidates(TriangulationLocator self, int[:] candidates,
+                               Py_ssize_t IT0, Py_ssize_t IT1,
+                               CPoint2D* P, CSearchStats* stats,
+                               double* factors) nogil
+
+    cdef int walk(TriangulationLocator self, double x, double y, int T,
+                  CSearchStats* stats, double* factors) nogil
+
+    cdef int search_point_hint(TriangulationLocator self, double x, double y,
+                               int hint, CSearchStats* stats,
+                               double* factors) nogil
+
+    cdef int project_point(TriangulationLocator self, double x, double y,
+                           double* xq, double* yq, double* distance) nogil
 
     cpdef int[:] search_points(TriangulationLocator self,
-                               double[:] xpoints, double[:] ypoints,
-                               int[:] triangles=*)
+                               floating[:] xpoints, floating[:] ypoints,
+                               int[:] triangles=*, int num_threads=*,
+                               int[:] hints=*, order=*,
+                               double[:,::1] factors=*)
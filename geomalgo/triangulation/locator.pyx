@@ -3,19 +3,36 @@ For a given cell, find all triangle that overlap the cells.
 
 Each triangle is associated with a range of cells from ix_min to ix_max and
 from iy_min to iy_max. Some cells may not overlap with the triangle, but this
-make is simpler and less error prone. To optimize, we would need a method to
-check whether a triangle and a cell overlap.
+make is simpler and less error prone.
+
+Optionally (overlap=True), a triangle is associated only to the cells of its
+range it overlaps, which shrinks the index and the number of triangles tested
+per point, for example for long, skinny, diagonal triangles. Cells are
+enlarged by edge_width for the overlap test, so points on triangle edges are
+still found.
 
 """
 
 import numpy as np
+from libc.math cimport sqrt, INFINITY, NAN
+from libc.stdlib cimport calloc, free
+
+from cython cimport floating
+from cython.parallel cimport prange, threadid
+cimport openmp
 
 from ..base2d cimport (
-    BoundingBox, CTriangle2D, CPoint2D, triangle2d_set,
-    triangle2d_includes_point2d, triangle2d_on_edges
+    BoundingBox, CTriangle2D, CPoint2D, CVector2D, CSegment2D,
+    triangle2d_set, is_left, triangle2d_includes_point2d, triangle2d_on_edges,
+    triangle2d_overlaps_box, segment2d_set, segment2d_project_point2d,
+    subtract_points2d
+)
+from ..grid2d cimport compute_index
+from .boundary_edges cimport BoundaryEdges
+from .util import (
+    compute_moved_triangles, compute_packed_coordinates, update_interpolator,
+    set_coordinates, check_coordinates
 )
-from ..grid2d cimport Cell2D, compute_index
-from .util import compute_bounding_box, compute_edge_min_max
 
 
 DEF IX_MIN = 0
@@ -25,6 +42,18 @@ DEF IY_MAX = 3
 
 DEF OUT_IDX = -1
 
+# Results of TriangulationLocator.barycentric_locate, besides edge indices.
+DEF INSIDE = -1
+DEF ON_EDGE = 3
+
+# Columns of search_points per thread counters, and their row size (a cache
+# line), so that threads don't write to the same cache line.
+DEF TESTED = 0
+DEF TESTED_MAX = 1
+DEF NUM_ON_EDGE = 2
+DEF OUT_OF_GRID = 3
+DEF STATS_ROW = 8
+
 
 # Grid is larger than bounding box with 2*edge_width, which ensure that points
 # near boundary are found in cells (0, nx-1, ny-1), and not (-1, nx, ny).
@@ -53,11 +82,94 @@ def choose_bb_grid_distance(edge_width):
     return edge_width * 2
 
 
+# Default average number of triangles per cell, and maximal size in bytes of
+# the index, to choose the grid size (see choose_grid_size).
+TRIANGLES_PER_CELL = 8
+MAX_INDEX_BYTES = 2**30
+
+# Number of cells of the boundary edges grid per boundary edge (see
+# build_boundary_index).
+BOUNDARY_CELLS_PER_EDGE = 4
+
+
+def choose_grid_size(Triangulation2D TG, double edge_width=0,
+                     double triangles_per_cell=TRIANGLES_PER_CELL,
+                     max_index_bytes=MAX_INDEX_BYTES):
+    """
+    Choose grid nx and ny, so that cells have triangles_per_cell triangles in
+    average, and the index (celltri, celltri_idx and bounds) uses less than
+    max_index_bytes.
+
+    With square cells of side s, a triangle whose bounding box (enlarged by
+    edge_width) has sides w and h is associated to about (w/s+1)*(h/s+1)
+    cells. Summing on triangles, the number of (triangle, cell) pairs is:
+
+        pairs(s) = sum(w*h) / s**2 + sum(w+h) / s + NT
+
+    for W*H / s**2 cells, where W and H are the sides of the grid. The cell
+    side is the root of pairs(s) = triangles_per_cell * W*H / s**2, or the
+    smallest side giving an index smaller than max_index_bytes:
+
+        4*pairs(s) + 8*W*H / s**2 + 16*NT <= max_index_bytes
+
+    The average number of triangles per cell is always more than
+    sum(w*h) / (W*H), reached for infinitely small cells, so
+    triangles_per_cell is at least twice this bound.
+    """
+    cdef:
+        double W, H, A, P, NT = TG.NT, s, u, a, c
+
+    bb = TG.bounding_box
+    dist = choose_bb_grid_distance(edge_width)
+    W = bb.xmax - bb.xmin + 2*dist
+    H = bb.ymax - bb.ymin + 2*dist
+
+    x, y, trivtx = TG.to_numpy()
+    xtri = x[trivtx]
+    ytri = y[trivtx]
+    w = xtri.max(axis=1) - xtri.min(axis=1) + 2*edge_width
+    h = ytri.max(axis=1) - ytri.min(axis=1) + 2*edge_width
+    A = np.dot(w, h)
+    P = w.sum() + h.sum()
+
+    triangles_per_cell = max(triangles_per_cell, 2*A / (W*H))
+
+    # Positive root of NT*s**2 + P*s + A - triangles_per_cell*W*H = 0.
+    c = A - triangles_per_cell*W*H
+    s = (-P + sqrt(P*P - 4*NT*c)) / (2*NT)
+
+    # Largest u = 1/s such as a*u**2 + 4*P*u + c <= 0.
+    a = 4*A + 8*W*H
+    c = 20*NT + 8 - max_index_bytes
+    if c < 0:
+        u = (-4*P + sqrt(16*P*P - 4*a*c)) / (2*a)
+        s = max(s, 1/u)
+    else:
+        s = max(W, H)
+
+    return max(1, int(round(W / s))), max(1, int(round(H / s)))
+
+
+def index_statistics(count, index_bytes):
+    """
+    Return statistics of an index, from the number of triangles of its cells.
+    """
+    count = np.asarray(count)
+    return {
+        'ncell': count.shape[0],
+        'mean': count.mean(),
+        'max': count.max(),
+        'histogram': np.bincount(count),
+        'empty_fraction': np.count_nonzero(count == 0) / count.shape[0],
+        'index_bytes': index_bytes,
+    }
+
+
 def build_grid(Triangulation2D TG, int nx, int ny, double dist=-1):
-    bb = compute_bounding_box(TG)
+    bb = TG.bounding_box
 
     if dist < 0:
-        edge_min, edge_max = compute_edge_min_max(TG)
+        edge_min, edge_max = TG.edge_min_max
         edge_width = choose_edge_width(edge_min)
         dist = choose_bb_grid_distance(edge_width)
 
@@ -92,112 +204,515 @@ def check_grid(Grid2D grid, BoundingBox bb, edge_width):
     raise ValueError(msg)
 
 
-def build_triangle_to_cell(int[:,:] bounds, Triangulation2D TG, Grid2D grid,
-                           double edge_width):
-
+cdef void set_triangle_cells(int[:,:] bounds, Triangulation2D TG,
+                             Grid2D grid, double edge_width, int T) nogil:
+    """
+    Set bounds[T] to the range of cells of triangle T.
+    """
     cdef:
-        int T
         int ix, iy
         CTriangle2D ABC
         CPoint2D A, B, C, P
-        Cell2D cell = Cell2D()
 
     triangle2d_set(&ABC, &A, &B, &C)
+    TG.get(T, &ABC)
+
+    #    C--------------C--------------C
+    #    |              |              |
+    #    |          C---B---D          |
+    #    |            \ | /            |
+    #    |    cell 0    A    cell 1    |
+    #    |              |              |
+    #    |              |              |
+    #    C--------------C--------------C
+    #
+    # If a point is on [AB], we don't know if it will be detected in
+    # triangle ABC or ADB, so we map each triangle to cells containing
+    # triangle points and cells at a distance edge_width of points.
+    #
+    # The grid is around the triangulation at a distance 2*edge_width (see
+    # utils.build_grid), so it is guaranted that ix is not -1 or nx
+    # (same for y).
+
+    # Cell blocks south-west point
+    P.x = min(A.x, B.x, C.x) - edge_width
+    P.y = min(A.y, B.y, C.y) - edge_width
+    grid.c_find_ix_iy(&P, &ix, &iy)
+    bounds[T,IX_MIN] = ix
+    bounds[T,IY_MIN] = iy
+
+    # Cell blocks north-east point
+    P.x = max(A.x, B.x, C.x) + edge_width
+    P.y = max(A.y, B.y, C.y) + edge_width
+    grid.c_find_ix_iy(&P, &ix, &iy)
+    bounds[T,IX_MAX] = ix+1
+    bounds[T,IY_MAX] = iy+1
+
+
+def build_triangle_to_cell(int[:,:] bounds, Triangulation2D TG, Grid2D grid,
+                           double edge_width, int[:] triangles=None,
+                           int num_threads=1):
+    """
+    Set bounds[T] to the range of cells of triangle T, for all triangles, or
+    only for the given triangles.
 
-    for T in range(TG.NT):
-        TG.get(T, &ABC)
-
-        #    C--------------C--------------C
-        #    |              |              |
-        #    |          C---B---D          |
-        #    |            \ | /            |
-        #    |    cell 0    A    cell 1    |
-        #    |              |              |
-        #    |              |              |
-        #    C--------------C--------------C
-        #
-        # If a point is on [AB], we don't know if it will be detected in
-        # triangle ABC or ADB, so we map each triangle to cells containing
-        # triangle points and cells at a distance edge_width of points.
-        #
-        # The grid is around the triangulation at a distance 2*edge_width (see
-        # utils.build_grid), so it is guaranted that ix is not -1 or nx
-        # (same for y).
-
-        # Cell blocks south-west point
-        P.x = min(A.x, B.x, C.x) - edge_width
-        P.y = min(A.y, B.y, C.y) - edge_width
-        grid.c_find_cell(cell, &P)
-        bounds[T,IX_MIN] = cell.ix
-        bounds[T,IY_MIN] = cell.iy
-
-        # Cell blocks north-east point
-        P.x = max(A.x, B.x, C.x) + edge_width
-        P.y = max(A.y, B.y, C.y) + edge_width
-        grid.c_find_cell(cell, &P)
-        bounds[T,IX_MAX] = cell.ix+1
-        bounds[T,IY_MAX] = cell.iy+1
-
-
-def build_cell_to_triangle(int[:,:] bounds, int nx, int ny):
+    num_threads is the number of threads to split triangles across, a value
+    less or equal to 0 uses all the OpenMP threads.
+    """
 
     cdef:
-        #Number of triangles of a cell.
-        int[:] celltri
-        int[:] cell_triangles_idx
-        int[:] count = np.zeros(nx*ny, dtype='int32')
-        int T, NT = bounds.shape[0]
-        int ix, iy, cell_index, offset
-        int total = 0
-
-    # Count how much triangles each cell has.
-    for T in range(NT):
+        int IT, T
+        int NT = TG.NT if triangles is None else triangles.shape[0]
+        bint has_triangles = triangles is not None
+
+    if num_threads <= 0:
+        num_threads = openmp.omp_get_max_threads()
+
+    for IT in prange(NT, nogil=True, num_threads=num_threads,
+                     schedule='static'):
+        T = triangles[IT] if has_triangles else IT
+        set_triangle_cells(bounds, TG, grid, edge_width, T)
+
+
+def count_cell_triangle_pairs(int[:,:] bounds):
+    """
+    Number of (triangle, cell) pairs in triangle cell ranges.
+    """
+    cdef:
+        int T
+        Py_ssize_t total = 0
+
+    for T in range(bounds.shape[0]):
+        total += (bounds[T,IX_MAX] - bounds[T,IX_MIN]) \
+               * (bounds[T,IY_MAX] - bounds[T,IY_MIN])
+
+    return total
+
+
+cdef inline bint cell_overlaps_triangle(Grid2D grid, int ix, int iy,
+                                        CTriangle2D* ABC,
+                                        double edge_width) nogil:
+    return triangle2d_overlaps_box(ABC,
+                                   grid.x[ix] - edge_width,
+                                   grid.x[ix+1] + edge_width,
+                                   grid.y[iy] - edge_width,
+                                   grid.y[iy+1] + edge_width)
+
+
+cdef void visit_cell_triangle_pairs(int[:,:] bounds, int T0, int T1, int nx,
+                                    Triangulation2D TG, Grid2D grid,
+                                    double edge_width, bint overlap,
+                                    Py_ssize_t[:] offsets, int[:] celltri,
+                                    bint fill) nogil:
+    """
+    Loop on (triangle, cell) pairs of triangles T0 to T1-1.
+
+    If fill is False, count pairs of each cell in offsets. Else, store
+    triangles in celltri at offsets of their cells, and increment offsets.
+    """
+    cdef:
+        int T, ix, iy, cell_index
+        CTriangle2D ABC
+        CPoint2D A, B, C
+
+    triangle2d_set(&ABC, &A, &B, &C)
+
+    for T in range(T0, T1):
+        if overlap:
+            TG.get(T, &ABC)
         for iy in range(bounds[T,IY_MIN], bounds[T,IY_MAX]):
             for ix in range(bounds[T,IX_MIN], bounds[T,IX_MAX]):
+                if overlap and not cell_overlaps_triangle(grid, ix, iy, &ABC,
+                                                          edge_width):
+                    continue
                 cell_index = compute_index(nx, ix, iy)
-                count[cell_index] += 1
-                total += 1
+                if fill:
+                    celltri[offsets[cell_index]] = T
+                offsets[cell_index] += 1
 
-    # Allocate arrays
-    celltri = np.empty(total, dtype='int32')
-    celltri_idx = np.empty(nx*ny + 1, dtype='int32')
-    offsets = np.empty(nx*ny, dtype='int32')
 
-    # Set celltri_idx and initialize offsets.
-    celltri_idx[0] = 0
-    for cell_index in range(nx*ny):
-        celltri_idx[cell_index+1] = celltri_idx[cell_index] + count[cell_index]
-        offsets[cell_index] = celltri_idx[cell_index]
+def choose_chunk_count(int num_threads, int NT, Py_ssize_t npair,
+                       int ncell):
+    """
+    Number of triangle chunks of build_cell_to_triangle: one per thread,
+    but no more than npair // ncell, so that chunk histograms (8*ncell
+    bytes each) use at most twice the memory of celltri (4*npair bytes),
+    and at least one.
+    """
+    return max(1, min(num_threads, NT, npair // max(1, ncell)))
+
+
+def build_cell_to_triangle(int[:,:] bounds, int nx, int ny,
+                           Triangulation2D TG=None, Grid2D grid=None,
+                           double edge_width=0, int num_threads=1):
+    """
+    Build celltri and celltri_idx from triangle cell ranges.
+
+    If TG and grid are given, a triangle is associated only to the cells of
+    its range it overlaps, cells being enlarged by edge_width.
+
+    Triangles are split in num_threads chunks (all the OpenMP threads if
+    num_threads is less or equal to 0). Each chunk counts its pairs per cell
+    in its own histogram, a prefix sum on histograms gives where each chunk
+    stores its triangles in each cell, then chunks store their triangles.
+    Triangles are sorted in each cell, whatever num_threads.
+
+    Histograms cost 8*ncell bytes per chunk, so for grids with few
+    triangles per cell, less chunks than threads are used (see
+    choose_chunk_count).
+    """
+
+    cdef:
+        int[:] celltri
+        Py_ssize_t[:] celltri_idx
+        # Number of triangles of a cell, for each chunk, then offsets.
+        Py_ssize_t[:,:] offsets
+        int NT = bounds.shape[0]
+        int chunk, nchunk, T0, T1
+        int cell_index, ncell = nx*ny
+        Py_ssize_t total, n
+        bint overlap = TG is not None
+
+    if overlap and grid is None:
+        raise ValueError('grid is required to check triangle and cell overlap')
+
+    if num_threads <= 0:
+        num_threads = openmp.omp_get_max_threads()
+
+    nchunk = choose_chunk_count(num_threads, NT,
+                                count_cell_triangle_pairs(bounds), ncell)
+    offsets = np.zeros((nchunk, ncell), dtype=np.intp)
+    celltri = None
+
+    # Count how much triangles each cell has, in each chunk.
+    for chunk in prange(nchunk, nogil=True, num_threads=num_threads,
+                        schedule='static', chunksize=1):
+        T0 = <int> ((<Py_ssize_t> NT) * chunk // nchunk)
+        T1 = <int> ((<Py_ssize_t> NT) * (chunk+1) // nchunk)
+        visit_cell_triangle_pairs(bounds, T0, T1, nx, TG, grid, edge_width,
+                                  overlap, offsets[chunk], celltri, False)
+
+    # Set celltri_idx, and offsets of each chunk in cells.
+    celltri_idx = np.empty(ncell + 1, dtype=np.intp)
+    total = 0
+    for cell_index in range(ncell):
+        celltri_idx[cell_index] = total
+        for chunk in range(nchunk):
+            n = offsets[chunk, cell_index]
+            offsets[chunk, cell_index] = total
+            total += n
+    celltri_idx[ncell] = total
 
     # Set celltri
-    for T in range(NT):
-        for iy in range(bounds[T,IY_MIN], bounds[T,IY_MAX]):
-            for ix in range(bounds[T,IX_MIN], bounds[T,IX_MAX]):
+    celltri = np.empty(total, dtype='int32')
+    for chunk in prange(nchunk, nogil=True, num_threads=num_threads,
+                        schedule='static', chunksize=1):
+        T0 = <int> ((<Py_ssize_t> NT) * chunk // nchunk)
+        T1 = <int> ((<Py_ssize_t> NT) * (chunk+1) // nchunk)
+        visit_cell_triangle_pairs(bounds, T0, T1, nx, TG, grid, edge_width,
+                                  overlap, offsets[chunk], celltri, True)
+
+    return np.asarray(celltri), np.asarray(celltri_idx)
+
+
+def patch_cell_to_triangle(int[:] celltri, Py_ssize_t[:] celltri_idx,
+                           int[:] triangles, int[:,:] old_bounds,
+                           int[:,:] new_bounds, int nx, int ny,
+                           Triangulation2D TG=None, Grid2D grid=None,
+                           double edge_width=0):
+    """
+    Return celltri and celltri_idx, with triangles moved from their old cell
+    ranges to their new cell ranges.
+
+    triangles must be sorted in increasing order, and old_bounds and
+    new_bounds are their cell ranges, of shape (len(triangles), 4). Only
+    cells of these ranges are searched, other cells are copied. Triangles
+    stay sorted in each cell, so the result is the same as calling
+    build_cell_to_triangle with the new cell ranges.
+
+    If TG and grid are given, a triangle is associated only to the cells of
+    its new range it overlaps (see build_cell_to_triangle).
+    """
+    cdef:
+        int[:] new_celltri
+        Py_ssize_t[:] new_celltri_idx = np.empty(nx*ny + 1, dtype=np.intp)
+        Py_ssize_t[:] count = np.zeros(nx*ny, dtype=np.intp)
+        int[:] added_tri
+        Py_ssize_t[:] added_idx, offsets
+        char[:] removed = np.zeros(celltri.shape[0], dtype='int8')
+        int IT, T, ix, iy, cell_index
+        Py_ssize_t I, I1, J, J1, K
+        bint overlap = TG is not None
+        CTriangle2D ABC
+        CPoint2D A, B, C
+
+    if overlap and grid is None:
+        raise ValueError('grid is required to check triangle and cell overlap')
+
+    triangle2d_set(&ABC, &A, &B, &C)
+
+    # Number of triangles added to each cell.
+    for IT in range(triangles.shape[0]):
+        T = triangles[IT]
+        if overlap:
+            TG.get(T, &ABC)
+        for iy in range(new_bounds[IT,IY_MIN], new_bounds[IT,IY_MAX]):
+            for ix in range(new_bounds[IT,IX_MIN], new_bounds[IT,IX_MAX]):
+                if overlap and not cell_overlaps_triangle(grid, ix, iy, &ABC,
+                                                          edge_width):
+                    continue
+                count[compute_index(nx, ix, iy)] += 1
+
+    # Triangles added to cells, sorted by cell, then by triangle.
+    added_idx = np.empty(nx*ny + 1, dtype=np.intp)
+    added_idx[0] = 0
+    for cell_index in range(nx*ny):
+        added_idx[cell_index+1] = added_idx[cell_index] + count[cell_index]
+    added_tri = np.empty(added_idx[nx*ny], dtype='int32')
+    offsets = np.array(added_idx[:nx*ny], dtype=np.intp)
+
+    for IT in range(triangles.shape[0]):
+        T = triangles[IT]
+        if overlap:
+            TG.get(T, &ABC)
+        for iy in range(new_bounds[IT,IY_MIN], new_bounds[IT,IY_MAX]):
+            for ix in range(new_bounds[IT,IX_MIN], new_bounds[IT,IX_MAX]):
+                if overlap and not cell_overlaps_triangle(grid, ix, iy, &ABC,
+                                                          edge_width):
+                    continue
                 cell_index = compute_index(nx, ix, iy)
-                offset = offsets[cell_index]
-                celltri[offset] = T
+                added_tri[offsets[cell_index]] = T
                 offsets[cell_index] += 1
 
-    return np.asarray(celltri), np.asarray(celltri_idx)
+    # Number of triangles removed from each cell, counted negatively.
+    for IT in range(triangles.shape[0]):
+        T = triangles[IT]
+        for iy in range(old_bounds[IT,IY_MIN], old_bounds[IT,IY_MAX]):
+            for ix in range(old_bounds[IT,IX_MIN], old_bounds[IT,IX_MAX]):
+                cell_index = compute_index(nx, ix, iy)
+                for I in range(celltri_idx[cell_index],
+                               celltri_idx[cell_index+1]):
+                    if celltri[I] == T:
+                        removed[I] = True
+                        count[cell_index] -= 1
+
+    new_celltri_idx[0] = 0
+    for cell_index in range(nx*ny):
+        new_celltri_idx[cell_index+1] = new_celltri_idx[cell_index] \
+            + celltri_idx[cell_index+1] - celltri_idx[cell_index] \
+            + count[cell_index]
+    new_celltri = np.empty(new_celltri_idx[nx*ny], dtype='int32')
+
+    # Merge kept and added triangles of each cell.
+    for cell_index in range(nx*ny):
+        I = celltri_idx[cell_index]
+        I1 = celltri_idx[cell_index+1]
+        J = added_idx[cell_index]
+        J1 = added_idx[cell_index+1]
+        K = new_celltri_idx[cell_index]
+        while I < I1 or J < J1:
+            if I < I1 and removed[I]:
+                I += 1
+            elif J == J1 or (I < I1 and celltri[I] < added_tri[J]):
+                new_celltri[K] = celltri[I]
+                I += 1
+                K += 1
+            else:
+                new_celltri[K] = added_tri[J]
+                J += 1
+                K += 1
+
+    return np.asarray(new_celltri), np.asarray(new_celltri_idx)
+
+
+cdef inline double box_square_distance(double x, double y,
+                                       double xmin, double xmax,
+                                       double ymin, double ymax) nogil:
+    """
+    Square distance from point (x, y) to box [xmin, xmax] x [ymin, ymax].
+    """
+    cdef:
+        double dx = max(xmin - x, 0., x - xmax)
+        double dy = max(ymin - y, 0., y - ymax)
+    return dx*dx + dy*dy
+
+
+def build_boundary_index(Triangulation2D TG, int[:,:] boundary_vertices,
+                         Grid2D grid=None):
+    """
+    Index boundary edges on a grid, as build_cell_to_triangle does for
+    triangles, with the cells of the edge bounding box.
+
+    Parameters
+    ----------
+    boundary_vertices:
+        Vertices of boundary edges, as BoundaryEdges.vertices.
+    grid:
+        Grid around the triangulation. Default has about
+        BOUNDARY_CELLS_PER_EDGE cells per boundary edge, with the aspect
+        ratio of the triangulation bounding box. Most cells are empty, as
+        boundary edges are along lines, but a point far from the boundary
+        visits less cells.
+
+    Return grid, celledge and celledge_idx.
+    """
+    cdef:
+        int NB = boundary_vertices.shape[0]
+
+    if grid is None:
+        bb = TG.bounding_box
+        width = max(bb.xmax - bb.xmin, 1e-300)
+        height = max(bb.ymax - bb.ymin, 1e-300)
+        ncell = max(1, BOUNDARY_CELLS_PER_EDGE * NB)
+        nx = int(min(max(1, round(np.sqrt(ncell * width / height))), ncell))
+        ny = max(1, ncell // nx)
+        grid = build_grid(TG, nx, ny)
+
+    x, y, _ = TG.to_numpy()
+    vertices = np.asarray(boundary_vertices)
+    xs = x[vertices]
+    ys = y[vertices]
+
+    # Same cell ranges as set_triangle_cells, with edge_width 0.
+    bounds = np.empty((NB, 4), dtype='int32')
+    for col, coord, minval, delta, n, end in [
+            (IX_MIN, xs.min(axis=1), grid.xmin, grid.dx, grid.nx, 0),
+            (IX_MAX, xs.max(axis=1), grid.xmin, grid.dx, grid.nx, 1),
+            (IY_MIN, ys.min(axis=1), grid.ymin, grid.dy, grid.ny, 0),
+            (IY_MAX, ys.max(axis=1), grid.ymin, grid.dy, grid.ny, 1)]:
+        bounds[:,col] = np.clip(np.floor((coord - minval) / delta), 0, n-1) \
+                      + end
+
+    celledge, celledge_idx = build_cell_to_triangle(bounds, grid.nx, grid.ny)
+    return grid, celledge, celledge_idx
+
+
+cdef inline void add_search_stats(CSearchStats* stats,
+                                  Py_ssize_t* counters) nogil:
+    """
+    Add counters of a point search to counters of a thread, and reset them.
+    """
+    counters[TESTED] += stats.tested
+    counters[TESTED_MAX] = max(counters[TESTED_MAX], stats.tested)
+    counters[NUM_ON_EDGE] += stats.on_edge
+    counters[OUT_OF_GRID] += stats.out_of_grid
+    stats.tested = 0
+    stats.on_edge = False
+    stats.out_of_grid = False
+
+
+cdef dict search_stats_to_dict(Py_ssize_t[:,:] counters, int[:] triangles,
+                               int NP):
+    """
+    Sum search counters of threads (rows of counters, see add_search_stats)
+    in a dictionary:
+
+        points: number of points searched.
+        tested: total number of triangles tested.
+        tested_mean, tested_max: mean and maximal number of triangles tested
+            per point.
+        on_edge: number of points found on a triangle edge, instead of
+            inside a triangle.
+        out: number of points not found (OUT_IDX).
+        out_of_grid: number of points out of the grid.
+    """
+    cdef:
+        int IP, I
+        Py_ssize_t tested = 0
+        Py_ssize_t tested_max = 0, on_edge = 0, out = 0, out_of_grid = 0
+
+    for I in range(counters.shape[0]):
+        tested += counters[I, TESTED]
+        tested_max = max(tested_max, counters[I, TESTED_MAX])
+        on_edge += counters[I, NUM_ON_EDGE]
+        out_of_grid += counters[I, OUT_OF_GRID]
+
+    for IP in range(NP):
+        out += triangles[IP] == OUT_IDX
+
+    return {
+        'points': NP,
+        'tested': tested,
+        'tested_mean': (<double> tested) / NP if NP > 0 else 0.,
+        'tested_max': tested_max,
+        'on_edge': on_edge,
+        'out': out,
+        'out_of_grid': out_of_grid,
+    }
 
 
 cdef class TriangulationLocator:
     def __init__(TriangulationLocator self, Triangulation2D TG,
                  Grid2D grid=None, double edge_width=-1,
-                 int[:,:] bounds=None):
+                 int[:,:] bounds=None, bint overlap=False,
+                 int[:,:] neighbours=None, int max_walk=32,
+                 int num_threads=1,
+                 double triangles_per_cell=TRIANGLES_PER_CELL,
+                 max_index_bytes=MAX_INDEX_BYTES, bint collect_stats=False,
+                 bint packed=False, bint barycentric=False,
+                 interpolator=None, BoundaryEdges boundary_edges=None):
+        """
+        Parameters
+        ----------
+        triangles_per_cell, max_index_bytes:
+            If grid is None, grid size is chosen by choose_grid_size with
+            these parameters.
+        collect_stats:
+            If True, search_points stores search counters in the
+            query_stats attribute. Can be changed later.
+        packed:
+            If True, triangle vertex coordinates are copied in the
+            tricoords array, of shape (NT, 6), so that testing a candidate
+            triangle reads 48 contiguous bytes, instead of 3 indices in
+            trivtx, and 6 coordinates scattered in x and y. This costs
+            48*NT bytes, compared to 16*NV + 12*NT bytes for the
+            triangulation itself (about 20*NT bytes for NV ~ NT/2), so
+            about 2.4 times the triangulation memory.
+        barycentric:
+            If True, inclusion of a point in a triangle is tested from its
+            barycentric factors det + x*gradx + y*grady (see
+            barycentric_locate), instead of the winding number of the
+            triangle vertices, and search_points can return the factors.
+            A point is on an edge if it is at a distance less than
+            edge_width of the line of the edge.
+        interpolator:
+            Tuple (gradx, grady, det) as returned by compute_interpolator,
+            for barycentric. TG.interpolator if None. Arrays are shared, not
+            copied, so they can be the arrays of a
+            TriangulationInterpolator.
+        boundary_edges:
+            Required by search_nearest, to project points out of the
+            triangulation on their nearest boundary edge. Boundary edges are
+            indexed with build_boundary_index.
+        overlap:
+            If True, triangles are associated only to cells they overlap,
+            instead of all the cells of their bounding box. Index build is
+            slower, but the index is smaller, and less triangles are tested
+            per point. The number of (triangle, cell) pairs removed from the
+            index is stored in the `pruned` attribute.
+        neighbours:
+            Triangle neighbours, as computed by compute_neighbours. Required
+            to search points from hints (see search_points).
+        max_walk:
+            Maximal number of triangles visited when walking from a hint,
+            before falling back to the grid search.
+        num_threads:
+            Number of threads used to build the index, see
+            build_cell_to_triangle.
+        """
 
         cdef:
             double dist, edge_min, edge_max
 
-        bb = compute_bounding_box(TG)
-        edge_min, edge_max = compute_edge_min_max(TG)
+        bb = TG.bounding_box
+        edge_min, edge_max = TG.edge_min_max
 
         if edge_width < 0:
             edge_width = choose_edge_width(edge_min)
 
         if grid is None:
-            nx = max(1, int((bb.xmax - bb.xmin) / (edge_max * 10)))
-            ny = max(1, int((bb.ymax - bb.ymin) / (edge_max * 10)))
+            nx, ny = choose_grid_size(TG, edge_width, triangles_per_cell,
+                                      max_index_bytes)
             dist = choose_bb_grid_distance(edge_width)
             grid = build_grid(TG, nx, ny, dist)
         else:
@@ -208,6 +723,31 @@ cdef class TriangulationLocator:
         self.TG = TG
         self.edge_width = edge_width
         self.edge_width_square = edge_width**2
+        self.overlap = overlap
+
+        if neighbours is not None and neighbours.shape[0] != TG.NT:
+            raise ValueError('Expected {} triangle neighbours, got {}'
+                             .format(TG.NT, neighbours.shape[0]))
+        self.neighbours = neighbours
+        self.max_walk = max_walk
+        self.collect_stats = collect_stats
+        self.query_stats = None
+
+        self.packed = packed
+        if packed:
+            self.tricoords = compute_packed_coordinates(TG)
+        else:
+            self.tricoords = None
+
+        self.set_boundary_edges(boundary_edges)
+
+        self.barycentric = barycentric
+        if not barycentric:
+            self.gradx, self.grady, self.det = None, None, None
+        elif interpolator is None:
+            self.gradx, self.grady, self.det = TG.interpolator
+        else:
+            self.gradx, self.grady, self.det = interpolator
 
         if bounds is None:
             bounds = np.empty((TG.NT, 4), dtype='int32')
@@ -215,73 +755,689 @@ cdef class TriangulationLocator:
             assert bounds.shape == (TG.NT, 4)
             bounds = bounds
 
-        build_triangle_to_cell(bounds, TG, self.grid, edge_width)
+        build_triangle_to_cell(bounds, TG, self.grid, edge_width,
+                               num_threads=num_threads)
+        self.bounds = bounds
+
+        if overlap:
+            self.celltri, self.celltri_idx = build_cell_to_triangle(
+                bounds, grid.nx, grid.ny, TG, grid, edge_width,
+                num_threads=num_threads)
+            self.pruned = count_cell_triangle_pairs(bounds) \
+                        - self.celltri.shape[0]
+        else:
+            self.celltri, self.celltri_idx = build_cell_to_triangle(
+                bounds, grid.nx, grid.ny, num_threads=num_threads)
+            self.pruned = 0
+
+    def set_boundary_edges(TriangulationLocator self,
+                           BoundaryEdges boundary_edges):
+        """
+        Set and index boundary edges used by search_nearest, or remove them
+        if boundary_edges is None.
+        """
+        if boundary_edges is None:
+            self.boundary_vertices = None
+            self.boundary_triangle = None
+            self.boundary_grid = None
+            self.celledge = None
+            self.celledge_idx = None
+        else:
+            self.boundary_vertices = boundary_edges.vertices
+            self.boundary_triangle = boundary_edges.triangle
+            self.index_boundary_edges()
+
+    def index_boundary_edges(TriangulationLocator self):
+        """
+        (Re)build boundary edges index, for example after vertices moved.
+        """
+        self.boundary_grid, self.celledge, self.celledge_idx = \
+            build_boundary_index(self.TG, self.boundary_vertices)
+
+    def update(TriangulationLocator self, double[:] x, double[:] y,
+               moved=None):
+        """
+        Update the locator after triangulation vertices moved to (x, y).
+
+        Parameters
+        ----------
+        moved:
+            Optional array of NV booleans, flagging vertices that moved.
+            Only triangles having a moved vertex are updated. Default is to
+            update all triangles.
+
+        The grid and edge_width are kept, so the grid must still be around
+        the triangulation (see check_grid), otherwise ValueError is raised
+        and neither the locator nor the triangulation is modified. Cell
+        ranges of updated triangles are recomputed, and celltri is patched
+        only for triangles whose cell range changed. With overlap, the cells
+        a triangle overlaps may change inside the same range, so celltri is
+        patched for all updated triangles. The boundary edges index is
+        rebuilt.
+
+        Return the number of triangles patched in celltri.
+        """
+        cdef:
+            Grid2D grid = self.grid
+
+        # Check new coordinates before modifying the triangulation, which
+        # is left unchanged if they do not fit the grid.
+        check_coordinates(self.TG, x, y)
+        triangles = compute_moved_triangles(self.TG, moved)
+        xa = np.asarray(x)
+        ya = np.asarray(y)
+        check_grid(grid, BoundingBox(xa.min(), xa.max(), ya.min(), ya.max()),
+                   self.edge_width)
+
+        set_coordinates(self.TG, x, y)
+        if self.packed:
+            np.asarray(self.tricoords)[triangles] = \
+                compute_packed_coordinates(self.TG, triangles)
+        if self.barycentric:
+            update_interpolator(self.TG, triangles,
+                                self.gradx, self.grady, self.det)
+        if self.boundary_vertices is not None:
+            self.index_boundary_edges()
+
+        bounds = np.asarray(self.bounds)
+        old_bounds = bounds[triangles]
+        build_triangle_to_cell(self.bounds, self.TG, grid, self.edge_width,
+                               triangles)
+        new_bounds = bounds[triangles]
+
+        if not self.overlap:
+            changed = np.any(old_bounds != new_bounds, axis=1)
+            triangles = triangles[changed]
+            old_bounds = old_bounds[changed]
+            new_bounds = new_bounds[changed]
+
+        if triangles.shape[0] == 0:
+            return 0
+
+        if self.overlap:
+            size = self.celltri.shape[0]
+            self.celltri, self.celltri_idx = patch_cell_to_triangle(
+                self.celltri, self.celltri_idx, triangles, old_bounds,
+                new_bounds, grid.nx, grid.ny, self.TG, grid, self.edge_width)
+            self.pruned += count_cell_triangle_pairs(new_bounds) \
+                         - count_cell_triangle_pairs(old_bounds) \
+                         - (self.celltri.shape[0] - size)
+        else:
+            self.celltri, self.celltri_idx = patch_cell_to_triangle(
+                self.celltri, self.celltri_idx, triangles, old_bounds,
+                new_bounds, grid.nx, grid.ny)
+
+        return triangles.shape[0]
+
+    cdef void get_triangle(TriangulationLocator self, int T,
+                           CTriangle2D* ABC) nogil:
+        """
+        Same as Triangulation2D.get, reading tricoords if packed.
+        """
+        if self.packed:
+            ABC.A.x = self.tricoords[T, 0]
+            ABC.A.y = self.tricoords[T, 1]
+            ABC.B.x = self.tricoords[T, 2]
+            ABC.B.y = self.tricoords[T, 3]
+            ABC.C.x = self.tricoords[T, 4]
+            ABC.C.y = self.tricoords[T, 5]
+        else:
+            self.TG.get(T, ABC)
 
-        self.celltri, self.celltri_idx = build_cell_to_triangle(
-                                             bounds, grid.nx, grid.ny)
+    cdef int search_point(TriangulationLocator self, double x, double y,
+                          CSearchStats* stats, double* factors) nogil:
+        """
+        Return index of the triangle containing point (x, y), or OUT_IDX.
 
-    cpdef int[:] search_points(TriangulationLocator self,
-                               double[:] xpoints, double[:] ypoints,
-                               int[:] triangles=None):
+        If stats is not NULL, search counters are added to it. If factors is
+        not NULL (barycentric only), the 3 barycentric factors of the point
+        in the triangle are stored in it.
+        """
         cdef:
-            int IP, IT, IT0, IT1, T, cell_index
-            int NP = xpoints.shape[0]
-            Cell2D cell = Cell2D()
-            CTriangle2D ABC
-            CPoint2D A, B, C, P
+            int ix, iy, cell_index
+            CPoint2D P
 
-        if triangles is None:
-            triangles = np.empty(NP, dtype='int32')
+        P.x = x
+        P.y = y
 
-        triangle2d_set(&ABC, &A, &B, &C)
+        # Find cell.
+        self.grid.c_find_ix_iy(&P, &ix, &iy)
 
-        for IP in range(NP):
-            # Extract point.
-            P.x = xpoints[IP]
-            P.y = ypoints[IP]
+        # Check if cell is in grid.
+        if not 0 <= ix < self.grid.nx or not 0 <= iy < self.grid.ny:
+            if stats != NULL:
+                stats.out_of_grid = True
+            return OUT_IDX
 
-            # Find cell.
-            self.grid.c_find_cell(cell, &P)
+        cell_index = compute_index(self.grid.nx, ix, iy)
 
-            # Check if cell is in grid.
-            if not 0 <= cell.ix < self.grid.nx or \
-               not 0 <= cell.iy < self.grid.ny:
-                triangles[IP] = OUT_IDX
-                continue
+        return self.search_candidates(self.celltri,
+                                      self.celltri_idx[cell_index],
+                                      self.celltri_idx[cell_index+1], &P,
+                                      stats, factors)
 
-            cell_index = compute_index(self.grid.nx, cell.ix, cell.iy)
+    cdef int barycentric_locate(TriangulationLocator self, int T,
+                                CPoint2D* P, double* factors) nogil:
+        """
+        Locate P relatively to triangle T from its barycentric factors
+        det + x*gradx + y*grady.
 
-            # Loop on cell triangles.
-            IT0 = self.celltri_idx[cell_index]
-            IT1 = self.celltri_idx[cell_index+1]
+        Return INSIDE if T includes P, ON_EDGE if P is out of T, but at a
+        distance less than edge_width of the line of an edge, else the
+        index k (0, 1 or 2) of an edge separating P from T.
+
+        If T includes P (INSIDE or ON_EDGE) and factors is not NULL, the
+        3 barycentric factors are stored in it.
+        """
+        cdef:
+            int k, V
+            double l[3]
+            double sign
+            bint on_edge = False
+
+        for V in range(3):
+            l[V] = self.det[T, V] + P.x*self.gradx[T, V] \
+                                  + P.y*self.grady[T, V]
+
+        # Factors sum to -1 for clockwise triangles (see
+        # compute_interpolator).
+        sign = 1. if l[0] + l[1] + l[2] > 0 else -1.
+
+        # Edge k is opposite to vertex (k+2) % 3.
+        for k in range(3):
+            V = (k + 2) % 3
+            if sign*l[V] < 0:
+                # Distance to the edge line is |l[V]| / |grad(l[V])|.
+                if l[V]*l[V] > self.edge_width_square * (
+                        self.gradx[T, V]*self.gradx[T, V] +
+                        self.grady[T, V]*self.grady[T, V]):
+                    return k
+                on_edge = True
+
+        if factors != NULL:
+            factors[0] = l[0]
+            factors[1] = l[1]
+            factors[2] = l[2]
+
+        return ON_EDGE if on_edge else INSIDE
+
+    cdef int search_candidates(TriangulationLocator self, int[:] candidates,
+                               Py_ssize_t IT0, Py_ssize_t IT1,
+                               CPoint2D* P, CSearchStats* stats,
+                               double* factors) nogil:
+        """
+        Return the triangle among candidates[IT0:IT1] containing P, or
+        OUT_IDX.
+
+        If barycentric, this is the first candidate for which
+        barycentric_locate is INSIDE or ON_EDGE.
+
+        This is the first candidate including P, or having P on one of its
+        edges (triangle2d_includes_point2d with edge_width_square). If
+        edge_width is 0, triangle2d_includes_point2d does not test edges,
+        so this is the first candidate including P, else the first candidate
+        having P on one of its edges (triangle2d_on_edges). Both are
+        searched in a single pass over candidates, remembering the first
+        edge candidate while searching an including one.
+
+        Counters are only updated when returning, to keep the loop unchanged
+        when stats is NULL.
+        """
+        cdef:
+            Py_ssize_t IT
+            int T
+            int edge_T = OUT_IDX
+            bint test_edges = self.edge_width_square != 0
+            int location
+            CTriangle2D ABC
+            CPoint2D A, B, C
+
+        if self.barycentric:
             for IT in range(IT0, IT1):
-                T = self.celltri[IT]
-                self.TG.get(T, &ABC)
+                T = candidates[IT]
+                location = self.barycentric_locate(T, P, factors)
+                if location == INSIDE or location == ON_EDGE:
+                    if stats != NULL:
+                        stats.tested += IT - IT0 + 1
+                        stats.on_edge = location == ON_EDGE
+                    return T
+
+            if stats != NULL:
+                stats.tested += IT1 - IT0
+
+            return OUT_IDX
+
+        triangle2d_set(&ABC, &A, &B, &C)
+
+        # Loop on candidate triangles.
+        for IT in range(IT0, IT1):
+            T = candidates[IT]
+            self.get_triangle(T, &ABC)
+
+            # Check if triangle contains point.
+            if triangle2d_includes_point2d(&ABC, P, 0):
+                if stats != NULL:
+                    stats.tested += IT - IT0 + 1
+                return T
+
+            # Check if point is on triangle edges, only until a first edge
+            # candidate is found.
+            if edge_T == OUT_IDX and \
+               triangle2d_on_edges(&ABC, P, self.edge_width_square) != -1:
+                if test_edges:
+                    if stats != NULL:
+                        stats.tested += IT - IT0 + 1
+                        stats.on_edge = True
+                    return T
+                edge_T = T
+
+        if stats != NULL:
+            stats.tested += IT1 - IT0
+            stats.on_edge = edge_T != OUT_IDX
+
+        return edge_T
+
+    cdef int walk(TriangulationLocator self, double x, double y, int T,
+                  CSearchStats* stats, double* factors) nogil:
+        """
+        Walk from triangle T toward point (x, y), crossing at each step an
+        edge separating the point from the triangle.
+
+        factors is only set if barycentric (see search_point).
+
+        Return index of the triangle containing the point, or OUT_IDX if the
+        walk leaves the triangulation or exceeds max_walk steps.
+        """
+        cdef:
+            int step, k, location
+            CTriangle2D ABC
+            CPoint2D A, B, C, P
 
-                # Check if triangle contains point.
-                if triangle2d_includes_point2d(&ABC, &P, self.edge_width_square):
-                    triangles[IP] = T
-                    break
+        triangle2d_set(&ABC, &A, &B, &C)
+        P.x = x
+        P.y = y
+
+        for step in range(self.max_walk):
+            if stats != NULL:
+                stats.tested += 1
+
+            if self.barycentric:
+                location = self.barycentric_locate(T, &P, factors)
+                if location == INSIDE or location == ON_EDGE:
+                    if stats != NULL:
+                        stats.on_edge = location == ON_EDGE
+                    return T
+                T = self.neighbours[T, location]
+                if T == -1:
+                    return OUT_IDX
+                continue
 
+            self.get_triangle(T, &ABC)
+
+            if triangle2d_includes_point2d(&ABC, &P, self.edge_width_square):
+                if stats != NULL:
+                    stats.on_edge = \
+                        not triangle2d_includes_point2d(&ABC, &P, 0)
+                return T
+
+            # Edge k separates P from the triangle if P and the opposite
+            # vertex are on different sides of it.
+            if is_left(&A, &B, &P) * is_left(&A, &B, &C) < 0:
+                k = 0
+            elif is_left(&B, &C, &P) * is_left(&B, &C, &A) < 0:
+                k = 1
+            elif is_left(&C, &A, &P) * is_left(&C, &A, &B) < 0:
+                k = 2
             else:
-                # Not found inside triangles, check if point is on triangle edges.
-                for IT in range(IT0, IT1):
-                    T = self.celltri[IT]
-                    self.TG.get(T, &ABC)
+                return OUT_IDX
+
+            T = self.neighbours[T, k]
+            if T == -1:
+                return OUT_IDX
 
-                    if triangle2d_on_edges(&ABC, &P, self.edge_width_square) != -1:
-                        triangles[IP] = T
-                        break
+        return OUT_IDX
+
+    cdef int search_point_hint(TriangulationLocator self, double x, double y,
+                               int hint, CSearchStats* stats,
+                               double* factors) nogil:
+        """
+        Same as search_point, but first walk from triangle hint.
+        """
+        cdef:
+            int T
 
+        if 0 <= hint < self.TG.NT:
+            T = self.walk(x, y, hint, stats, factors)
+            if T != OUT_IDX:
+                return T
+
+        return self.search_point(x, y, stats, factors)
+
+    cpdef int[:] search_points(TriangulationLocator self,
+                               floating[:] xpoints, floating[:] ypoints,
+                               int[:] triangles=None, int num_threads=1,
+                               int[:] hints=None, order=None,
+                               double[:,::1] factors=None):
+        """
+        Find triangles containing points (xpoints, ypoints).
+
+        xpoints and ypoints are both float32 or float64 arrays. float32
+        coordinates are converted to float64 point by point, not copied.
+
+        Parameters
+        ----------
+        triangles:
+            Optional output array, of size NP.
+        num_threads:
+            Number of threads to split the points across. Default is 1,
+            which searches points serially with the GIL held. A value
+            less or equal to 0 uses all the OpenMP threads. Each point is
+            searched independently, so result does not depend on
+            num_threads.
+        hints:
+            Optional array of size NP, for example triangles found at a
+            previous call for points that moved a little. The search walks
+            from triangle hints[IP] across triangle neighbours, and falls
+            back to the grid if the walk fails or hints[IP] is -1. A point
+            on an edge shared by several triangles may be found in another
+            triangle than without hints. hints may be the triangles array.
+        order:
+            If 'hilbert' or 'morton', points are searched in the order of
+            their cell along this space filling curve (see
+            space_filling_order), so that consecutive searches access close
+            triangles in memory. This is useful for points in random order.
+            Result is the same, in the points order.
+        factors:
+            Optional output array of shape (NP, 3), only if barycentric.
+            Barycentric factors of points found are stored in it, as
+            computed by TriangulationInterpolator.set_points. Rows of points
+            not found are not modified.
+
+        If collect_stats is True, search counters of this call are stored in
+        query_stats (see search_stats_to_dict), else query_stats is None.
+        """
+        cdef:
+            int I, IP
+            int NP = xpoints.shape[0]
+            bint has_hints = hints is not None
+            bint has_order = order is not None
+            Py_ssize_t[:] perm
+            int tid
+            CSearchStats* stats = NULL
+            CSearchStats* point_stats = NULL
+            Py_ssize_t[:,:] counters
+            bint has_factors = factors is not None
+            double* point_factors = NULL
+
+        if triangles is None:
+            triangles = np.empty(NP, dtype='int32')
+
+        if has_factors:
+            if not self.barycentric:
+                raise ValueError('Computing factors requires a barycentric '
+                                 'locator')
+            if factors.shape[0] != NP:
+                raise ValueError('Expected {} rows of factors, got {}'
+                                 .format(NP, factors.shape[0]))
+
+        if has_hints:
+            if self.neighbours is None:
+                raise ValueError('Searching points from hints requires '
+                                 'triangle neighbours, see compute_neighbours')
+            if hints.shape[0] != NP:
+                raise ValueError('Expected {} hints, got {}'
+                                 .format(NP, hints.shape[0]))
+
+        if has_order:
+            perm = self.space_filling_order(xpoints, ypoints, order)
+
+        if num_threads <= 0:
+            num_threads = openmp.omp_get_max_threads()
+
+        # Counters of the current point and counters of each thread, so that
+        # threads don't share them.
+        if self.collect_stats:
+            stats = <CSearchStats*> calloc(num_threads * STATS_ROW,
+                                           sizeof(CSearchStats))
+            if stats == NULL:
+                raise MemoryError()
+            counters = np.zeros((num_threads, STATS_ROW), dtype=np.intp)
+
+        if num_threads == 1:
+            point_stats = stats
+            for I in range(NP):
+                IP = perm[I] if has_order else I
+                if has_factors:
+                    point_factors = &factors[IP, 0]
+                if has_hints:
+                    triangles[IP] = self.search_point_hint(
+                        xpoints[IP], ypoints[IP], hints[IP], point_stats,
+                        point_factors)
                 else:
-                    triangles[IP] = OUT_IDX
+                    triangles[IP] = self.search_point(
+                        xpoints[IP], ypoints[IP], point_stats, point_factors)
+                if stats != NULL:
+                    add_search_stats(point_stats, &counters[0, 0])
+
+        else:
+            for I in prange(NP, nogil=True, num_threads=num_threads,
+                            schedule='static'):
+                IP = perm[I] if has_order else I
+                tid = threadid()
+                point_stats = &stats[tid*STATS_ROW] if stats != NULL else NULL
+                point_factors = &factors[IP, 0] if has_factors else NULL
+                if has_hints:
+                    triangles[IP] = self.search_point_hint(
+                        xpoints[IP], ypoints[IP], hints[IP], point_stats,
+                        point_factors)
+                else:
+                    triangles[IP] = self.search_point(
+                        xpoints[IP], ypoints[IP], point_stats, point_factors)
+                if stats != NULL:
+                    add_search_stats(point_stats, &counters[tid, 0])
+
+        if stats != NULL:
+            free(stats)
+            self.query_stats = search_stats_to_dict(counters, triangles, NP)
+        else:
+            self.query_stats = None
 
         return triangles
 
+    cdef int project_point(TriangulationLocator self, double x, double y,
+                           double* xq, double* yq, double* distance) nogil:
+        """
+        Return the boundary edge nearest to point (x, y), or -1 if there is
+        no boundary edge. Set (xq, yq) to the nearest point of the edge, and
+        distance to the distance from the point to it.
+
+        Cells of boundary_grid are visited ring by ring around the cell of
+        the point (clamped to the grid), until the cells not visited yet
+        are farther than the nearest edge found: an edge not found yet is in
+        these cells only.
+        """
+        cdef:
+            int nx = self.boundary_grid.nx, ny = self.boundary_grid.ny
+            double xmin = self.boundary_grid.xmin, dx = self.boundary_grid.dx
+            double ymin = self.boundary_grid.ymin, dy = self.boundary_grid.dy
+            int ix0, iy0, ix, iy, ix_step, r, E, best = -1
+            int ix_min, ix_max, iy_min, iy_max
+            Py_ssize_t IE, cell
+            double best_d2 = INFINITY, d2, bound2
+            # Visited cells box, and grid box.
+            double vxmin, vxmax, vymin, vymax
+            double gxmax = xmin + nx*dx, gymax = ymin + ny*dy
+            CPoint2D P, A, B, R
+            CSegment2D AB
+            CVector2D u
+
+        P.x = x
+        P.y = y
+        segment2d_set(&AB, &A, &B)
+
+        self.boundary_grid.c_find_ix_iy(&P, &ix0, &iy0)
+        ix0 = min(max(ix0, 0), nx-1)
+        iy0 = min(max(iy0, 0), ny-1)
+
+        for r in range(max(nx, ny)):
+            ix_min = max(ix0-r, 0)
+            ix_max = min(ix0+r, nx-1)
+            iy_min = max(iy0-r, 0)
+            iy_max = min(iy0+r, ny-1)
+
+            # Cells of ring r, in the grid: all cells of its first and last
+            # rows, and first and last cells of other rows.
+            for iy in range(iy_min, iy_max+1):
+                if iy == iy0-r or iy == iy0+r or r == 0:
+                    ix = ix_min
+                    ix_step = 1
+                else:
+                    ix = ix0 - r if ix0 - r >= 0 else ix0 + r
+                    ix_step = 2*r
+                while ix <= ix_max:
+                    cell = compute_index(nx, ix, iy)
+                    for IE in range(self.celledge_idx[cell],
+                                    self.celledge_idx[cell+1]):
+                        E = self.celledge[IE]
+                        A.x = self.TG.x[self.boundary_vertices[E, 0]]
+                        A.y = self.TG.y[self.boundary_vertices[E, 0]]
+                        B.x = self.TG.x[self.boundary_vertices[E, 1]]
+                        B.y = self.TG.y[self.boundary_vertices[E, 1]]
+                        subtract_points2d(&u, &B, &A)
+                        d2 = segment2d_project_point2d(&AB, &u, &P, &R)
+                        # Smallest edge index among equidistant edges,
+                        # whatever the ring they are found in.
+                        if d2 < best_d2 or (d2 == best_d2 and E < best):
+                            best = E
+                            best_d2 = d2
+                            xq[0] = R.x
+                            yq[0] = R.y
+                    ix += ix_step
+
+            # Square distance from the point to the cells not visited yet,
+            # which are in the grid box, out of the visited box.
+            vxmin = xmin + ix_min*dx
+            vxmax = xmin + (ix_max+1)*dx
+            vymin = ymin + iy_min*dy
+            vymax = ymin + (iy_max+1)*dy
+            bound2 = INFINITY
+            if ix_min > 0:
+                bound2 = min(bound2, box_square_distance(
+                    x, y, xmin, vxmin, ymin, gymax))
+            if ix_max < nx-1:
+                bound2 = min(bound2, box_square_distance(
+                    x, y, vxmax, gxmax, ymin, gymax))
+            if iy_min > 0:
+                bound2 = min(bound2, box_square_distance(
+                    x, y, xmin, gxmax, ymin, vymin))
+            if iy_max < ny-1:
+                bound2 = min(bound2, box_square_distance(
+                    x, y, xmin, gxmax, vymax, gymax))
+
+            if best != -1 and best_d2 < bound2:
+                break
+            if bound2 == INFINITY:
+                break
+
+        distance[0] = sqrt(best_d2)
+        return best
+
+    def search_nearest(TriangulationLocator self, floating[:] xpoints,
+                       floating[:] ypoints, int[:] triangles=None,
+                       double[:] distance=None, double[:] xproj=None,
+                       double[:] yproj=None, int num_threads=1):
+        """
+        Same as search_points, but points out of the triangulation are
+        projected on their nearest boundary edge. Requires boundary_edges.
+
+        Parameters
+        ----------
+        triangles, distance, xproj, yproj:
+            Optional output arrays, of size NP.
+        num_threads:
+            See search_points.
+
+        Return triangles, distance, xproj, yproj. For points out of the
+        triangulation, triangles is the triangle of the nearest boundary
+        edge, (xproj, yproj) is the nearest point of the edge, and distance
+        the distance to it. Other points have a distance of 0, and are
+        their own projection.
+        """
+        cdef:
+            int IP, E
+            int NP = xpoints.shape[0]
+
+        if self.boundary_vertices is None:
+            raise ValueError('Searching nearest boundary edges requires '
+                             'boundary_edges')
+
+        if distance is None:
+            distance = np.empty(NP, dtype='d')
+        if xproj is None:
+            xproj = np.empty(NP, dtype='d')
+        if yproj is None:
+            yproj = np.empty(NP, dtype='d')
+
+        # Python call, which selects search_points float32 or float64
+        # version.
+        triangles = (<object> self).search_points(
+            xpoints, ypoints, triangles=triangles, num_threads=num_threads)
+
+        if num_threads <= 0:
+            num_threads = openmp.omp_get_max_threads()
+
+        for IP in prange(NP, nogil=True, num_threads=num_threads,
+                         schedule='dynamic', chunksize=64):
+            if triangles[IP] != OUT_IDX:
+                distance[IP] = 0.
+                xproj[IP] = xpoints[IP]
+                yproj[IP] = ypoints[IP]
+            else:
+                E = self.project_point(xpoints[IP], ypoints[IP], &xproj[IP],
+                                       &yproj[IP], &distance[IP])
+                if E != -1:
+                    triangles[IP] = self.boundary_triangle[E]
+                else:
+                    xproj[IP] = NAN
+                    yproj[IP] = NAN
+
+        return (np.asarray(triangles), np.asarray(distance),
+                np.asarray(xproj), np.asarray(yproj))
+
+    def space_filling_order(TriangulationLocator self, floating[:] xpoints,
+                            floating[:] ypoints, curve='hilbert'):
+        """
+        Return the permutation sorting points by the index of their grid
+        cell along a space filling curve, 'hilbert' or 'morton'.
+        """
+        keys = self.grid.cell_keys(xpoints, ypoints, curve)
+        return np.argsort(keys, kind='stable').astype(np.intp)
+
+    def statistics(TriangulationLocator self):
+        """
+        Return a dictionary of index statistics:
+
+            nx, ny: grid size.
+            ncell: number of cells.
+            mean, max: mean and maximal number of triangles per cell.
+            histogram: number of cells having 0, 1, 2, ... triangles.
+            empty_fraction: fraction of cells without triangles.
+            index_bytes: size of celltri, celltri_idx, bounds and
+                tricoords.
+        """
+        arrays = [self.celltri, self.celltri_idx, self.bounds]
+        if self.packed:
+            arrays.append(self.tricoords)
+        index_bytes = sum(np.asarray(a).nbytes for a in arrays)
+        stats = index_statistics(np.diff(self.celltri_idx), index_bytes)
+        stats['nx'] = self.grid.nx
+        stats['ny'] = self.grid.ny
+        return stats
+
     def cell_to_triangles(TriangulationLocator self, int ix, int iy):
         cdef:
             int cell_index
-            int IT, IT0, IT1
+            Py_ssize_t IT, IT0, IT1
 
         cell_index = compute_index(self.grid.nx, ix, iy)
 
@@ -0,0 +1,950 @@
+"""
+Read triangle meshes from Gmsh, Triangle and VTK legacy files.
+
+Each reader returns a Triangulation2D and the boundary edge labels, as an
+array of shape (NR, 3) storing V0, V1 and label, as expected by
+BoundaryEdges.add_label (or None if the file has no boundary edges):
+
+    TG, label = read_gmsh('mesh.msh')
+    intern_edges, boundary_edges, edge_map = build_edges(TG.trivtx, TG.NV)
+    boundary_edges.add_label(label)
+
+ASCII files are parsed in C (strtod and strtoll), directly into the arrays
+of the triangulation. Binary files are memory-mapped (copy-on-write), and
+arrays are views on the file pages when their layout allows it: vertex
+coordinates of Gmsh 2.2 binary files are not copied. Other arrays are
+built with one numpy operation per file block.
+
+Vertex z coordinates are ignored. Other elements than triangles and
+boundary lines (points, quadrangles, second order elements...) are skipped.
+
+"""
+
+import os
+
+import numpy as np
+from libc.stdlib cimport strtod, strtoll
+from libc.string cimport memcmp
+from cpython.bytes cimport PyBytes_AS_STRING
+
+from .triangulation2d cimport Triangulation2D
+
+
+# Number of nodes of Gmsh element types 1 to 31.
+GMSH_NODES = [0, 2, 3, 4, 4, 8, 6, 5, 3, 6, 9, 10, 27, 18, 14, 1, 8, 20, 15,
+              13, 9, 10, 12, 15, 15, 21, 4, 5, 6, 20, 35, 56]
+
+GMSH_LINE = 1
+GMSH_TRIANGLE = 2
+
+VTK_LINE = 3
+VTK_POLY_LINE = 4
+VTK_TRIANGLE = 5
+
+VTK_DTYPES = {
+    b'bit': None,
+    b'char': 'i1', b'unsigned_char': 'u1',
+    b'short': '>i2', b'unsigned_short': '>u2',
+    b'int': '>i4', b'unsigned_int': '>u4',
+    b'long': '>i8', b'unsigned_long': '>u8',
+    b'vtktypeint64': '>i8', b'vtktypeuint64': '>u8', b'vtkIdType': '>i4',
+    b'float': '>f4', b'double': '>f8',
+}
+
+
+cdef inline bint is_space(char c) nogil:
+    return c == b' ' or c == b'\n' or c == b'\r' or c == b'\t'
+
+
+cdef class MeshReader:
+    """
+    Cursor on a mesh file, reading ASCII tokens and binary arrays.
+
+    ASCII files are read in memory (bytes are NUL terminated, as required by
+    strtod), binary files are memory-mapped.
+    """
+
+    cdef:
+        object filename
+        object buf
+        const unsigned char[:] view
+        const char* data
+        Py_ssize_t size
+        Py_ssize_t pos
+        bint comments
+        bint mapped
+
+    def __init__(MeshReader self, filename, bint binary=False,
+                 bint comments=False):
+        """
+        comments:
+            If True, '#' starts a comment, up to the end of the line.
+        """
+        self.filename = filename
+        self.comments = comments
+        self.pos = 0
+
+        self.mapped = binary and os.path.getsize(filename) > 0
+        if self.mapped:
+            self.buf = np.memmap(filename, dtype='uint8', mode='c')
+            self.view = self.buf
+            self.data = <const char*> &self.view[0]
+            self.size = self.view.shape[0]
+        else:
+            with open(filename, 'rb') as f:
+                self.buf = f.read()
+            self.data = PyBytes_AS_STRING(self.buf)
+            self.size = len(self.buf)
+
+    def error(MeshReader self, what):
+        """
+        Return a ValueError telling what was expected at current position.
+        """
+        cdef:
+            Py_ssize_t I
+            int line = 1
+        for I in range(min(self.pos, self.size)):
+            line += self.data[I] == b'\n'
+        return ValueError('{}, line {}: expected {}'
+                          .format(self.filename, line, what))
+
+    cdef void skip_space(MeshReader self):
+        while self.pos < self.size:
+            if is_space(self.data[self.pos]):
+                self.pos += 1
+            elif self.comments and self.data[self.pos] == b'#':
+                self.skip_line()
+            else:
+                break
+
+    cpdef void skip_line(MeshReader self):
+        """
+        Move after the next end of line.
+        """
+        while self.pos < self.size and self.data[self.pos] != b'\n':
+            self.pos += 1
+        self.pos += 1
+
+    cdef bint is_last_token(MeshReader self):
+        """
+        Return True if the token at current position ends a memory-mapped
+        file.
+
+        strtod and strtoll stop at the space after a token, but a last
+        token of a memory-mapped file is not followed by a space nor a NUL,
+        so it is parsed from a copy.
+        """
+        cdef:
+            Py_ssize_t end = self.pos
+        if not self.mapped:
+            return False
+        while end < self.size and not is_space(self.data[end]):
+            end += 1
+        return end == self.size
+
+    cdef double read_double(MeshReader self) except *:
+        cdef:
+            bytes token
+            const char* start
+            char* end
+            double value
+
+        self.skip_space()
+        if self.pos >= self.size:
+            raise self.error('a number')
+        if self.is_last_token():
+            token = self.data[self.pos:self.size]
+            start = token
+        else:
+            start = self.data + self.pos
+        value = strtod(start, &end)
+        if end == start:
+            raise self.error('a number')
+        self.pos += end - start
+        return value
+
+    cdef long long read_int(MeshReader self) except *:
+        cdef:
+            bytes token
+            const char* start
+            char* end
+            long long value
+
+        self.skip_space()
+        if self.pos >= self.size:
+            raise self.error('an integer')
+        if self.is_last_token():
+            token = self.data[self.pos:self.size]
+            start = token
+        else:
+            start = self.data + self.pos
+        value = strtoll(start, &end, 10)
+        if end == start:
+            raise self.error('an integer')
+        self.pos += end - start
+        return value
+
+    def integer(MeshReader self):
+        return self.read_int()
+
+    def number(MeshReader self):
+        return self.read_double()
+
+    def tell(MeshReader self):
+        return self.pos
+
+    def seek(MeshReader self, Py_ssize_t pos):
+        self.pos = pos
+
+    def peek(MeshReader self):
+        """
+        Return the next word, without moving.
+        """
+        cdef:
+            Py_ssize_t pos = self.pos
+        word = self.word()
+        self.pos = pos
+        return word
+
+    def word(MeshReader self):
+        """
+        Return the next word, or b'' at the end of the file.
+        """
+        cdef:
+            Py_ssize_t start
+
+        self.skip_space()
+        start = self.pos
+        while self.pos < self.size and not is_space(self.data[self.pos]):
+            self.pos += 1
+        return self.data[start:self.pos]
+
+    def line(MeshReader self):
+        """
+        Return the rest of the current line, stripped, and move after it.
+        """
+        cdef:
+            Py_ssize_t start = self.pos
+
+        self.skip_line()
+        return self.data[start:min(self.pos, self.size)].strip()
+
+    def expect(MeshReader self, word):
+        if self.word() != word:
+            raise self.error(repr(word.decode()))
+
+    def skip_to(MeshReader self, word):
+        """
+        Move after the next line starting with word (or after word, if it
+        is the next one, as after binary data).
+        """
+        cdef:
+            const char* w = word
+            Py_ssize_t n = len(word)
+            Py_ssize_t start
+
+        self.skip_space()
+        start = self.pos
+        while self.pos < self.size:
+            if (self.pos == start or self.data[self.pos-1] == b'\n') and \
+               self.pos + n <= self.size and \
+               memcmp(self.data + self.pos, w, n) == 0:
+                self.skip_line()
+                return
+            self.pos += 1
+        raise self.error(repr(word.decode()))
+
+    def array(MeshReader self, dtype, Py_ssize_t count):
+        """
+        Return a view on count binary values of dtype at current position,
+        and move after them.
+        """
+        dtype = np.dtype(dtype)
+        nbytes = count * dtype.itemsize
+        if self.pos + nbytes > self.size:
+            raise self.error('{} bytes of binary data'.format(nbytes))
+        if nbytes == 0:
+            return np.empty(0, dtype=dtype)
+        a = self.buf[self.pos:self.pos+nbytes].view(dtype)
+        self.pos += nbytes
+        return a
+
+    def doubles(MeshReader self, Py_ssize_t count):
+        """
+        Return an array of count ASCII numbers.
+        """
+        cdef:
+            Py_ssize_t I
+            double[:] values = np.empty(count, dtype='d')
+        for I in range(count):
+            values[I] = self.read_double()
+        return np.asarray(values)
+
+    def ints(MeshReader self, Py_ssize_t count):
+        """
+        Return an array of count ASCII integers.
+        """
+        cdef:
+            Py_ssize_t I
+            long long[:] values = np.empty(count, dtype=np.int64)
+        for I in range(count):
+            values[I] = self.read_int()
+        return np.asarray(values)
+
+
+def make_triangulation(tags, x, y, tri_nodes, line_nodes, line_label):
+    """
+    Return triangulation and label, from node tags and elements given by
+    node tags.
+    """
+    tags = np.asarray(tags, dtype=np.int64)
+    tri_nodes = np.asarray(tri_nodes, dtype=np.int64).reshape(-1, 3)
+    line_nodes = np.asarray(line_nodes, dtype=np.int64).reshape(-1, 2)
+
+    # Node tag to vertex index.
+    NV = tags.shape[0]
+    if NV > 0 and tags.min() < 0:
+        raise ValueError('Negative node tag {}'.format(tags.min()))
+    max_tag = max(tags.max(initial=-1), tri_nodes.max(initial=-1),
+                  line_nodes.max(initial=-1))
+    index = np.full(max_tag+2, -1, dtype='int32')
+    index[tags] = np.arange(NV, dtype='int32')
+
+    trivtx = index[tri_nodes]
+    vertices = index[line_nodes]
+    for nodes, vtx in [(tri_nodes, trivtx), (line_nodes, vertices)]:
+        unknown = (nodes < 0) | (vtx == -1)
+        if np.any(unknown):
+            raise ValueError('Element refers to unknown node {}'
+                             .format(nodes[unknown][0]))
+
+    if line_nodes.shape[0] > 0:
+        label = np.empty((line_nodes.shape[0], 3), dtype='int32')
+        label[:,:2] = vertices
+        label[:,2] = line_label
+    else:
+        label = None
+
+    TG = Triangulation2D(x, y, np.ascontiguousarray(trivtx))
+    return TG, label
+
+
+def read_triangle(filename):
+    """
+    Read a mesh written by Triangle, from files basename.node, basename.ele
+    and, if it exists, basename.edge.
+
+    filename is the basename, or the .node or .ele file name. Boundary
+    labels are the edge boundary markers of basename.edge (written by
+    triangle -e): edges with a non zero marker are boundary edges. Vertex
+    numbering may start at 0 or 1 (-z switch), as found in the .node file.
+    """
+    cdef:
+        MeshReader r
+        int V, T, k
+        int NV, dim, nattr, nmarker, NT, npt, NE
+        long long first, offset
+        double[:] x
+        double[:] y
+        int[:,:] trivtx
+        int[:,:] label
+
+    base, ext = os.path.splitext(filename)
+    if ext not in ('.node', '.ele'):
+        base = filename
+
+    r = MeshReader(base + '.node', comments=True)
+    NV = r.read_int()
+    dim = r.read_int()
+    nattr = r.read_int()
+    nmarker = r.read_int()
+    if dim != 2:
+        raise ValueError('{}.node: expected dimension 2, got {}'
+                         .format(base, dim))
+
+    x = np.empty(NV, dtype='d')
+    y = np.empty(NV, dtype='d')
+    offset = 0
+    for V in range(NV):
+        first = r.read_int()
+        if V == 0:
+            offset = first
+        x[V] = r.read_double()
+        y[V] = r.read_double()
+        for k in range(nattr + nmarker):
+            r.read_double()
+
+    r = MeshReader(base + '.ele', comments=True)
+    NT = r.read_int()
+    npt = r.read_int()
+    nattr = r.read_int()
+    if npt < 3:
+        raise ValueError('{}.ele: expected at least 3 nodes per triangle, '
+                         'got {}'.format(base, npt))
+
+    trivtx = np.empty((NT, 3), dtype='int32')
+    for T in range(NT):
+        r.read_int()
+        for k in range(3):
+            trivtx[T,k] = r.read_int() - offset
+        for k in range(npt - 3 + nattr):
+            r.read_double()
+
+    if np.any(np.asarray(trivtx) < 0) or np.any(np.asarray(trivtx) >= NV):
+        raise ValueError('{}.ele: vertex index out of range'.format(base))
+
+    TG = Triangulation2D(np.asarray(x), np.asarray(y), np.asarray(trivtx))
+
+    if not os.path.exists(base + '.edge'):
+        return TG, None
+
+    r = MeshReader(base + '.edge', comments=True)
+    NE = r.read_int()
+    nmarker = r.read_int()
+    if nmarker == 0:
+        return TG, None
+
+    label = np.empty((NE, 3), dtype='int32')
+    for V in range(NE):
+        r.read_int()
+        label[V,0] = r.read_int() - offset
+        label[V,1] = r.read_int() - offset
+        label[V,2] = r.read_int()
+
+    label_array = np.asarray(label)
+    return TG, label_array[label_array[:,2] != 0]
+
+
+def read_gmsh(filename):
+    """
+    Read a Gmsh mesh file, in format 2.2 or 4.1, ASCII or binary.
+
+    Triangles (element type 2) make the triangulation. Boundary labels are
+    the lines (element type 1): their label is their first physical tag
+    (in format 2.2), or the first physical tag of their curve, else the
+    curve tag (in format 4.1).
+    """
+    cdef:
+        MeshReader r
+
+    # Read the header to know whether the file is binary.
+    with open(filename, 'rb') as f:
+        header = f.read(256).split()
+    if len(header) < 4 or header[0] != b'$MeshFormat':
+        raise ValueError('{} is not a Gmsh mesh file'.format(filename))
+    version = header[1]
+    binary = header[2] == b'1'
+
+    if not (version.startswith(b'2.') or version == b'4.1'):
+        raise ValueError('Unsupported Gmsh format version {} in {}, '
+                         'expected 2.2 or 4.1'
+                         .format(version.decode(), filename))
+
+    r = MeshReader(filename, binary=binary)
+    r.expect(b'$MeshFormat')
+    r.word()
+    r.integer()
+    data_size = r.integer()
+    endian = '<'
+    if binary:
+        r.skip_line()
+        one = r.array('<i4', 1)[0]
+        if one != 1:
+            if one.byteswap() != 1:
+                raise r.error('binary integer 1')
+            endian = '>'
+    r.skip_to(b'$EndMeshFormat')
+
+    if version.startswith(b'2.'):
+        return read_gmsh2(r, binary, endian)
+    else:
+        size_dtype = endian + ('u8' if data_size == 8 else 'u4')
+        return read_gmsh41(r, binary, endian, size_dtype)
+
+
+def read_gmsh2(MeshReader r, bint binary, endian):
+    cdef:
+        long long I, N, k, ntags, nn, elem_type, tag
+        long long ntri = 0
+        long long nline = 0
+        long long[:] tags
+        double[:] x
+        double[:] y
+        long long[:,:] tri_nodes
+        long long[:,:] line_nodes
+        long long[:] line_label
+
+    nodes = None
+    tri_blocks = []
+    line_blocks = []
+    label_blocks = []
+
+    while True:
+        section = r.word()
+        if section == b'':
+            break
+
+        elif section == b'$Nodes':
+            N = r.integer()
+            if binary:
+                r.skip_line()
+                dtype = np.dtype([('tag', endian+'i4'), ('x', endian+'f8'),
+                                  ('y', endian+'f8'), ('z', endian+'f8')])
+                nodes = r.array(dtype, N)
+                # Views on the file, with native byte order.
+                nodes = (nodes['tag'], nodes['x'].astype('d', copy=False),
+                         nodes['y'].astype('d', copy=False))
+            else:
+                tags = np.empty(N, dtype=np.int64)
+                x = np.empty(N, dtype='d')
+                y = np.empty(N, dtype='d')
+                for I in range(N):
+                    tags[I] = r.read_int()
+                    x[I] = r.read_double()
+                    y[I] = r.read_double()
+                    r.read_double()
+                nodes = (np.asarray(tags), np.asarray(x), np.asarray(y))
+            r.skip_to(b'$EndNodes')
+
+        elif section == b'$Elements':
+            N = r.integer()
+            if binary:
+                r.skip_line()
+                I = 0
+                while I < N:
+                    # Python ints, so that block size does not overflow
+                    # int32.
+                    elem_type, n, ntags = r.array(endian+'i4', 3).tolist()
+                    nn = gmsh_nodes(elem_type)
+                    block = r.array(endian+'i4', n*(1+ntags+nn))
+                    block = block.reshape(n, 1+ntags+nn)
+                    if elem_type == GMSH_TRIANGLE:
+                        tri_blocks.append(block[:,1+ntags:])
+                    elif elem_type == GMSH_LINE:
+                        line_blocks.append(block[:,1+ntags:])
+                        if ntags > 0:
+                            label_blocks.append(block[:,1])
+                        else:
+                            label_blocks.append(np.zeros(n, dtype='int32'))
+                    I += n
+            else:
+                tri_nodes = np.empty((N, 3), dtype=np.int64)
+                line_nodes = np.empty((N, 2), dtype=np.int64)
+                line_label = np.empty(N, dtype=np.int64)
+                for I in range(N):
+                    r.read_int()
+                    elem_type = r.read_int()
+                    ntags = r.read_int()
+                    tag = 0
+                    for k in range(ntags):
+                        if k == 0:
+                            tag = r.read_int()
+                        else:
+                            r.read_int()
+                    nn = gmsh_nodes(elem_type)
+                    if elem_type == GMSH_TRIANGLE:
+                        for k in range(3):
+                            tri_nodes[ntri,k] = r.read_int()
+                        ntri += 1
+                    elif elem_type == GMSH_LINE:
+                        for k in range(2):
+                            line_nodes[nline,k] = r.read_int()
+                        line_label[nline] = tag
+                        nline += 1
+                    else:
+                        for k in range(nn):
+                            r.read_int()
+                tri_blocks.append(np.asarray(tri_nodes)[:ntri])
+                line_blocks.append(np.asarray(line_nodes)[:nline])
+                label_blocks.append(np.asarray(line_label)[:nline])
+            r.skip_to(b'$EndElements')
+
+        elif section.startswith(b'$'):
+            r.skip_to(b'$End' + section[1:])
+
+        else:
+            raise r.error('a section')
+
+    if nodes is None:
+        raise ValueError('{}: no $Nodes section'.format(r.filename))
+
+    return make_triangulation(
+        nodes[0], nodes[1], nodes[2],
+        concatenate(tri_blocks, (0, 3)), concatenate(line_blocks, (0, 2)),
+        concatenate(label_blocks, (0,)))
+
+
+def read_gmsh41(MeshReader r, bint binary, endian, size_dtype):
+    curve_label = {}
+    tag_blocks = []
+    x_blocks = []
+    y_blocks = []
+    tri_blocks = []
+    line_blocks = []
+    label_blocks = []
+
+    def read_size():
+        if binary:
+            return int(r.array(size_dtype, 1)[0])
+        return r.integer()
+
+    def read_int():
+        if binary:
+            return int(r.array(endian+'i4', 1)[0])
+        return r.integer()
+
+    def read_doubles(count):
+        if binary:
+            return r.array(endian+'f8', count)
+        return r.doubles(count)
+
+    def read_ints(count):
+        if binary:
+            return r.array(endian+'i4', count)
+        return r.ints(count)
+
+    while True:
+        section = r.word()
+        if section == b'':
+            break
+
+        elif section == b'$Entities':
+            if binary:
+                r.skip_line()
+            counts = [read_size() for I in range(4)]
+            for dim in range(4):
+                for I in range(counts[dim]):
+                    entity = read_int()
+                    read_doubles(3 if dim == 0 else 6)
+                    nphys = read_size()
+                    phys = read_ints(nphys)
+                    if dim > 0:
+                        nbound = read_size()
+                        read_ints(nbound)
+                    if dim == 1:
+                        curve_label[entity] = int(phys[0]) if nphys > 0 \
+                                              else entity
+            r.skip_to(b'$EndEntities')
+
+        elif section == b'$Nodes':
+            if binary:
+                r.skip_line()
+            nblock = read_size()
+            read_size()
+            read_size()
+            read_size()
+            for I in range(nblock):
+                dim = read_int()
+                read_int()
+                parametric = read_int()
+                n = read_size()
+                ncoord = 3 + (dim if parametric else 0)
+                if binary:
+                    tag_blocks.append(r.array(size_dtype, n))
+                else:
+                    tag_blocks.append(r.ints(n))
+                coords = read_doubles(n*ncoord).reshape(n, ncoord)
+                x_blocks.append(coords[:,0])
+                y_blocks.append(coords[:,1])
+            r.skip_to(b'$EndNodes')
+
+        elif section == b'$Elements':
+            if binary:
+                r.skip_line()
+            nblock = read_size()
+            read_size()
+            read_size()
+            read_size()
+            for I in range(nblock):
+                dim = read_int()
+                entity = read_int()
+                elem_type = read_int()
+                n = read_size()
+                nn = gmsh_nodes(elem_type)
+                if binary:
+                    block = r.array(size_dtype, n*(1+nn))
+                else:
+                    block = r.ints(n*(1+nn))
+                block = block.reshape(n, 1+nn)
+                if elem_type == GMSH_TRIANGLE:
+                    tri_blocks.append(block[:,1:])
+                elif elem_type == GMSH_LINE:
+                    line_blocks.append(block[:,1:])
+                    label_blocks.append(
+                        np.full(n, curve_label.get(entity, entity)))
+            r.skip_to(b'$EndElements')
+
+        elif section.startswith(b'$'):
+            r.skip_to(b'$End' + section[1:])
+
+        else:
+            raise r.error('a section')
+
+    return make_triangulation(
+        concatenate(tag_blocks, (0,)),
+        np.asarray(concatenate(x_blocks, (0,), 'd'), dtype='d'),
+        np.asarray(concatenate(y_blocks, (0,), 'd'), dtype='d'),
+        concatenate(tri_blocks, (0, 3)),
+        concatenate(line_blocks, (0, 2)), concatenate(label_blocks, (0,)))
+
+
+def gmsh_nodes(elem_type):
+    """
+    Return the number of nodes of a Gmsh element type.
+    """
+    if not 1 <= elem_type < len(GMSH_NODES):
+        raise ValueError('Unsupported Gmsh element type {}'
+                         .format(elem_type))
+    return GMSH_NODES[elem_type]
+
+
+def concatenate(blocks, empty_shape, dtype=np.int64):
+    """
+    Return blocks concatenated, or an empty array of empty_shape.
+    """
+    if len(blocks) == 0:
+        return np.empty(empty_shape, dtype=dtype)
+    if len(blocks) == 1:
+        return blocks[0]
+    return np.concatenate(blocks)
+
+
+def read_vtk(filename, label_name=None):
+    """
+    Read a VTK legacy file (DATASET UNSTRUCTURED_GRID or POLYDATA), ASCII
+    or binary.
+
+    Triangles make the triangulation, and lines (and segments of poly
+    lines) are the boundary edges.
+
+    Parameters
+    ----------
+    label_name:
+        Name of the cell data scalars (or field array) storing line labels.
+        Default is the first cell data array. Labels are 0 if there is no
+        cell data.
+    """
+    cdef:
+        MeshReader r
+
+    with open(filename, 'rb') as f:
+        header = [f.readline() for I in range(4)]
+    if not header[0].startswith(b'# vtk DataFile'):
+        raise ValueError('{} is not a VTK legacy file'.format(filename))
+    binary = header[2].strip().upper() == b'BINARY'
+    dataset = header[3].split()
+    if len(dataset) != 2 or dataset[0] != b'DATASET' or \
+       dataset[1] not in (b'UNSTRUCTURED_GRID', b'POLYDATA'):
+        raise ValueError('{}: expected DATASET UNSTRUCTURED_GRID or '
+                         'POLYDATA, got {}'
+                         .format(filename, header[3].strip().decode()))
+
+    r = MeshReader(filename, binary=binary)
+    for I in range(4):
+        r.skip_line()
+
+    def read_values(count, dtype_name):
+        dtype = VTK_DTYPES.get(dtype_name)
+        if dtype is None:
+            raise r.error('a supported data type')
+        if binary:
+            r.skip_line()
+            return r.array(dtype, count)
+        if dtype.endswith('f4') or dtype.endswith('f8'):
+            return r.doubles(count)
+        return r.ints(count)
+
+    def skip_metadata():
+        """
+        Skip a METADATA block (written by VTK 9), ending with an empty line.
+        """
+        r.skip_line()
+        while r.tell() < r.size and r.line() != b'':
+            pass
+
+    def read_cells(ncell, size):
+        """
+        Return cells as (offsets, connectivity).
+        """
+        if r.peek() == b'OFFSETS':
+            # VTK 5.1 format: ncell is the number of offsets.
+            r.word()
+            offsets = read_values(ncell, r.word())
+            r.expect(b'CONNECTIVITY')
+            connectivity = read_values(size, r.word())
+            return np.asarray(offsets, dtype=np.int64), connectivity
+        values = np.asarray(read_values(size, b'int'), dtype=np.int64)
+        return legacy_cells(values, ncell)
+
+    x = y = None
+    # Size of current attribute data, and whether it is cell data.
+    ndata = 0
+    cell_data = False
+    # Cell groups in cell data order: (kind, offsets, connectivity), kind
+    # being the section name (CELLS, or a polydata section).
+    groups = []
+    cell_types = None
+    label = None
+
+    while True:
+        section = r.word()
+        if section == b'':
+            break
+
+        elif section == b'POINTS':
+            n = r.integer()
+            points = np.asarray(read_values(3*n, r.word()), dtype='d')
+            points = points.reshape(n, 3)
+            x = np.ascontiguousarray(points[:,0])
+            y = np.ascontiguousarray(points[:,1])
+
+        elif section in (b'CELLS', b'VERTICES', b'LINES', b'POLYGONS',
+                         b'TRIANGLE_STRIPS'):
+            ncell = r.integer()
+            size = r.integer()
+            offsets, connectivity = read_cells(ncell, size)
+            groups.append((section, offsets, connectivity))
+
+        elif section == b'CELL_TYPES':
+            n = r.integer()
+            cell_types = np.asarray(read_values(n, b'int'))
+
+        elif section in (b'CELL_DATA', b'POINT_DATA'):
+            ndata = r.integer()
+            cell_data = section == b'CELL_DATA'
+
+        elif section == b'SCALARS':
+            name = r.word()
+            dtype_name = r.word()
+            ncomp = r.line()
+            ncomp = int(ncomp) if ncomp else 1
+            if r.peek() == b'LOOKUP_TABLE':
+                r.word()
+                r.word()
+            else:
+                # Without LOOKUP_TABLE, binary data start after the line.
+                r.seek(r.tell() - 1)
+            values = read_values(ndata*ncomp, dtype_name)
+            if cell_data and label is None and \
+               (label_name is None or name == label_name.encode()):
+                label = np.asarray(values).reshape(-1, ncomp)[:,0]
+
+        elif section == b'FIELD':
+            r.word()
+            for I in range(r.integer()):
+                if r.peek() == b'METADATA':
+                    r.word()
+                    skip_metadata()
+                name = r.word()
+                ncomp = r.integer()
+                ntuple = r.integer()
+                values = read_values(ncomp*ntuple, r.word())
+                if cell_data and label is None and \
+                   (label_name is None or name == label_name.encode()):
+                    label = np.asarray(values).reshape(-1, ncomp)[:,0]
+
+        elif section in (b'VECTORS', b'NORMALS', b'TENSORS'):
+            r.word()
+            ncomp = 9 if section == b'TENSORS' else 3
+            read_values(ncomp*ndata, r.word())
+
+        elif section == b'TEXTURE_COORDINATES':
+            r.word()
+            ncomp = r.integer()
+            read_values(ncomp*ndata, r.word())
+
+        elif section in (b'GLOBAL_IDS', b'PEDIGREE_IDS'):
+            r.word()
+            read_values(ndata, r.word())
+
+        elif section == b'COLOR_SCALARS':
+            r.word()
+            ncomp = r.integer()
+            read_values(ncomp*ndata,
+                        b'unsigned_char' if binary else b'float')
+
+        elif section == b'LOOKUP_TABLE':
+            r.word()
+            n = r.integer()
+            read_values(4*n, b'unsigned_char' if binary else b'float')
+
+        elif section == b'METADATA':
+            skip_metadata()
+
+        else:
+            raise r.error('a VTK section keyword, got {!r}'
+                          .format(section.decode(errors='replace')))
+
+    if x is None:
+        raise ValueError('{}: no POINTS section'.format(filename))
+
+    tri_blocks = []
+    line_blocks = []
+    label_blocks = []
+    start = 0
+    for kind, offsets, connectivity in groups:
+        ncell = offsets.shape[0] - 1
+        size = np.diff(offsets)
+        connectivity = np.asarray(connectivity, dtype=np.int64)
+        if kind == b'CELLS':
+            if cell_types is None:
+                raise ValueError('{}: no CELL_TYPES section'
+                                 .format(filename))
+            types = cell_types
+        else:
+            types = np.full(ncell, {b'VERTICES': 1, b'LINES': VTK_POLY_LINE,
+                                    b'POLYGONS': 7,
+                                    b'TRIANGLE_STRIPS': 6}[kind])
+            types[(types == 7) & (size == 3)] = VTK_TRIANGLE
+
+        cell_label = label[start:start+ncell] if label is not None else \
+                     np.zeros(ncell, dtype='int32')
+        start += ncell
+
+        tri = (types == VTK_TRIANGLE) & (size == 3)
+        first = offsets[:ncell][tri]
+        tri_blocks.append(connectivity[first[:,None] + np.arange(3)])
+
+        # Lines, and segments of poly lines.
+        lines = ((types == VTK_LINE) | (types == VTK_POLY_LINE)) & (size >= 2)
+        nseg = np.where(lines, size - 1, 0)
+        cell = np.repeat(np.arange(ncell), nseg)
+        seg = np.arange(cell.shape[0]) - np.repeat(np.cumsum(nseg) - nseg,
+                                                   nseg)
+        first = offsets[cell] + seg
+        line_blocks.append(np.column_stack([connectivity[first],
+                                            connectivity[first+1]]))
+        label_blocks.append(cell_label[cell])
+
+    tags = np.arange(x.shape[0], dtype=np.int64)
+    return make_triangulation(
+        tags, x, y, concatenate(tri_blocks, (0, 3)),
+        concatenate(line_blocks, (0, 2)), concatenate(label_blocks, (0,)))
+
+
+def legacy_cells(long long[:] values, int ncell):
+    """
+    Split legacy cells (n, id0, ..., idn-1, ...) into offsets and
+    connectivity.
+    """
+    cdef:
+        int C
+        long long I = 0
+        long long J = 0
+        long long k, n
+        long long size = values.shape[0]
+        long long[:] offsets = np.empty(ncell+1, dtype=np.int64)
+        long long[:] connectivity = np.empty(size - ncell, dtype=np.int64)
+
+    for C in range(ncell):
+        offsets[C] = J
+        if I >= size or I + 1 + values[I] > size:
+            raise ValueError('Cell {} overflows the CELLS list'.format(C))
+        n = values[I]
+        for k in range(n):
+            connectivity[J+k] = values[I+1+k]
+        I += n + 1
+        J += n
+    offsets[ncell] = J
+
+    return np.asarray(offsets), np.asarray(connectivity)[:J]
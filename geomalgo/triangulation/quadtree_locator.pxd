@@ -0,0 +1,28 @@
+from .locator cimport TriangulationLocator, CSearchStats
+
+cdef class TriangulationQuadtreeLocator(TriangulationLocator):
+
+    cdef public:
+        # Quadtree root box.
+        double xmin
+        double xmax
+        double ymin
+        double ymax
+
+        int max_triangles
+        int max_depth
+
+        # Node centers, used to choose a child.
+        double[:] node_xmid
+        double[:] node_ymid
+
+        # Index of the first of the 4 children of a node, or -1 for a leaf.
+        int[:] node_child
+
+        # Triangles of leaf N are nodetri[nodetri_idx[N]:nodetri_idx[N+1]].
+        int[:] nodetri
+        Py_ssize_t[:] nodetri_idx
+
+    cdef int search_point(TriangulationQuadtreeLocator self,
+                          double x, double y, CSearchStats* stats,
+                          double* factors) nogil
@@ -0,0 +1,350 @@
+"""
+Locate points in a triangulation with an adaptive quadtree.
+
+TriangulationLocator uses a uniform grid, which does not fit strongly graded
+meshes: cells are either too many, or contain too many triangles in refined
+regions. Here, a node is split into 4 children while it has more than
+max_triangles triangles (and is larger than its smallest triangle bounding
+box side), so the number of triangles tested per point does not depend on the
+mesh grading.
+
+    +-------+-------+
+    |       |   |   |
+    |   2   |---+---|     Children of a node are numbered:
+    |       |   |   |
+    +-------+-------+          2 | 3
+    |       |       |         ---+---
+    |   0   |   1   |          0 | 1
+    |       |       |
+    +-------+-------+
+
+A triangle is associated to all leaves its bounding box (enlarged by
+edge_width) overlaps.
+
+"""
+
+import numpy as np
+from cython cimport floating
+
+from ..base2d cimport CPoint2D
+from ..grid2d cimport Grid2D
+from .triangulation2d cimport Triangulation2D
+from .boundary_edges cimport BoundaryEdges
+from .locator import (
+    choose_edge_width, choose_bb_grid_distance, index_statistics
+)
+from .util import (
+    compute_packed_coordinates, update_interpolator, set_coordinates
+)
+
+
+DEF OUT_IDX = -1
+
+
+def compute_triangle_boxes(Triangulation2D TG, double edge_width=0):
+    """
+    Return triangle bounding boxes enlarged by edge_width, as an array of
+    shape (NT, 4) storing xmin, xmax, ymin, ymax.
+    """
+    x, y, trivtx = TG.to_numpy()
+    xtri = x[trivtx]
+    ytri = y[trivtx]
+    return np.column_stack([xtri.min(axis=1) - edge_width,
+                            xtri.max(axis=1) + edge_width,
+                            ytri.min(axis=1) - edge_width,
+                            ytri.max(axis=1) + edge_width])
+
+
+def build_quadtree(tribox, double xmin, double xmax, double ymin, double ymax,
+                   int max_triangles, int max_depth):
+    """
+    Build quadtree arrays, level by level.
+
+    Return node_xmid, node_ymid, node_child, nodetri, nodetri_idx.
+    """
+    tribox = np.asarray(tribox)
+    NT = tribox.shape[0]
+    trisize = np.minimum(tribox[:,1] - tribox[:,0], tribox[:,3] - tribox[:,2])
+
+    # Boxes of the nodes of the current level.
+    box = np.array([[xmin, xmax, ymin, ymax]])
+    # Index of the first node of the current level.
+    level_start = 0
+
+    # (node, triangle) pairs of the current level.
+    pair_node = np.zeros(NT, dtype='int32')
+    pair_tri = np.arange(NT, dtype='int32')
+
+    node_xmid = []
+    node_ymid = []
+    node_child = []
+    leaf_node = []
+    leaf_tri = []
+
+    depth = 0
+    while box.shape[0] > 0:
+        nlevel = box.shape[0]
+        xmid = 0.5*(box[:,0] + box[:,1])
+        ymid = 0.5*(box[:,2] + box[:,3])
+        node_xmid.append(xmid)
+        node_ymid.append(ymid)
+
+        # Children overlapped by pair triangles.
+        parent = pair_node - level_start
+        b = tribox[pair_tri]
+        west = b[:,0] <= xmid[parent]
+        east = b[:,1] >= xmid[parent]
+        south = b[:,2] <= ymid[parent]
+        north = b[:,3] >= ymid[parent]
+
+        # Splitting a node smaller than all its triangles (the smallest side
+        # of their bounding box) does not separate them, for example where
+        # many triangles share a vertex.
+        count = np.bincount(parent, minlength=nlevel)
+        node_size = np.maximum(box[:,1] - box[:,0], box[:,3] - box[:,2])
+        tri_size = np.full(nlevel, np.inf)
+        np.minimum.at(tri_size, parent, trisize[pair_tri])
+        if depth < max_depth:
+            split = (count > max_triangles) & (node_size > tri_size)
+        else:
+            split = np.zeros(nlevel, dtype='bool')
+
+        # Children of split nodes are numbered after all nodes of the level.
+        child_start = level_start + nlevel
+        child = np.full(nlevel, -1, dtype='int32')
+        child[split] = child_start + 4*np.arange(np.count_nonzero(split))
+        node_child.append(child)
+
+        # Pairs of leaves are final.
+        is_leaf_pair = ~split[parent]
+        leaf_node.append(pair_node[is_leaf_pair])
+        leaf_tri.append(pair_tri[is_leaf_pair])
+
+        # Dispatch pairs of split nodes in children they overlap.
+        is_split_pair = ~is_leaf_pair
+        parent = parent[is_split_pair]
+        tri = pair_tri[is_split_pair]
+        west = west[is_split_pair]
+        east = east[is_split_pair]
+        south = south[is_split_pair]
+        north = north[is_split_pair]
+
+        new_node = []
+        new_tri = []
+        for q, mask in enumerate([south & west, south & east,
+                                  north & west, north & east]):
+            new_node.append(child[parent[mask]] + q)
+            new_tri.append(tri[mask])
+        pair_node = np.concatenate(new_node).astype('int32')
+        pair_tri = np.concatenate(new_tri)
+
+        # Children boxes.
+        b = box[split]
+        xm = xmid[split]
+        ym = ymid[split]
+        box = np.empty((4*b.shape[0], 4))
+        box[0::4] = np.column_stack([b[:,0], xm, b[:,2], ym])
+        box[1::4] = np.column_stack([xm, b[:,1], b[:,2], ym])
+        box[2::4] = np.column_stack([b[:,0], xm, ym, b[:,3]])
+        box[3::4] = np.column_stack([xm, b[:,1], ym, b[:,3]])
+
+        level_start = child_start
+        depth += 1
+
+    node_xmid = np.concatenate(node_xmid)
+    node_ymid = np.concatenate(node_ymid)
+    node_child = np.concatenate(node_child).astype('int32')
+    nnode = node_child.shape[0]
+
+    # Sort leaf pairs by node, keeping triangles in increasing order.
+    leaf_node = np.concatenate(leaf_node)
+    leaf_tri = np.concatenate(leaf_tri)
+    order = np.lexsort((leaf_tri, leaf_node))
+    nodetri = np.ascontiguousarray(leaf_tri[order], dtype='int32')
+
+    # Py_ssize_t, to index more than 2**31 (triangle, node) pairs.
+    nodetri_idx = np.zeros(nnode+1, dtype=np.intp)
+    np.cumsum(np.bincount(leaf_node, minlength=nnode), out=nodetri_idx[1:])
+
+    return node_xmid, node_ymid, node_child, nodetri, nodetri_idx
+
+
+cdef class TriangulationQuadtreeLocator(TriangulationLocator):
+    """
+    Same as TriangulationLocator, but using an adaptive quadtree instead of
+    a uniform grid, for strongly graded meshes.
+    """
+
+    def __init__(TriangulationQuadtreeLocator self, Triangulation2D TG,
+                 int max_triangles=16, int max_depth=24,
+                 double edge_width=-1, int[:,:] neighbours=None,
+                 int max_walk=32, bint collect_stats=False,
+                 bint packed=False, bint barycentric=False,
+                 interpolator=None, BoundaryEdges boundary_edges=None):
+        """
+        Parameters
+        ----------
+        max_triangles:
+            A node is split while it has more triangles than max_triangles,
+            and is larger than the smallest side of its triangle bounding
+            boxes. So leaves may have more
+            triangles than max_triangles where triangle bounding boxes
+            overlap a lot, for example around a vertex shared by many
+            triangles.
+        max_depth:
+            Maximal depth of the quadtree.
+        edge_width, neighbours, max_walk, collect_stats, packed,
+        barycentric, interpolator, boundary_edges:
+            See TriangulationLocator.
+        """
+        cdef:
+            double edge_min, edge_max
+
+        if edge_width < 0:
+            edge_min, edge_max = TG.edge_min_max
+            edge_width = choose_edge_width(edge_min)
+
+        if neighbours is not None and neighbours.shape[0] != TG.NT:
+            raise ValueError('Expected {} triangle neighbours, got {}'
+                             .format(TG.NT, neighbours.shape[0]))
+
+        self.TG = TG
+        self.edge_width = edge_width
+        self.edge_width_square = edge_width**2
+        self.overlap = False
+        self.pruned = 0
+        self.bounds = None
+        self.celltri = None
+        self.celltri_idx = None
+        self.neighbours = neighbours
+        self.max_walk = max_walk
+        self.collect_stats = collect_stats
+        self.query_stats = None
+        self.packed = packed
+        self.tricoords = None
+        self.barycentric = barycentric
+        if barycentric and interpolator is not None:
+            self.gradx, self.grady, self.det = interpolator
+        else:
+            self.gradx, self.grady, self.det = None, None, None
+        self.max_triangles = max_triangles
+        self.max_depth = max_depth
+        self.set_boundary_edges(boundary_edges)
+
+        self.build()
+
+    def build(TriangulationQuadtreeLocator self):
+        """
+        Build the quadtree from the triangulation.
+        """
+        cdef:
+            double dist
+
+        if self.packed:
+            self.tricoords = compute_packed_coordinates(self.TG)
+        if self.barycentric and self.gradx is None:
+            self.gradx, self.grady, self.det = self.TG.interpolator
+
+        bb = self.TG.bounding_box
+        dist = choose_bb_grid_distance(self.edge_width)
+        self.xmin = bb.xmin - dist
+        self.xmax = bb.xmax + dist
+        self.ymin = bb.ymin - dist
+        self.ymax = bb.ymax + dist
+
+        tribox = compute_triangle_boxes(self.TG, self.edge_width)
+
+        (self.node_xmid, self.node_ymid, self.node_child,
+         self.nodetri, self.nodetri_idx) = build_quadtree(
+            tribox, self.xmin, self.xmax, self.ymin, self.ymax,
+            self.max_triangles, self.max_depth)
+
+    def update(TriangulationQuadtreeLocator self, double[:] x, double[:] y,
+               moved=None):
+        """
+        Same as TriangulationLocator.update, but the whole quadtree is
+        rebuilt, whatever moved. Return the number of triangles.
+        """
+        set_coordinates(self.TG, x, y)
+        if self.barycentric:
+            update_interpolator(self.TG, np.arange(self.TG.NT, dtype='int32'),
+                                self.gradx, self.grady, self.det)
+        self.build()
+        if self.boundary_vertices is not None:
+            self.index_boundary_edges()
+        return self.TG.NT
+
+    cdef int search_point(TriangulationQuadtreeLocator self,
+                          double x, double y, CSearchStats* stats,
+                          double* factors) nogil:
+        cdef:
+            int N = 0
+            CPoint2D P
+
+        if not (self.xmin <= x <= self.xmax and self.ymin <= y <= self.ymax):
+            if stats != NULL:
+                stats.out_of_grid = True
+            return OUT_IDX
+
+        # Descend to the leaf containing the point.
+        while self.node_child[N] != -1:
+            N = self.node_child[N] + (x >= self.node_xmid[N]) \
+                                   + 2*(y >= self.node_ymid[N])
+
+        P.x = x
+        P.y = y
+
+        return self.search_candidates(self.nodetri, self.nodetri_idx[N],
+                                      self.nodetri_idx[N+1], &P, stats,
+                                      factors)
+
+    def space_filling_order(TriangulationQuadtreeLocator self,
+                            floating[:] xpoints, floating[:] ypoints,
+                            curve='hilbert'):
+        """
+        Same as TriangulationLocator.space_filling_order, with a 2**16 x 2**16
+        grid on the quadtree root box.
+        """
+        grid = Grid2D(self.xmin, self.xmax, 1 << 16,
+                      self.ymin, self.ymax, 1 << 16)
+        keys = grid.cell_keys(xpoints, ypoints, curve)
+        return np.argsort(keys, kind='stable').astype(np.intp)
+
+    def statistics(TriangulationQuadtreeLocator self):
+        """
+        Same as TriangulationLocator.statistics, for the quadtree leaves,
+        with the number of nodes nnode instead of nx and ny.
+        """
+        node_child = np.asarray(self.node_child)
+        is_leaf = node_child == -1
+        arrays = [self.node_xmid, self.node_ymid, self.node_child,
+                  self.nodetri, self.nodetri_idx]
+        if self.packed:
+            arrays.append(self.tricoords)
+        index_bytes = sum(np.asarray(a).nbytes for a in arrays)
+        stats = index_statistics(np.diff(self.nodetri_idx)[is_leaf],
+                                 index_bytes)
+        stats['nnode'] = node_child.shape[0]
+        return stats
+
+    def leaf_triangles(TriangulationQuadtreeLocator self, double x, double y):
+        """
+        Return the set of triangles of the leaf containing point (x, y).
+        """
+        cdef:
+            int N = 0
+            Py_ssize_t IT
+
+        while self.node_child[N] != -1:
+            N = self.node_child[N] + (x >= self.node_xmid[N]) \
+                                   + 2*(y >= self.node_ymid[N])
+
+        return {self.nodetri[IT]
+                for IT in range(self.nodetri_idx[N], self.nodetri_idx[N+1])}
+
+    def cell_to_triangles(TriangulationQuadtreeLocator self, int ix, int iy):
+        """
+        The quadtree has no grid cells, see leaf_triangles instead.
+        """
+        raise NotImplementedError('TriangulationQuadtreeLocator has no grid '
+                                  'cells, use leaf_triangles')
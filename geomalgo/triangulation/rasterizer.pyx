@@ -0,0 +1,170 @@
+"""
+Rasterize data defined on triangulation vertices onto a Grid2D.
+
+Pixels are the grid cells, and the value of a pixel is the linear
+interpolation of the data at the cell center. Instead of locating each pixel
+center in the triangulation, triangles are scanned one by one: for each grid
+row whose center line crosses the triangle, the range of pixel centers
+between the left and right triangle edges is computed, and values are
+evaluated with the triangle gradx, grady and det:
+
+    +---+---+---+---+---+
+    |   |   | A |   |   |
+    +---+---+/-\+---+---+
+    |   |  o/ o \o  |   |    o: pixel centers of the row, only those
+    +---+--/+---+\--+---+       between the edges are in the triangle.
+    |   | /o| o | o\|   |
+    +---+B--+---+---C---+
+
+An edge crossing point is computed from its lowest vertex to its highest
+one, so that two triangles sharing an edge compute the same point, and pixel
+centers on the edge are not missed.
+
+The cost is proportional to the number of triangles plus the number of
+pixels, so rasterizing is faster than locating pixel centers when pixels are
+at least as many as triangles.
+
+"""
+
+import numpy as np
+from libc.math cimport ceil, floor
+from cython cimport floating
+
+from ..grid2d cimport Grid2D
+from .triangulation2d cimport Triangulation2D
+
+
+cdef inline void edge_crossing(double xa, double ya, double xb, double yb,
+                               double y, double* xleft,
+                               double* xright) nogil:
+    """
+    Enlarge [xleft, xright] with the point of edge AB at ordinate y, if any.
+    """
+    cdef:
+        double x
+
+    # Order vertices by ordinate.
+    if ya > yb or (ya == yb and xa > xb):
+        xa, xb = xb, xa
+        ya, yb = yb, ya
+
+    if not (ya <= y <= yb):
+        return
+
+    if ya == yb:
+        xleft[0] = min(xleft[0], xa)
+        xright[0] = max(xright[0], xb)
+        return
+
+    x = xa + (y - ya) * (xb - xa) / (yb - ya)
+    xleft[0] = min(xleft[0], x)
+    xright[0] = max(xright[0], x)
+
+
+def rasterize(Triangulation2D TG, Grid2D grid, floating[:] vertdata,
+              interpolator=None, fill_value=np.nan):
+    """
+    Rasterize vertdata, defined on triangulation vertices, onto the cells
+    of grid.
+
+    Parameters
+    ----------
+    vertdata:
+        float32 or float64 array of size NV. The image has the same dtype.
+    interpolator:
+        Optional tuple (gradx, grady, det), as returned by
+        compute_interpolator. Default is TG.interpolator.
+    fill_value:
+        Value of pixels whose center is out of the triangulation.
+
+    Return image and mask, both of shape (ny, nx): image[iy, ix] is the
+    value at the center of cell (ix, iy), and mask[iy, ix] is True if the
+    center is in the triangulation (triangle edges included). Where
+    triangles overlap, the last one wins.
+    """
+    cdef:
+        int T, k, V, ix, iy
+        int ix_min, ix_max, iy_min, iy_max
+        int nx = grid.nx
+        int ny = grid.ny
+        double xmin = grid.xmin
+        double ymin = grid.ymin
+        double dx = grid.dx
+        double dy = grid.dy
+        double xa, ya, xb, yb, xc, yc
+        double xleft, xright, xcenter, ycenter
+        double lo, hi
+        double c0, cx, cy
+        double[:] x = TG.x
+        double[:] y = TG.y
+        int[:,:] trivtx = TG.trivtx
+        double[:,:] gradx
+        double[:,:] grady
+        double[:,:] det
+        floating[:,:] image
+        unsigned char[:,:] mask
+
+    if vertdata.shape[0] != TG.NV:
+        raise ValueError('Expected {} vertex values, got {}'
+                         .format(TG.NV, vertdata.shape[0]))
+
+    if interpolator is None:
+        interpolator = TG.interpolator
+    gradx, grady, det = interpolator
+
+    image = np.full((ny, nx), fill_value,
+                    dtype=np.asarray(vertdata).dtype)
+    mask = np.zeros((ny, nx), dtype=np.uint8)
+
+    with nogil:
+        for T in range(TG.NT):
+            xa = x[trivtx[T,0]]
+            ya = y[trivtx[T,0]]
+            xb = x[trivtx[T,1]]
+            yb = y[trivtx[T,1]]
+            xc = x[trivtx[T,2]]
+            yc = y[trivtx[T,2]]
+
+            # Rows whose center is in the triangle ordinate range, clipped
+            # (as double, to not overflow int) to the grid.
+            lo = ceil((min(ya, yb, yc) - ymin) / dy - 0.5)
+            hi = floor((max(ya, yb, yc) - ymin) / dy - 0.5)
+            if lo > hi or lo > ny-1 or hi < 0:
+                continue
+            iy_min = <int> max(lo, 0.)
+            iy_max = <int> min(hi, ny-1.)
+
+            # Interpolated value is c0 + cx*x + cy*y in the triangle.
+            c0 = 0.
+            cx = 0.
+            cy = 0.
+            for k in range(3):
+                V = trivtx[T,k]
+                c0 += vertdata[V] * det[T,k]
+                cx += vertdata[V] * gradx[T,k]
+                cy += vertdata[V] * grady[T,k]
+
+            for iy in range(iy_min, iy_max+1):
+                ycenter = ymin + (iy + 0.5) * dy
+
+                xleft = 1e308
+                xright = -1e308
+                edge_crossing(xa, ya, xb, yb, ycenter, &xleft, &xright)
+                edge_crossing(xb, yb, xc, yc, ycenter, &xleft, &xright)
+                edge_crossing(xc, yc, xa, ya, ycenter, &xleft, &xright)
+                if xleft > xright:
+                    continue
+
+                lo = ceil((xleft - xmin) / dx - 0.5)
+                hi = floor((xright - xmin) / dx - 0.5)
+                if lo > hi or lo > nx-1 or hi < 0:
+                    continue
+                ix_min = <int> max(lo, 0.)
+                ix_max = <int> min(hi, nx-1.)
+
+                for ix in range(ix_min, ix_max+1):
+                    xcenter = xmin + (ix + 0.5) * dx
+                    image[iy, ix] = c0 + cx*xcenter + cy*ycenter
+                    mask[iy, ix] = True
+
+    return np.asarray(image), np.asarray(mask).view(bool)
@@ -0,0 +1,179 @@
+"""
+Place a triangulation, its edges, locator and interpolator in shared memory,
+for multiprocessing workers.
+
+Pickling a triangulation and its locator to each worker of a pool copies
+all their arrays in each process. Instead, save_shared writes them once in a
+multiprocessing.shared_memory block (with the same layout as a cache
+file, see the cache module), and workers load them by name, with arrays
+being views on the block:
+
+    shm = save_shared(TG, edges=edges, locator=locator)
+    try:
+        with multiprocessing.Pool(16) as pool:
+            pool.map(work, [(shm.name, chunk) for chunk in chunks])
+    finally:
+        shm.close()
+        shm.unlink()
+
+    def work(args):
+        name, chunk = args
+        shared = load_shared(name)
+        triangles = shared['locator'].search_points(...)
+
+Where shared memory blocks are files of /dev/shm (Linux), workers map them
+copy-on-write: the block is never modified by workers, and a worker writing
+an array only gets a private copy of the modified pages. Elsewhere, arrays
+are views on the block itself, and must not be modified by workers.
+
+"""
+
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .triangulation2d cimport Triangulation2D
+from .interpolator cimport TriangulationInterpolator
+from .cache import (
+    cache_to_arrays, layout_arrays, write_arrays, read_header, read_arrays,
+    arrays_to_cache
+)
+
+
+SHM_DIR = '/dev/shm'
+
+
+def save_shared(Triangulation2D TG, edges=None, interpolator=None,
+                locator=None,
+                TriangulationInterpolator point_interpolator=None,
+                name=None):
+    """
+    Save triangulation TG and data computed for it in a new shared memory
+    block.
+
+    Parameters
+    ----------
+    edges, interpolator, locator:
+        See save_cache.
+    point_interpolator:
+        A TriangulationInterpolator of TG, with its points set. Its locator
+        and interpolator arrays are saved too.
+    name:
+        Name of the shared memory block, default is a random name.
+
+    Return the multiprocessing.shared_memory.SharedMemory object. Its name
+    is given to load_shared. The caller closes and unlinks it when workers
+    are done.
+    """
+    if point_interpolator is not None:
+        if point_interpolator.TG is not TG:
+            raise ValueError('point_interpolator is not an interpolator of '
+                             'the triangulation')
+        if locator is None:
+            locator = point_interpolator.locator
+        elif locator is not point_interpolator.locator:
+            raise ValueError('point_interpolator locator differs from '
+                             'locator')
+        if interpolator is None:
+            interpolator = (point_interpolator.gradx, point_interpolator.grady,
+                            point_interpolator.det)
+
+    attrs, arrays = cache_to_arrays(edges, interpolator, locator)
+
+    attrs['triangulation'] = {}
+    arrays['triangulation.x'] = np.ascontiguousarray(TG.x)
+    arrays['triangulation.y'] = np.ascontiguousarray(TG.y)
+    arrays['triangulation.trivtx'] = np.ascontiguousarray(TG.trivtx)
+
+    if point_interpolator is not None:
+        attrs['point_interpolator'] = {'NP': point_interpolator.NP}
+        arrays['point_interpolator.triangles'] = \
+            np.ascontiguousarray(point_interpolator.triangles)
+        arrays['point_interpolator.factors'] = \
+            np.ascontiguousarray(point_interpolator.factors)
+
+    header = {'attrs': attrs}
+    _, _, _, size = layout_arrays(header, arrays)
+
+    shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+    try:
+        write_arrays(np.frombuffer(shm.buf, dtype='uint8', count=size),
+                     header, arrays)
+    except BaseException:
+        shm.close()
+        shm.unlink()
+        raise
+
+    return shm
+
+
+def map_shared(name):
+    """
+    Return a uint8 array on shared memory block name, copy-on-write if the
+    block is a file of SHM_DIR, and the SharedMemory object mapping it
+    otherwise (None for a file).
+    """
+    filename = os.path.join(SHM_DIR, name.lstrip('/'))
+    if os.path.isfile(filename):
+        return np.memmap(filename, dtype='uint8', mode='c'), None
+
+    shm = shared_memory.SharedMemory(name=name)
+    return np.frombuffer(shm.buf, dtype='uint8'), shm
+
+
+def load_shared(name):
+    """
+    Load data saved by save_shared in shared memory block name.
+
+    Return a dictionary with the key 'triangulation', and the keys given to
+    save_shared among 'edges', 'interpolator', 'locator' and
+    'point_interpolator' (which comes with its 'interpolator' and
+    'locator'). Nothing is copied: arrays are views on the shared
+    memory block (see the module docstring).
+    """
+    cdef:
+        Triangulation2D TG
+        TriangulationInterpolator point_interpolator
+
+    buf, shm = map_shared(name)
+
+    offset = 0
+    def read(size):
+        nonlocal offset
+        data = bytes(buf[offset:offset+size])
+        offset += size
+        return data
+
+    version, header, data_start = read_header(read, name)
+    if header is None:
+        raise ValueError('Shared memory {} was written by another version '
+                         'of geomalgo'.format(name))
+
+    arrays = read_arrays(buf, header, data_start)
+    attrs = header['attrs']
+
+    TG = Triangulation2D(arrays['triangulation.x'],
+                         arrays['triangulation.y'],
+                         arrays['triangulation.trivtx'])
+
+    shared = arrays_to_cache(TG, attrs, arrays)
+    shared['triangulation'] = TG
+
+    if 'point_interpolator' in attrs:
+        point_interpolator = \
+            TriangulationInterpolator.__new__(TriangulationInterpolator)
+        point_interpolator.TG = TG
+        point_interpolator.locator = shared['locator']
+        point_interpolator.NP = attrs['point_interpolator']['NP']
+        (point_interpolator.gradx, point_interpolator.grady,
+         point_interpolator.det) = shared['interpolator']
+        point_interpolator.triangles = arrays['point_interpolator.triangles']
+        point_interpolator.factors = arrays['point_interpolator.factors']
+        shared['point_interpolator'] = point_interpolator
+
+    if shm is not None:
+        # Arrays are views on shm buffer, which must stay open.
+        shared['shared_memory'] = shm
+
+    return shared
@@ -9,4 +9,8 @@ cdef class Triangulation2D:
         double[:] y
         int[:,:] trivtx
 
-    cdef void get(Triangulation2D self, int I, CTriangle2D* T)
+        # Derived geometry computed by the properties, by name (see
+        # Triangulation2D.invalidate).
+        dict derived
+
+    cdef void get(Triangulation2D self, int I, CTriangle2D* T) nogil
@@ -2,6 +2,159 @@ import numpy as np
 import matplotlib.tri
 
 from ..base2d cimport CTriangle2D, Triangle2D
+from ..grid2d import Grid2D
+from .util import (
+    compute_bounding_box, compute_edge_min_max, compute_signed_area,
+    compute_centers, compute_interpolator
+)
+
+
+cdef inline bint degree_less(int[:] adj_idx, int V, int W) nogil:
+    """
+    Return True if vertex V has a smaller degree than W, or the same degree
+    and a smaller index.
+    """
+    cdef:
+        int dV = adj_idx[V+1] - adj_idx[V]
+        int dW = adj_idx[W+1] - adj_idx[W]
+    return dV < dW or (dV == dW and V < W)
+
+
+def compute_vertex_adjacency(int[:,:] trivtx, int NV):
+    """
+    Return vertex adjacency (through triangle edges) in CSR format, as
+    arrays adj_idx of size NV+1 and adj: neighbours of vertex V are
+    adj[adj_idx[V]:adj_idx[V+1]], in increasing degree order.
+
+    Built in O(NT), by visiting the triangles of each vertex, without
+    sorting edges.
+    """
+    cdef:
+        int NT = trivtx.shape[0]
+        int T, V, W, I, J, k, n
+        int[:] vtri_idx = np.zeros(NV+1, dtype='int32')
+        int[:] vtri = np.empty(3*NT, dtype='int32')
+        int[:] fill
+        int[:] mark = np.full(NV, -1, dtype='int32')
+        int[:] adj_idx = np.zeros(NV+1, dtype='int32')
+        int[:] adj
+
+    with nogil:
+        # Triangles of each vertex.
+        for T in range(NT):
+            for k in range(3):
+                vtri_idx[trivtx[T,k]+1] += 1
+        for V in range(NV):
+            vtri_idx[V+1] += vtri_idx[V]
+
+    fill = np.array(vtri_idx[:NV], dtype='int32')
+
+    with nogil:
+        for T in range(NT):
+            for k in range(3):
+                V = trivtx[T,k]
+                vtri[fill[V]] = T
+                fill[V] += 1
+
+        # Count distinct neighbours of each vertex.
+        for V in range(NV):
+            n = 0
+            for I in range(vtri_idx[V], vtri_idx[V+1]):
+                T = vtri[I]
+                for k in range(3):
+                    W = trivtx[T,k]
+                    if W != V and mark[W] != V:
+                        mark[W] = V
+                        n += 1
+            adj_idx[V+1] = adj_idx[V] + n
+
+    adj = np.empty(adj_idx[NV], dtype='int32')
+    mark[:] = -1
+
+    with nogil:
+        for V in range(NV):
+            n = adj_idx[V]
+            for I in range(vtri_idx[V], vtri_idx[V+1]):
+                T = vtri[I]
+                for k in range(3):
+                    W = trivtx[T,k]
+                    if W != V and mark[W] != V:
+                        mark[W] = V
+                        # Insertion sort by degree, then index.
+                        J = n
+                        while J > adj_idx[V] and \
+                              degree_less(adj_idx, W, adj[J-1]):
+                            adj[J] = adj[J-1]
+                            J -= 1
+                        adj[J] = W
+                        n += 1
+
+    return np.asarray(adj_idx), np.asarray(adj)
+
+
+def compute_rcm_order(int[:,:] trivtx, int NV):
+    """
+    Return vertices in reverse Cuthill-McKee order.
+
+    Each connected component is numbered breadth first from its vertex of
+    minimal degree (typically a mesh corner, far from the other vertices),
+    visiting neighbours in increasing degree order. The order is then
+    reversed. Isolated vertices (of degree 0) are visited first, so they are
+    numbered last.
+    """
+    cdef:
+        int I, V, W, J, start
+        int head = 0
+        int tail = 0
+        int[:] adj_idx
+        int[:] adj
+        int[:] order = np.empty(NV, dtype='int32')
+        unsigned char[:] visited = np.zeros(NV, dtype=np.uint8)
+        Py_ssize_t[:] by_degree
+
+    adj_idx, adj = compute_vertex_adjacency(trivtx, NV)
+    by_degree = np.argsort(np.diff(adj_idx), kind='stable').astype(np.intp)
+
+    with nogil:
+        for I in range(NV):
+            start = by_degree[I]
+            if visited[start]:
+                continue
+            visited[start] = True
+            order[tail] = start
+            tail += 1
+
+            while head < tail:
+                V = order[head]
+                head += 1
+                for J in range(adj_idx[V], adj_idx[V+1]):
+                    W = adj[J]
+                    if not visited[W]:
+                        visited[W] = True
+                        order[tail] = W
+                        tail += 1
+
+    return np.asarray(order)[::-1].copy()
+
+
+def compute_hilbert_order(x, y):
+    """
+    Return points sorted along a Hilbert curve, on a 2**16 x 2**16 grid on
+    their bounding box.
+    """
+    x = np.asarray(x, dtype='d')
+    y = np.asarray(y, dtype='d')
+    xmin, xmax = np.min(x), np.max(x)
+    ymin, ymax = np.min(y), np.max(y)
+    # Avoid a zero cell size for aligned points.
+    if xmax == xmin:
+        xmax = xmin + 1
+    if ymax == ymin:
+        ymax = ymin + 1
+
+    grid = Grid2D(xmin, xmax, 1 << 16, ymin, ymax, 1 << 16)
+    keys = grid.cell_keys(x, y, 'hilbert')
+    return np.argsort(keys, kind='stable').astype('int32')
 
 
 cdef class Triangulation2D:
@@ -30,8 +183,10 @@ cdef class Triangulation2D:
         self.x = x
         self.y = y
         self.trivtx = trivtx
+        self.derived = {}
 
-    cdef void get(Triangulation2D self, int triangle_index, CTriangle2D* triangle):
+    cdef void get(Triangulation2D self, int triangle_index,
+                  CTriangle2D* triangle) nogil:
         """
         Set 2D triangle point coordinates from its index in a triangulation
 
@@ -71,9 +226,111 @@ cdef class Triangulation2D:
         return triangle
 
 
+    def get_derived(Triangulation2D self, name, compute):
+        """
+        Return derived geometry name, computed by compute(self) on first
+        call, then cached until invalidate is called.
+        """
+        if self.derived is None:
+            self.derived = {}
+        if name not in self.derived:
+            self.derived[name] = compute(self)
+        return self.derived[name]
+
+    def invalidate(Triangulation2D self):
+        """
+        Forget derived geometry, which must be called after vertex
+        coordinates changed (set_coordinates calls it).
+        """
+        self.derived = {}
+
+    @property
+    def bounding_box(Triangulation2D self):
+        """ Cached compute_bounding_box(self) """
+        return self.get_derived('bounding_box', compute_bounding_box)
+
+    @property
+    def edge_min_max(Triangulation2D self):
+        """ Cached compute_edge_min_max(self) """
+        return self.get_derived('edge_min_max', compute_edge_min_max)
+
+    @property
+    def signed_area(Triangulation2D self):
+        """ Cached compute_signed_area(self) """
+        return self.get_derived('signed_area', compute_signed_area)
+
+    @property
+    def centers(Triangulation2D self):
+        """ Cached compute_centers(self) """
+        return self.get_derived('centers', compute_centers)
+
+    @property
+    def interpolator(Triangulation2D self):
+        """
+        Cached compute_interpolator(self).
+
+        Arrays are shared by the locators and interpolators of this
+        triangulation, and updated in place by their update methods.
+        """
+        return self.get_derived(
+            'interpolator',
+            lambda TG: compute_interpolator(TG, TG.signed_area))
+
     def to_numpy(Triangulation2D self):
         return np.asarray(self.x), np.asarray(self.y), np.asarray(self.trivtx)
 
 
+    def reorder(Triangulation2D self, method='hilbert'):
+        """
+        Renumber vertices and triangles, so that close vertices and close
+        triangles have close indices.
+
+        Parameters
+        ----------
+        method:
+            'hilbert' to number vertices along a Hilbert curve, or 'rcm' to
+            number them in reverse Cuthill-McKee order, which minimizes the
+            spread of vertex indices in a triangle (the matrix bandwidth).
+
+        In both cases, triangles are then sorted by their smallest new
+        vertex index, then by the middle one. Triangle vertex order (and
+        so orientation) is kept.
+
+        Return TG, vertex_perm, vertex_inverse, triangle_perm and
+        triangle_inverse, where TG is the new triangulation, and:
+
+            TG.x == self.x[vertex_perm]
+            TG.trivtx == vertex_inverse[self.trivtx[triangle_perm]]
+
+        So new vertex (or triangle) data is data[vertex_perm], and old data
+        is new_data[vertex_inverse].
+        """
+        x, y, trivtx = self.to_numpy()
+
+        if method == 'hilbert':
+            vertex_perm = compute_hilbert_order(x, y)
+        elif method == 'rcm':
+            vertex_perm = compute_rcm_order(trivtx, self.NV)
+        else:
+            raise ValueError("method must be 'hilbert' or 'rcm', got: {}"
+                             .format(method))
+
+        vertex_inverse = np.empty(self.NV, dtype='int32')
+        vertex_inverse[vertex_perm] = np.arange(self.NV, dtype='int32')
+
+        new_trivtx = vertex_inverse[trivtx]
+        sorted_trivtx = np.sort(new_trivtx, axis=1)
+        triangle_perm = np.lexsort(
+            (sorted_trivtx[:,1], sorted_trivtx[:,0])).astype('int32')
+
+        triangle_inverse = np.empty(self.NT, dtype='int32')
+        triangle_inverse[triangle_perm] = np.arange(self.NT, dtype='int32')
+
+        TG = Triangulation2D(x[vertex_perm], y[vertex_perm],
+                             np.ascontiguousarray(new_trivtx[triangle_perm]))
+
+        return TG, vertex_perm, vertex_inverse, triangle_perm, \
+               triangle_inverse
+
     def to_matplotlib(Triangulation2D self):
         return matplotlib.tri.Triangulation(self.x, self.y, self.trivtx)
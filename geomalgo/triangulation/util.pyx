@@ -2,6 +2,7 @@ import numpy as np
 from libc.math cimport fabs
 
 from .triangulation2d cimport Triangulation2D
+from .intern_edges cimport InternEdges
 
 from ..base2d cimport (
     BoundingBox, CTriangle2D, CPoint2D, triangle2d_set, triangle2d_center,
@@ -115,3 +116,118 @@ def compute_interpolator(Triangulation2D TG, double[:] signed_area=None):
                                    &gradx[T,0], &grady[T,0], &det[T,0])
 
     return np.asarray(gradx), np.asarray(grady), np.asarray(det)
+
+
+def update_interpolator(Triangulation2D TG, int[:] triangles,
+                        double[:,:] gradx, double[:,:] grady,
+                        double[:,:] det):
+    """
+    Recompute gradx, grady and det of triangles, in place.
+    """
+    cdef:
+        int IT, T
+        CTriangle2D ABC
+        CPoint2D A, B, C
+
+    triangle2d_set(&ABC, &A, &B, &C)
+
+    for IT in range(triangles.shape[0]):
+        T = triangles[IT]
+        TG.get(T, &ABC)
+        triangle2d_gradx_grady_det(&ABC, fabs(triangle2d_signed_area(&ABC)),
+                                   &gradx[T,0], &grady[T,0], &det[T,0])
+
+
+def compute_moved_triangles(Triangulation2D TG, moved=None):
+    """
+    Return triangles having at least one vertex flagged in moved, an array
+    of NV booleans. If moved is None, all triangles are returned.
+    """
+    if moved is None:
+        return np.arange(TG.NT, dtype='int32')
+
+    moved = np.asarray(moved, dtype='bool')
+    if moved.shape[0] != TG.NV:
+        raise ValueError('Expected {} moved vertex flags, got {}'
+                         .format(TG.NV, moved.shape[0]))
+
+    trivtx = np.asarray(TG.trivtx)
+    return np.flatnonzero(moved[trivtx].any(axis=1)).astype('int32')
+
+
+def compute_packed_coordinates(Triangulation2D TG, triangles=None):
+    """
+    Return vertex coordinates of triangles (default: all triangles), packed
+    in an array of shape (len(triangles), 6) storing xA, yA, xB, yB, xC, yC.
+    """
+    x, y, trivtx = TG.to_numpy()
+    if triangles is not None:
+        trivtx = trivtx[triangles]
+    packed = np.empty((trivtx.shape[0], 6), dtype='d')
+    packed[:,0::2] = x[trivtx]
+    packed[:,1::2] = y[trivtx]
+    return packed
+
+
+def set_coordinates(Triangulation2D TG, double[:] x, double[:] y):
+    """
+    Set new vertex coordinates of TG, and forget its derived geometry.
+
+    x and y are copied, so that the caller can modify its arrays afterwards
+    without modifying TG.
+    """
+    check_coordinates(TG, x, y)
+    TG.x = np.array(x, dtype='d')
+    TG.y = np.array(y, dtype='d')
+    TG.invalidate()
+
+
+def check_coordinates(Triangulation2D TG, double[:] x, double[:] y):
+    """
+    Raise ValueError if x and y are not NV vertex coordinates.
+    """
+    if x.shape[0] != TG.NV or y.shape[0] != TG.NV:
+        raise ValueError('Expected {} vertex coordinates, got {} and {}'
+                         .format(TG.NV, x.shape[0], y.shape[0]))
+
+
+cdef int triangle_edge_index(Triangulation2D TG, int T, int V0, int V1):
+    # Return k such as (V0, V1) is edge k of triangle T, or -1.
+    cdef:
+        int k, Va, Vb
+
+    for k in range(3):
+        Va = TG.trivtx[T, k]
+        Vb = TG.trivtx[T, (k+1) % 3]
+        if (Va == V0 and Vb == V1) or (Va == V1 and Vb == V0):
+            return k
+
+    return -1
+
+
+def compute_neighbours(Triangulation2D TG, InternEdges intern_edges):
+    """
+    Compute triangle neighbours from intern edges (see build_edges).
+
+    neighbours[T,k] is the triangle sharing edge k of triangle T, or -1 if
+    edge k is a boundary edge. Edge 0 is AB, edge 1 is BC and edge 2 is CA,
+    as in triangle2d_on_edges.
+    """
+    cdef:
+        int I, S, T, k, V0, V1
+        int[:,:] neighbours = np.full((TG.NT, 3), -1, dtype='int32')
+
+    for I in range(intern_edges.size):
+        V0 = intern_edges.vertices[I, 0]
+        V1 = intern_edges.vertices[I, 1]
+
+        for S in range(2):
+            T = intern_edges.triangles[I, S]
+            k = triangle_edge_index(TG, T, V0, V1)
+            if k == -1:
+                raise ValueError(
+                    'Intern edge ({}, {}) is not an edge of triangle {}'
+                    .format(V0, V1, T))
+            neighbours[T, k] = intern_edges.triangles[I, 1-S]
+
+    return np.asarray(neighbours)
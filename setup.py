@@ -1,3 +1,4 @@
+import sys
 from pathlib import Path
 from setuptools import setup, Extension
 
@@ -26,7 +27,25 @@ def list_sources():
     for fp in Path('.').glob('geomalgo/**/*.pyx'):
         yield str(fp), module_name(fp)
 
-extensions = [ Extension(modname, sources=[fp,])
+def openmp_flags():
+    """
+    Return compile and link flags enabling OpenMP, used by prange loops.
+
+    Without OpenMP, prange loops are still correct, but run serially.
+    """
+    if sys.platform == 'win32':
+        return ['/openmp'], []
+    elif sys.platform == 'darwin':
+        # Apple clang does not support OpenMP out of the box.
+        return [], []
+    else:
+        return ['-fopenmp'], ['-fopenmp']
+
+compile_args, link_args = openmp_flags()
+
+extensions = [ Extension(modname, sources=[fp,],
+                         extra_compile_args=compile_args,
+                         extra_link_args=link_args)
                for fp, modname in list_sources() ]
 
 setup(
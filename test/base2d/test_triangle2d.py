@@ -2,7 +2,7 @@ import unittest
 
 import numpy as np
 
-from geomalgo import Point2D, Triangle2D
+from geomalgo import BoundingBox, Point2D, Triangle2D
 
 
 class TestTriangle2D(unittest.TestCase):
@@ -180,5 +180,47 @@ class TestInterpolate(unittest.TestCase):
         self.check_interpolate_at(0.1, 0.2)
         self.check_interpolate_at(0.2, 0.1)
 
+
+class TestOverlapsBox(unittest.TestCase):
+    r"""
+      2 +-------+  +-------+
+        | box 2 |  | box 3 |
+      1 C-------+  +-------+
+        | \
+        |   \   +-------+
+        |     \ | box 1 |
+      0 A-------B-------+
+        0       1
+    """
+
+    def setUp(self):
+        self.triangle = Triangle2D(Point2D(0,0), Point2D(1,0), Point2D(0,1))
+
+    def test_overlap(self):
+        box = BoundingBox(xmin=0.2, xmax=0.4, ymin=0.2, ymax=0.4)
+        self.assertTrue(self.triangle.overlaps_box(box))
+
+        # Box containing the triangle.
+        box = BoundingBox(xmin=-1, xmax=2, ymin=-1, ymax=2)
+        self.assertTrue(self.triangle.overlaps_box(box))
+
+    def test_touch(self):
+        # box 1
+        box = BoundingBox(xmin=1, xmax=2, ymin=0, ymax=0.5)
+        self.assertTrue(self.triangle.overlaps_box(box))
+
+        # box 2
+        box = BoundingBox(xmin=0, xmax=1, ymin=1, ymax=2)
+        self.assertTrue(self.triangle.overlaps_box(box))
+
+    def test_no_overlap(self):
+        # Inside triangle bounding box, but separated by [BC].
+        box = BoundingBox(xmin=0.6, xmax=0.9, ymin=0.6, ymax=0.9)
+        self.assertFalse(self.triangle.overlaps_box(box))
+
+        # box 3
+        box = BoundingBox(xmin=1.2, xmax=2, ymin=1.2, ymax=2)
+        self.assertFalse(self.triangle.overlaps_box(box))
+
 if __name__ == '__main__':
     unittest.main()
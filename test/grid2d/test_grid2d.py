@@ -2,8 +2,11 @@ import unittest
 
 import numpy as np
 
+from numpy.testing import assert_equal
+
 from geomalgo import (
-    Point2D, Grid2D, compute_index, compute_row_col, coord_to_index
+    Point2D, Grid2D, compute_index, compute_row_col, coord_to_index,
+    compute_morton_index, compute_hilbert_index
 )
 
 from geomalgo.data import step
@@ -68,6 +71,68 @@ class TestComputeRowCol(unittest.TestCase):
         self.assertEqual(compute_row_col(5, nx), (2, 1))
 
 
+class TestComputeMortonIndex(unittest.TestCase):
+
+    def test_normal(self):
+        """Test Z-order curve index is computed from cell ix and iy"""
+        #  iy
+        #     +----+----+----+----+
+        #   3 | 10 | 11 | 14 | 15 |
+        #     +----+----+----+----+
+        #   2 |  8 |  9 | 12 | 13 |
+        #     +----+----+----+----+
+        #   1 |  2 |  3 |  6 |  7 |
+        #     +----+----+----+----+
+        #   0 |  0 |  1 |  4 |  5 |
+        #     +----+----+----+----+
+        #        0    1    2    3   ix
+
+        index = [[compute_morton_index(ix, iy) for ix in range(4)]
+                 for iy in range(4)]
+
+        assert_equal(index, [[ 0,  1,  4,  5],
+                             [ 2,  3,  6,  7],
+                             [ 8,  9, 12, 13],
+                             [10, 11, 14, 15]])
+
+        self.assertEqual(compute_morton_index(2**31, 2**31), 3 * 2**62)
+
+
+class TestComputeHilbertIndex(unittest.TestCase):
+
+    def test_normal(self):
+        """Test Hilbert curve index is computed from cell ix and iy"""
+        #  iy
+        #     +----+----+----+----+
+        #   3 |  5 |  6 |  9 | 10 |
+        #     +----+----+----+----+
+        #   2 |  4 |  7 |  8 | 11 |
+        #     +----+----+----+----+
+        #   1 |  3 |  2 | 13 | 12 |
+        #     +----+----+----+----+
+        #   0 |  0 |  1 | 14 | 15 |
+        #     +----+----+----+----+
+        #        0    1    2    3   ix
+
+        index = [[compute_hilbert_index(4, ix, iy) for ix in range(4)]
+                 for iy in range(4)]
+
+        assert_equal(index, [[ 0,  1, 14, 15],
+                             [ 3,  2, 13, 12],
+                             [ 4,  7,  8, 11],
+                             [ 5,  6,  9, 10]])
+
+    def test_adjacent(self):
+        """Test consecutive Hilbert cells are adjacent"""
+        n = 32
+        cells = sorted((compute_hilbert_index(n, ix, iy), ix, iy)
+                       for ix in range(n) for iy in range(n))
+        assert_equal([c[0] for c in cells], np.arange(n*n))
+        steps = np.abs(np.diff([c[1] for c in cells])) \
+              + np.abs(np.diff([c[2] for c in cells]))
+        assert_equal(steps, 1)
+
+
 class TestGrid2D(unittest.TestCase):
 
     def test_find_cell(self):
@@ -99,6 +164,21 @@ class TestGrid2D(unittest.TestCase):
         self.assertEqual(cell.iy, 0)
         self.assertEqual(cell.index, 0)
 
+    def test_cell_keys(self):
+        """Test space filling curve index of cells containing points"""
+        grid = Grid2D(xmin=-1, xmax=1.0, nx=4, ymin=10, ymax=30, ny=2)
+
+        # Points in cells (2, 1), (0, 0), and out of the grid, near cell
+        # (3, 0).
+        x = np.array([0.25, -0.75, 5.])
+        y = np.array([25., 15., 0.])
+
+        assert_equal(grid.cell_keys(x, y, 'morton'), [6, 0, 5])
+        assert_equal(grid.cell_keys(x, y, 'hilbert'), [13, 0, 15])
+
+        with self.assertRaisesRegex(ValueError, "curve must be"):
+            grid.cell_keys(x, y, 'peano')
+
 
 if __name__ == '__main__':
     unittest.main()
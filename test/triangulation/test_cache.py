@@ -0,0 +1,142 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from numpy.testing import assert_equal
+
+import geomalgo as ga
+from geomalgo.data import step, hole
+
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'mesh.cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_edges(self):
+        TG = step.triangulation
+        edges = ga.build_edges(step.trivtx, step.NV)
+        intern_edges, boundary_edges, edge_map = edges
+        boundary_edges.add_label(step.boundary_edge_label)
+
+        ga.save_cache(self.filename, TG, edges=edges)
+        cache = ga.load_cache(self.filename, TG)
+        self.assertEqual(set(cache), {'edges'})
+
+        intern_edges2, boundary_edges2, edge_map2 = cache['edges']
+        self.assertIs(intern_edges2.edge_map, edge_map2)
+        self.assertIs(boundary_edges2.edge_map, edge_map2)
+        self.assertEqual(edge_map2.NV, edge_map.NV)
+        self.assertEqual(edge_map2.NE, edge_map.NE)
+        self.assertEqual(intern_edges2.size, step.NI)
+        self.assertEqual(boundary_edges2.size, step.NB)
+
+        for a, b in [(intern_edges2.vertices, intern_edges.vertices),
+                     (intern_edges2.triangles, intern_edges.triangles),
+                     (boundary_edges2.triangle, boundary_edges.triangle),
+                     (boundary_edges2.label, boundary_edges.label),
+                     (edge_map2.idx, edge_map.idx)]:
+            assert_equal(np.asarray(a), b)
+        self.assertIsNone(boundary_edges2.normal)
+
+        assert_equal(intern_edges2[3, 1], [0, 2])
+        self.assertEqual(boundary_edges2[0, 1], 0)
+
+    def test_locator(self):
+        TG = hole.triangulation
+        intern_edges, _, _ = ga.build_edges(hole.trivtx, hole.NV)
+        neighbours = ga.triangulation.compute_neighbours(TG, intern_edges)
+        interpolator = ga.triangulation.compute_interpolator(TG)
+        locator = ga.TriangulationLocator(TG, overlap=True,
+                                          neighbours=neighbours, packed=True,
+                                          barycentric=True,
+                                          interpolator=interpolator)
+
+        ga.save_cache(self.filename, TG, interpolator=interpolator,
+                      locator=locator)
+        cache = ga.load_cache(self.filename, TG)
+        self.assertEqual(set(cache), {'interpolator', 'locator'})
+
+        for a, b in zip(cache['interpolator'], interpolator):
+            assert_equal(np.asarray(a), b)
+
+        cached = cache['locator']
+        self.assertEqual(cached.grid.nx, locator.grid.nx)
+        self.assertEqual(cached.grid.ymax, locator.grid.ymax)
+        self.assertEqual(cached.edge_width, locator.edge_width)
+        self.assertEqual(cached.pruned, locator.pruned)
+        self.assertTrue(cached.overlap)
+        self.assertTrue(cached.packed)
+        assert_equal(np.asarray(cached.tricoords), locator.tricoords)
+        self.assertTrue(cached.barycentric)
+        self.assertIs(cached.gradx.base, cache['interpolator'][0])
+        assert_equal(np.asarray(cached.celltri), locator.celltri)
+        assert_equal(np.asarray(cached.celltri_idx), locator.celltri_idx)
+        assert_equal(np.asarray(cached.bounds), locator.bounds)
+
+        np.random.seed(0)
+        x = np.random.uniform(-1, 7, 1000)
+        y = np.random.uniform(9, 16, 1000)
+        expected = np.asarray(locator.search_points(x, y))
+        assert_equal(cached.search_points(x, y), expected)
+        assert_equal(cached.search_points(x, y, hints=expected), expected)
+
+        # Arrays are copy-on-write.
+        cached.celltri[0] = -1
+        cache = ga.load_cache(self.filename, TG)
+        assert_equal(np.asarray(cache['locator'].celltri), locator.celltri)
+
+    def test_boundary_edges(self):
+        TG = hole.triangulation
+        _, boundary_edges, _ = ga.build_edges(hole.trivtx, hole.NV)
+        locator = ga.TriangulationLocator(TG, boundary_edges=boundary_edges)
+
+        ga.save_cache(self.filename, TG, locator=locator)
+        cached = ga.load_cache(self.filename, TG)['locator']
+        self.assertEqual(cached.boundary_grid.nx, locator.boundary_grid.nx)
+        assert_equal(np.asarray(cached.celledge), locator.celledge)
+
+        x = np.array([2.5, -1, 100])
+        y = np.array([12.5, 12, 200])
+        for a, b in zip(cached.search_nearest(x, y),
+                        locator.search_nearest(x, y)):
+            assert_equal(a, b)
+
+    def test_other_mesh(self):
+        ga.save_cache(self.filename, hole.triangulation,
+                      locator=ga.TriangulationLocator(hole.triangulation))
+
+        self.assertNotEqual(ga.compute_mesh_hash(hole.triangulation),
+                            ga.compute_mesh_hash(step.triangulation))
+
+        with self.assertRaisesRegex(ValueError, 'is for mesh'):
+            ga.load_cache(self.filename, step.triangulation)
+
+    def test_other_interpolator(self):
+        TG = hole.triangulation
+        locator = ga.TriangulationLocator(TG, barycentric=True)
+        gradx, grady, det = ga.triangulation.compute_interpolator(TG)
+        with self.assertRaisesRegex(ValueError, 'differs'):
+            ga.save_cache(self.filename, TG, locator=locator,
+                          interpolator=(gradx, grady, 2*det))
+
+    def test_quadtree_locator(self):
+        locator = ga.TriangulationQuadtreeLocator(hole.triangulation)
+        with self.assertRaisesRegex(ValueError, 'Only TriangulationLocator'):
+            ga.save_cache(self.filename, hole.triangulation, locator=locator)
+
+    def test_not_a_cache(self):
+        with open(self.filename, 'wb') as f:
+            f.write(b'hello world')
+        with self.assertRaisesRegex(ValueError, 'not a geomalgo cache'):
+            ga.load_cache(self.filename, hole.triangulation)
+
+
+if __name__ == '__main__':
+    unittest.main()
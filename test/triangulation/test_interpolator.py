@@ -1,3 +1,6 @@
+import os
+import shutil
+import tempfile
 import unittest
 
 import numpy as np
@@ -37,6 +40,311 @@ class TestTriangulationInterpolator(unittest.TestCase):
         self.assertEqual(nout, 0)
         np.testing.assert_allclose(pointdata, expected_pointdata)
 
+    def test_num_threads(self):
+        TG = ga.Triangulation2D(HOLE.x, HOLE.y, HOLE.trivtx)
+        np.random.seed(0)
+        x = np.random.uniform(-1, 7, 1000)
+        y = np.random.uniform(9, 16, 1000)
+        vertdata = -4*HOLE.x + 7*HOLE.y - 16
+        fields = np.column_stack([vertdata, HOLE.x])
+
+        for barycentric in [False, True]:
+            locator = ga.TriangulationLocator(TG, barycentric=barycentric)
+            interpolator = ga.TriangulationInterpolator(TG, locator, 1000)
+            nout = interpolator.set_points(x, y)
+            factors = np.array(interpolator.factors)
+            pointdata = np.zeros(1000)
+            interpolator.interpolate(vertdata, pointdata, fill_value=np.nan)
+            pointfields = np.zeros((1000, 2))
+            interpolator.interpolate_fields(fields, pointfields)
+
+            for num_threads in [2, 3, 0]:
+                self.assertEqual(
+                    interpolator.set_points(x, y, num_threads=num_threads),
+                    nout)
+                out = np.asarray(interpolator.triangles) == -1
+                np.testing.assert_equal(
+                    np.asarray(interpolator.factors)[~out], factors[~out])
+
+                result = np.zeros(1000)
+                interpolator.interpolate(vertdata, result, fill_value=np.nan,
+                                         num_threads=num_threads)
+                np.testing.assert_equal(result, pointdata)
+
+                result = np.zeros((1000, 2))
+                interpolator.interpolate_fields(fields, result,
+                                                num_threads=num_threads)
+                np.testing.assert_equal(result, pointfields)
+
+    def test_update_points(self):
+        TG = ga.Triangulation2D(HOLE.x, HOLE.y, HOLE.trivtx)
+        intern_edges, _, _ = ga.build_edges(HOLE.trivtx, HOLE.NV)
+        neighbours = ga.triangulation.compute_neighbours(TG, intern_edges)
+        np.random.seed(0)
+        x = np.random.uniform(-1, 7, 1000)
+        y = np.random.uniform(9, 16, 1000)
+
+        # Move 10% of points a little.
+        changed = np.zeros(1000, dtype=bool)
+        changed[::10] = True
+        x2 = x.copy()
+        y2 = y.copy()
+        x2[changed] += np.random.uniform(-0.1, 0.1, 100)
+        y2[changed] += np.random.uniform(-0.1, 0.1, 100)
+
+        # Indices of changed points, each given 3 times, shuffled.
+        repeated = np.random.permutation(np.repeat(np.flatnonzero(changed),
+                                                   3))
+
+        for barycentric in [False, True]:
+            for locator_neighbours in [None, neighbours]:
+                locator = ga.TriangulationLocator(
+                    TG, neighbours=locator_neighbours,
+                    barycentric=barycentric)
+                interpolator = ga.TriangulationInterpolator(TG, locator,
+                                                            1000)
+                nout = interpolator.set_points(x2, y2)
+                expected_triangles = np.array(interpolator.triangles)
+                expected_factors = np.array(interpolator.factors)
+                inside = expected_triangles != -1
+
+                for c in [changed, np.flatnonzero(changed), repeated]:
+                    interpolator.set_points(x, y)
+                    nout_changed = interpolator.update_points(x2, y2, c,
+                                                              num_threads=2)
+                    self.assertEqual(nout_changed,
+                                     np.sum(~inside[changed]))
+                    np.testing.assert_equal(interpolator.triangles,
+                                            expected_triangles)
+                    np.testing.assert_allclose(
+                        np.asarray(interpolator.factors)[inside],
+                        expected_factors[inside])
+
+        with self.assertRaisesRegex(ValueError, '1000 changed flags'):
+            interpolator.update_points(x2, y2, changed[:10])
+        with self.assertRaisesRegex(ValueError, 'indices'):
+            interpolator.update_points(x2, y2, [0, 1000])
+
+        # An out of the domain point given several times is counted once.
+        out = np.flatnonzero(~inside)[0]
+        self.assertEqual(
+            interpolator.update_points(x2, y2, [out, out, out],
+                                       num_threads=2), 1)
+
+    def test_interpolate_series(self):
+        TG = ga.Triangulation2D(HOLE.x, HOLE.y, HOLE.trivtx)
+        locator = ga.TriangulationLocator(TG)
+        np.random.seed(0)
+        x = np.random.uniform(-1, 7, 100)
+        y = np.random.uniform(9, 16, 100)
+        interpolator = ga.TriangulationInterpolator(TG, locator, 100)
+        interpolator.set_points(x, y)
+
+        ntime = 7
+        vertdata = np.random.rand(ntime, HOLE.NV).astype('float32')
+        expected = np.empty((ntime, 100))
+        for t in range(ntime):
+            interpolator.interpolate(vertdata[t].astype('d'), expected[t],
+                                     fill_value=np.nan)
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmpdir, 'vertdata')
+            vertdata.tofile(filename)
+            vertmap = np.memmap(filename, dtype='float32', mode='r',
+                                shape=(ntime, HOLE.NV))
+            pointmap = np.memmap(os.path.join(tmpdir, 'pointdata'),
+                                 dtype='d', mode='w+', shape=(ntime, 100))
+            n = interpolator.interpolate_series(vertmap, pointmap,
+                                                chunk_size=3,
+                                                fill_value=np.nan)
+            self.assertEqual(n, ntime)
+            np.testing.assert_equal(np.asarray(pointmap), expected)
+
+            # Read-only chunks of the same dtype as pointdata.
+            pointdata = np.empty((ntime, 100), dtype='float32')
+            interpolator.interpolate_series(vertmap, pointdata,
+                                            fill_value=np.nan)
+            np.testing.assert_allclose(pointdata, expected, rtol=1e-6)
+            del vertmap, pointmap
+        finally:
+            shutil.rmtree(tmpdir)
+
+        # Iterator of snapshots, and of chunks.
+        for chunks in [iter(vertdata), [vertdata[:4], vertdata[4:]]]:
+            pointdata = np.empty((ntime, 100))
+            interpolator.interpolate_series(chunks, pointdata,
+                                            fill_value=np.nan)
+            np.testing.assert_equal(pointdata, expected)
+
+        with self.assertRaisesRegex(ValueError, r'shape \(7, 32\)'):
+            interpolator.interpolate_series(vertdata[:5], pointdata)
+        with self.assertRaisesRegex(ValueError, 'Expected 7 snapshots'):
+            interpolator.interpolate_series(iter(vertdata[:5]), pointdata)
+        with self.assertRaises(TypeError):
+            interpolator.interpolate_series(vertdata, pointdata,
+                                            fill_value='abc')
+
+    def test_to_sparse(self):
+        try:
+            import scipy.sparse
+        except ImportError:
+            self.skipTest('scipy is not installed')
+
+        TG = ga.Triangulation2D(HOLE.x, HOLE.y, HOLE.trivtx)
+        locator = ga.TriangulationLocator(TG)
+        np.random.seed(0)
+        x = np.random.uniform(-1, 7, 1000)
+        y = np.random.uniform(9, 16, 1000)
+        interpolator = ga.TriangulationInterpolator(TG, locator, 1000)
+        nout = interpolator.set_points(x, y)
+
+        matrix = interpolator.to_sparse()
+        self.assertTrue(scipy.sparse.isspmatrix_csr(matrix))
+        self.assertEqual(matrix.shape, (1000, HOLE.NV))
+        self.assertEqual(matrix.nnz, 3*(1000 - nout))
+
+        vertdata = -4*HOLE.x + 7*HOLE.y - 16
+        pointdata = np.zeros(1000)
+        interpolator.interpolate(vertdata, pointdata)
+        np.testing.assert_allclose(matrix @ vertdata, pointdata)
+
+        # Factors of a point sum to 1, points out have empty rows.
+        out = np.asarray(interpolator.triangles) == -1
+        rowsum = np.asarray(matrix.sum(axis=1)).ravel()
+        np.testing.assert_allclose(rowsum[~out], 1)
+        np.testing.assert_equal(rowsum[out], 0)
+
+    def test_fields(self):
+        TG = ga.Triangulation2D(HOLE.x, HOLE.y, HOLE.trivtx)
+        locator = ga.TriangulationLocator(TG)
+        interpolator = ga.TriangulationInterpolator(TG, locator, 4)
+
+        # Two points in triangles, two out.
+        xcenter, ycenter = ga.triangulation.compute_centers(TG)
+        x = np.array([xcenter[0], -1, xcenter[5], 3])
+        y = np.array([ycenter[0], 12, ycenter[5], 12.5])
+        self.assertEqual(interpolator.set_points(x, y), 2)
+
+        vertdata = np.column_stack([HOLE.x, HOLE.y, HOLE.x + 2*HOLE.y])
+        pointdata = np.zeros((4, 3))
+        interpolator.interpolate_fields(vertdata, pointdata)
+        np.testing.assert_allclose(pointdata[[0, 2]],
+                                   np.column_stack([x, y, x + 2*y])[[0, 2]])
+        np.testing.assert_equal(pointdata[[1, 3]], 0)
+
+        # Same as interpolating fields one by one.
+        expected = np.full(4, -1.)
+        interpolator.interpolate(vertdata[:,2].copy(), expected,
+                                 fill_value=np.nan)
+        interpolator.interpolate_fields(vertdata, pointdata,
+                                        fill_value=np.nan)
+        np.testing.assert_equal(pointdata[:,2], expected)
+        self.assertTrue(np.all(np.isnan(pointdata[[1, 3]])))
+
+        vertdata = vertdata.astype('float32')
+        pointdata = pointdata.astype('float32')
+        interpolator.interpolate_fields(vertdata, pointdata, fill_value=0)
+        np.testing.assert_equal(pointdata[[1, 3]], 0)
+
+        with self.assertRaisesRegex(ValueError, 'nfields'):
+            interpolator.interpolate_fields(vertdata, pointdata[:,:2])
+
+    def test_interpolate_errors(self):
+        TG = ga.Triangulation2D(HOLE.x, HOLE.y, HOLE.trivtx)
+        locator = ga.TriangulationLocator(TG)
+        interpolator = ga.TriangulationInterpolator(TG, locator, 2)
+        interpolator.set_points(np.array([-1., 3]), np.array([12, 12.5]))
+
+        pointdata = np.zeros(2)
+        with self.assertRaises(TypeError):
+            interpolator.interpolate(HOLE.x, pointdata, fill_value='abc')
+        np.testing.assert_equal(pointdata, 0)
+
+        with self.assertRaisesRegex(ValueError, 'Expected vertdata'):
+            interpolator.interpolate(HOLE.x[:-1], pointdata)
+
+        with self.assertRaisesRegex(ValueError, 'Expected vertdata'):
+            interpolator.interpolate(HOLE.x, np.zeros(3))
+
+    def test_float32(self):
+        TG = ga.Triangulation2D(HOLE.x, HOLE.y, HOLE.trivtx)
+        xcenter, ycenter = ga.triangulation.compute_centers(TG)
+        vertdata = (-4*HOLE.x + 7*HOLE.y - 16).astype('float32')
+
+        for barycentric in [False, True]:
+            locator = ga.TriangulationLocator(TG, barycentric=barycentric)
+            interpolator = ga.TriangulationInterpolator(TG, locator, TG.NT)
+            nout = interpolator.set_points(xcenter.astype('float32'),
+                                           ycenter.astype('float32'))
+            self.assertEqual(nout, 0)
+            np.testing.assert_equal(interpolator.triangles, np.arange(TG.NT))
+
+            pointdata = np.empty(TG.NT, dtype='float32')
+            interpolator.interpolate(vertdata, pointdata)
+            np.testing.assert_allclose(pointdata,
+                                       -4*xcenter + 7*ycenter - 16,
+                                       rtol=1e-5)
+
+    def test_update(self):
+        TG = ga.Triangulation2D(HOLE.x, HOLE.y, HOLE.trivtx)
+        locator = ga.TriangulationLocator(TG)
+        interpolator = ga.TriangulationInterpolator(TG, locator, TG.NT)
+
+        # Move a vertex inside the triangulation.
+        V = np.argmin((HOLE.x - 1)**2 + (HOLE.y - 11)**2)
+        moved = np.zeros(TG.NV, dtype='bool')
+        moved[V] = True
+        x = HOLE.x.copy()
+        y = HOLE.y.copy()
+        x[V] += 0.01
+        y[V] -= 0.01
+
+        interpolator.update(x, y, moved)
+
+        gradx, grady, det = ga.triangulation.compute_interpolator(TG)
+        np.testing.assert_allclose(interpolator.gradx, gradx)
+        np.testing.assert_allclose(interpolator.grady, grady)
+        np.testing.assert_allclose(interpolator.det, det)
+
+        xcenter, ycenter = ga.triangulation.compute_centers(TG)
+        nout = interpolator.set_points(xcenter, ycenter)
+        self.assertEqual(nout, 0)
+        np.testing.assert_equal(interpolator.triangles, np.arange(TG.NT))
+
+    def test_barycentric(self):
+        TG = ga.Triangulation2D(HOLE.x.copy(), HOLE.y.copy(), HOLE.trivtx)
+        np.random.seed(0)
+        x = np.random.uniform(-1, 7, 1000)
+        y = np.random.uniform(9, 16, 1000)
+
+        locator = ga.TriangulationLocator(TG)
+        interpolator = ga.TriangulationInterpolator(TG, locator, 1000)
+        expected_nout = interpolator.set_points(x, y)
+        found = np.asarray(interpolator.triangles) != -1
+        expected = np.asarray(interpolator.factors)[found]
+
+        # Interpolator shares the locator arrays.
+        locator = ga.TriangulationLocator(TG, barycentric=True)
+        interpolator = ga.TriangulationInterpolator(TG, locator, 1000)
+        self.assertIs(interpolator.gradx.base, locator.gradx.base)
+
+        nout = interpolator.set_points(x, y)
+        self.assertEqual(nout, expected_nout)
+        np.testing.assert_equal(np.asarray(interpolator.triangles) != -1,
+                                found)
+        np.testing.assert_equal(np.asarray(interpolator.factors)[found],
+                                expected)
+
+        # Arrays are updated once, by the locator.
+        V = np.argmin((HOLE.x - 1)**2 + (HOLE.y - 11)**2)
+        moved = np.zeros(TG.NV, dtype='bool')
+        moved[V] = True
+        interpolator.update(HOLE.x + 0.01*moved, HOLE.y, moved)
+        gradx, grady, det = ga.triangulation.compute_interpolator(TG)
+        np.testing.assert_allclose(interpolator.gradx, gradx)
+        np.testing.assert_allclose(locator.det, det)
+
 if __name__ == '__main__':
     unittest.main()
 
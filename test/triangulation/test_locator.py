@@ -93,6 +93,96 @@ class TestBuildCellToTriangle(unittest.TestCase):
         assert_equal(celltri_idx,
                      [0, 1, 3, 4, 4, 6, 10, 12, 12, 13, 15, 16, 16])
 
+    def test_num_threads(self):
+        """
+        Index built in parallel is the same as the one built serially
+        """
+        TG = HOLE.triangulation
+        grid = ga.triangulation.build_grid(TG, 8, 7, dist=2e-6)
+        edge_width = 1e-6
+
+        bounds = np.empty((TG.NT, 4), dtype='int32')
+        ga.build_triangle_to_cell(bounds, TG, grid, edge_width)
+        celltri, celltri_idx = ga.build_cell_to_triangle(bounds, 8, 7)
+        self.assertEqual(celltri_idx.dtype, np.intp)
+
+        for num_threads in [2, 3, 0]:
+            bounds2 = np.empty((TG.NT, 4), dtype='int32')
+            ga.build_triangle_to_cell(bounds2, TG, grid, edge_width,
+                                      num_threads=num_threads)
+            assert_equal(bounds2, bounds)
+
+            celltri2, celltri_idx2 = ga.build_cell_to_triangle(
+                bounds, 8, 7, num_threads=num_threads)
+            assert_equal(celltri2, celltri)
+            assert_equal(celltri_idx2, celltri_idx)
+
+        # With overlap.
+        celltri, celltri_idx = ga.build_cell_to_triangle(
+            bounds, 8, 7, TG, grid, edge_width)
+        celltri2, celltri_idx2 = ga.build_cell_to_triangle(
+            bounds, 8, 7, TG, grid, edge_width, num_threads=3)
+        assert_equal(celltri2, celltri)
+        assert_equal(celltri_idx2, celltri_idx)
+
+    def test_chunk_count(self):
+        """
+        Chunk histograms use at most twice the memory of celltri
+        """
+        choose_chunk_count = ga.triangulation.locator.choose_chunk_count
+        self.assertEqual(choose_chunk_count(4, 1000, 10**6, 100), 4)
+        self.assertEqual(choose_chunk_count(4, 3, 10**6, 100), 3)
+        self.assertEqual(choose_chunk_count(4, 1000, 250, 100), 2)
+        self.assertEqual(choose_chunk_count(4, 1000, 50, 100), 1)
+        self.assertEqual(choose_chunk_count(4, 0, 0, 100), 1)
+
+        # Fine grid, with less than 2 pairs per cell: built serially.
+        TG = HOLE.triangulation
+        grid = ga.triangulation.build_grid(TG, 300, 200, dist=2e-6)
+        bounds = np.empty((TG.NT, 4), dtype='int32')
+        ga.build_triangle_to_cell(bounds, TG, grid, 1e-6)
+        count_pairs = ga.triangulation.locator.count_cell_triangle_pairs
+        self.assertEqual(choose_chunk_count(4, TG.NT, count_pairs(bounds),
+                                            300*200), 1)
+        celltri, celltri_idx = ga.build_cell_to_triangle(bounds, 300, 200)
+        celltri2, celltri_idx2 = ga.build_cell_to_triangle(
+            bounds, 300, 200, num_threads=4)
+        assert_equal(celltri2, celltri)
+        assert_equal(celltri_idx2, celltri_idx)
+
+
+class TestPatchCellToTriangle(unittest.TestCase):
+
+    def test_four_cells(self):
+        """
+        same geometry as TestBuildCellToTriangle.test_four_cells, then
+        triangles 0 and 2 move.
+        """
+
+        bounds = np.array([[1, 3, 1, 3],
+                           [0, 2, 1, 3],
+                           [0, 2, 0, 2],
+                           [1, 3, 0, 2]], dtype='int32')
+
+        nx, ny = 4, 3
+
+        celltri, celltri_idx = ga.build_cell_to_triangle(bounds, nx, ny)
+
+        triangles = np.array([0, 2], dtype='int32')
+        old_bounds = bounds[triangles]
+        bounds[0] = [0, 1, 0, 1]
+        bounds[2] = [2, 4, 1, 3]
+        new_bounds = bounds[triangles]
+
+        celltri, celltri_idx = ga.patch_cell_to_triangle(
+            celltri, celltri_idx, triangles, old_bounds, new_bounds, nx, ny)
+
+        expected_celltri, expected_celltri_idx = \
+            ga.build_cell_to_triangle(bounds, nx, ny)
+
+        assert_equal(celltri, expected_celltri)
+        assert_equal(celltri_idx, expected_celltri_idx)
+
 
 class TestTriangulationLocator(unittest.TestCase):
 
@@ -171,6 +261,260 @@ class TestTriangulationLocator(unittest.TestCase):
         self.assertEqual(locator.cell_to_triangles(4, 3),
                          {8, 24, 9, 25, 10, 26, 14, 30, 38, 37, 36, 35, 39})
 
+    def test_overlap(self):
+        """
+        Same grid as test_hole_aligned, but triangles are associated only to
+        cells they overlap.
+        """
+        nx, ny = 8, 7
+        dist = 1.
+        grid = ga.triangulation.build_grid(HOLE.triangulation, nx, ny, dist)
+
+        locator = ga.TriangulationLocator(HOLE.triangulation, grid)
+        overlap_locator = ga.TriangulationLocator(HOLE.triangulation, grid,
+                                                  overlap=True)
+
+        # Triangles 33 and 39 do not overlap the hole cells.
+        self.assertEqual(overlap_locator.cell_to_triangles(3, 3),
+                         {9, 25, 8, 24, 7, 23, 13, 29, 34, 35, 36, 37})
+        self.assertEqual(overlap_locator.cell_to_triangles(4, 3),
+                         {8, 24, 9, 25, 10, 26, 14, 30, 38, 37, 36, 35})
+
+        self.assertEqual(locator.pruned, 0)
+        self.assertGreater(overlap_locator.pruned, 0)
+        self.assertEqual(
+            overlap_locator.celltri.shape[0] + overlap_locator.pruned,
+            locator.celltri.shape[0])
+
+        # Same points are found, included on triangle vertices and edges.
+        np.random.seed(0)
+        x = np.random.uniform(-1, 7, 1000)
+        y = np.random.uniform(9, 16, 1000)
+        xmiddle = 0.5*(HOLE.x[HOLE.trivtx[:,0]] + HOLE.x[HOLE.trivtx[:,1]])
+        ymiddle = 0.5*(HOLE.y[HOLE.trivtx[:,0]] + HOLE.y[HOLE.trivtx[:,1]])
+        x = np.concatenate([x, HOLE.x, xmiddle])
+        y = np.concatenate([y, HOLE.y, ymiddle])
+
+        found = np.asarray(locator.search_points(x, y)) != -1
+        overlap_found = np.asarray(overlap_locator.search_points(x, y)) != -1
+        assert_equal(overlap_found, found)
+
+    def test_order(self):
+        """
+        Searching points along a space filling curve gives the same result
+        """
+        np.random.seed(0)
+        x = np.random.uniform(-1, 7, 1000)
+        y = np.random.uniform(9, 16, 1000)
+
+        grid = ga.triangulation.build_grid(HOLE.triangulation, 8, 7)
+        locator = ga.TriangulationLocator(HOLE.triangulation, grid)
+        expected = np.asarray(locator.search_points(x, y))
+
+        for order in ['hilbert', 'morton']:
+            perm = np.asarray(locator.space_filling_order(x, y, order))
+            assert_equal(np.sort(perm), np.arange(1000))
+
+            triangles = locator.search_points(x, y, order=order)
+            assert_equal(triangles, expected)
+
+            triangles = locator.search_points(x, y, order=order,
+                                              num_threads=4)
+            assert_equal(triangles, expected)
+
+    def test_packed(self):
+        """
+        Searching points in packed triangle coordinates gives the same result
+        """
+        TG = HOLE.triangulation
+        intern_edges, _, _ = ga.build_edges(HOLE.trivtx, HOLE.NV)
+        neighbours = ga.triangulation.compute_neighbours(TG, intern_edges)
+        np.random.seed(0)
+        x = np.random.uniform(-1, 7, 1000)
+        y = np.random.uniform(9, 16, 1000)
+        x = np.concatenate([x, HOLE.x])
+        y = np.concatenate([y, HOLE.y])
+
+        grid = ga.triangulation.build_grid(TG, 8, 7)
+        locator = ga.TriangulationLocator(TG, grid, neighbours=neighbours)
+        expected = np.asarray(locator.search_points(x, y))
+
+        locator = ga.TriangulationLocator(TG, grid, neighbours=neighbours,
+                                          packed=True)
+        tricoords = np.asarray(locator.tricoords)
+        self.assertEqual(tricoords.shape, (HOLE.NT, 6))
+        assert_equal(tricoords[:,0::2], HOLE.x[HOLE.trivtx])
+        assert_equal(tricoords[:,1::2], HOLE.y[HOLE.trivtx])
+
+        assert_equal(locator.search_points(x, y), expected)
+        assert_equal(locator.search_points(x, y, hints=expected), expected)
+        assert_equal(locator.search_points(x, y, num_threads=4), expected)
+
+    def test_barycentric(self):
+        """
+        Points are found from barycentric factors as from winding numbers
+        """
+        TG = HOLE.triangulation
+        intern_edges, _, _ = ga.build_edges(HOLE.trivtx, HOLE.NV)
+        neighbours = ga.triangulation.compute_neighbours(TG, intern_edges)
+        np.random.seed(0)
+        x = np.random.uniform(-1, 7, 1000)
+        y = np.random.uniform(9, 16, 1000)
+
+        grid = ga.triangulation.build_grid(TG, 8, 7)
+        locator = ga.TriangulationLocator(TG, grid, neighbours=neighbours)
+        expected = np.asarray(locator.search_points(x, y))
+
+        gradx, grady, det = ga.triangulation.compute_interpolator(TG)
+        locator = ga.TriangulationLocator(TG, grid, neighbours=neighbours,
+                                          barycentric=True,
+                                          interpolator=(gradx, grady, det))
+        self.assertIs(locator.gradx.base, gradx)
+
+        factors = np.full((1000, 3), np.nan)
+        triangles = np.asarray(locator.search_points(x, y, factors=factors))
+        assert_equal(triangles, expected)
+
+        found = triangles != -1
+        T = triangles[found]
+        expected_factors = det[T] + x[found,None]*gradx[T] \
+                         + y[found,None]*grady[T]
+        assert_equal(factors[found], expected_factors)
+        self.assertTrue(np.all(factors[found] >= 0))
+        self.assertTrue(np.all(np.isnan(factors[~found])))
+
+        triangles = locator.search_points(x, y, hints=expected,
+                                          factors=factors, num_threads=2)
+        assert_equal(triangles, expected)
+
+        # Vertices and edge middles are found in a triangle having them.
+        xmiddle = 0.5*(HOLE.x[HOLE.trivtx[:,1]] + HOLE.x[HOLE.trivtx[:,2]])
+        ymiddle = 0.5*(HOLE.y[HOLE.trivtx[:,1]] + HOLE.y[HOLE.trivtx[:,2]])
+        for px, py in [(HOLE.x, HOLE.y), (xmiddle, ymiddle)]:
+            triangles = np.asarray(locator.search_points(px, py))
+            self.assertTrue(np.all(triangles != -1))
+            xc, yc = HOLE.x[HOLE.trivtx[triangles]], HOLE.y[HOLE.trivtx[triangles]]
+            self.assertTrue(np.all((px >= xc.min(axis=1)) &
+                                   (px <= xc.max(axis=1)) &
+                                   (py >= yc.min(axis=1)) &
+                                   (py <= yc.max(axis=1))))
+
+        # Factors require a barycentric locator.
+        locator = ga.TriangulationLocator(TG, grid)
+        with self.assertRaisesRegex(ValueError, 'barycentric'):
+            locator.search_points(x, y, factors=factors)
+
+    def test_float32(self):
+        """
+        float32 points are found as the same points in float64
+        """
+        np.random.seed(0)
+        x = np.random.uniform(-1, 7, 1000).astype('float32')
+        y = np.random.uniform(9, 16, 1000).astype('float32')
+
+        grid = ga.triangulation.build_grid(HOLE.triangulation, 8, 7)
+        locator = ga.TriangulationLocator(HOLE.triangulation, grid)
+        expected = np.asarray(locator.search_points(x.astype('d'),
+                                                    y.astype('d')))
+
+        assert_equal(locator.search_points(x, y), expected)
+        assert_equal(locator.search_points(x, y, order='hilbert',
+                                           num_threads=2), expected)
+
+        with self.assertRaises(ValueError):
+            locator.search_points(x, y.astype('d'))
+
+    def test_search_nearest(self):
+        """
+        Points out of the triangulation are projected on the nearest
+        boundary edge
+        """
+        TG = HOLE.triangulation
+        _, boundary_edges, _ = ga.build_edges(HOLE.trivtx, HOLE.NV)
+
+        # Points in the hole, near the triangulation, and far from it.
+        x = np.array([2.5, 3.5, 3, -1, 3, 7, -50, 100])
+        y = np.array([12.5, 12.5, 9, 12, 16, 12, 12, 200])
+        xcenter, ycenter = ga.triangulation.compute_centers(TG)
+        x = np.concatenate([x, xcenter])
+        y = np.concatenate([y, ycenter])
+
+        locator = ga.TriangulationLocator(TG, boundary_edges=boundary_edges)
+        triangles, distance, xproj, yproj = locator.search_nearest(x, y)
+
+        # Brute force projection on all boundary edges.
+        V = np.asarray(boundary_edges.vertices)
+        A = np.column_stack([HOLE.x[V[:,0]], HOLE.y[V[:,0]]])
+        u = np.column_stack([HOLE.x[V[:,1]], HOLE.y[V[:,1]]]) - A
+        P = np.column_stack([x[:8], y[:8]])[:,None,:]
+        t = np.clip(np.sum((P - A)*u, axis=2) / np.sum(u*u, axis=1), 0, 1)
+        d = np.linalg.norm(P - A - t[:,:,None]*u, axis=2)
+        E = d.argmin(axis=1)
+
+        np.testing.assert_allclose(distance[:8], d.min(axis=1))
+        np.testing.assert_allclose(np.hypot(xproj - x, yproj - y), distance,
+                                   atol=1e-12)
+        assert_equal(triangles[:8], np.asarray(boundary_edges.triangle)[E])
+
+        # Points inside are found as with search_points.
+        assert_equal(triangles[8:], np.arange(HOLE.NT))
+        assert_equal(distance[8:], 0)
+        assert_equal(xproj[8:], xcenter)
+
+        assert_equal(locator.search_nearest(x, y, num_threads=2)[0],
+                     triangles)
+
+        quadtree = ga.TriangulationQuadtreeLocator(
+            TG, boundary_edges=boundary_edges)
+        assert_equal(quadtree.search_nearest(x, y)[1], distance)
+
+        locator = ga.TriangulationLocator(TG)
+        with self.assertRaisesRegex(ValueError, 'boundary_edges'):
+            locator.search_nearest(x, y)
+
+    def test_hints(self):
+        """
+        Find triangle centers walking from hints
+        """
+        TG = HOLE.triangulation
+        intern_edges, _, _ = ga.build_edges(HOLE.trivtx, HOLE.NV)
+        neighbours = ga.triangulation.compute_neighbours(TG, intern_edges)
+
+        xcenter, ycenter = ga.triangulation.compute_centers(TG)
+        NP = len(xcenter)
+        expected = np.arange(NP, dtype='int32')
+
+        locator = ga.TriangulationLocator(TG, neighbours=neighbours)
+
+        # Hints are the centers triangles, their neighbours, or unknown.
+        hints_list = [
+            expected,
+            np.where(neighbours[:,0] == -1, neighbours[:,1], neighbours[:,0]),
+            np.full(NP, fill_value=-1, dtype='int32'),
+            np.roll(expected, 7),
+        ]
+        for hints in hints_list:
+            hints = np.ascontiguousarray(hints, dtype='int32')
+            triangles = locator.search_points(xcenter, ycenter, hints=hints)
+            assert_equal(triangles, expected)
+
+            triangles = locator.search_points(xcenter, ycenter, hints=hints,
+                                              num_threads=4)
+            assert_equal(triangles, expected)
+
+        # Hints may be the result array.
+        triangles = np.roll(expected, 3)
+        locator.search_points(xcenter, ycenter, triangles, hints=triangles)
+        assert_equal(triangles, expected)
+
+    def test_hints_without_neighbours(self):
+        locator = ga.TriangulationLocator(HOLE.triangulation)
+        x = np.array([1.5])
+        y = np.array([10.5])
+        hints = np.zeros(1, dtype='int32')
+        with self.assertRaisesRegex(ValueError, 'requires triangle neighbours'):
+            locator.search_points(x, y, hints=hints)
+
     def test_points_out(self):
         """
                                       E
@@ -217,5 +561,220 @@ class TestTriangulationLocator(unittest.TestCase):
 
         assert_equal(triangles, np.full(NP, fill_value=-1, dtype='int32'))
 
+    def test_query_stats(self):
+        """
+        Points of test_points_out: A and B in the hole, other points out of
+        the grid.
+        """
+        x = np.array([2.5, 3.5, 3, -1, 3, 7])
+        y = np.array([12.5, 12.5, 9, 12, 16, 12])
+
+        locator = ga.TriangulationLocator(HOLE.triangulation)
+        locator.search_points(x, y)
+        self.assertIsNone(locator.query_stats)
+
+        # All triangles of the cell are tested for A and B.
+        ntri = []
+        for I in range(2):
+            cell = locator.grid.find_cell(ga.Point2D(x[I], y[I]))
+            ntri.append(len(locator.cell_to_triangles(cell.ix, cell.iy)))
+
+        locator.collect_stats = True
+        for num_threads in [1, 2]:
+            locator.search_points(x, y, num_threads=num_threads)
+            self.assertEqual(locator.query_stats, {
+                'points': 6,
+                'tested': sum(ntri),
+                'tested_mean': sum(ntri) / 6,
+                'tested_max': max(ntri),
+                'on_edge': 0,
+                'out': 6,
+                'out_of_grid': 4,
+            })
+
+        # Triangle centers are found inside triangles.
+        xcenter, ycenter = ga.triangulation.compute_centers(
+            HOLE.triangulation)
+        locator.search_points(xcenter, ycenter)
+        stats = locator.query_stats
+        self.assertEqual(stats['points'], HOLE.NT)
+        self.assertEqual(stats['on_edge'], 0)
+        self.assertEqual(stats['out'], 0)
+        self.assertGreaterEqual(stats['tested'], HOLE.NT)
+        self.assertEqual(stats['tested_mean'], stats['tested'] / HOLE.NT)
+
+        # Some vertices are found on an edge of a triangle tested before the
+        # triangle including them.
+        locator.search_points(HOLE.x, HOLE.y)
+        stats = locator.query_stats
+        self.assertGreater(stats['on_edge'], 0)
+        self.assertEqual(stats['out'], 0)
+
+        # Walking from hints counts the same points on an edge, testing one
+        # triangle per point.
+        intern_edges, _, _ = ga.build_edges(HOLE.trivtx, HOLE.NV)
+        locator.neighbours = ga.triangulation.compute_neighbours(
+            HOLE.triangulation, intern_edges)
+        hints = np.array(locator.search_points(HOLE.x, HOLE.y))
+        for num_threads in [1, 2]:
+            locator.search_points(HOLE.x, HOLE.y, hints=hints,
+                                  num_threads=num_threads)
+            self.assertEqual(locator.query_stats['on_edge'],
+                             stats['on_edge'])
+            self.assertEqual(locator.query_stats['tested'], HOLE.NV)
+
+        locator.collect_stats = False
+        locator.search_points(x, y)
+        self.assertIsNone(locator.query_stats)
+
+    def test_num_threads(self):
+        """
+        Check that parallel search gives the same result than serial search
+        """
+
+        # Random points, plus triangle vertices and edge middles.
+        np.random.seed(0)
+        x = np.random.uniform(-1, 7, 1000)
+        y = np.random.uniform(9, 16, 1000)
+        xmiddle = 0.5*(HOLE.x[HOLE.trivtx[:,0]] + HOLE.x[HOLE.trivtx[:,1]])
+        ymiddle = 0.5*(HOLE.y[HOLE.trivtx[:,0]] + HOLE.y[HOLE.trivtx[:,1]])
+        x = np.concatenate([x, HOLE.x, xmiddle])
+        y = np.concatenate([y, HOLE.y, ymiddle])
+
+        locator = ga.TriangulationLocator(HOLE.triangulation)
+
+        expected = np.asarray(locator.search_points(x, y))
+        self.assertTrue(np.any(expected == -1))
+        self.assertTrue(np.any(expected != -1))
+
+        for num_threads in [2, 4, 0]:
+            triangles = locator.search_points(x, y, num_threads=num_threads)
+            assert_equal(triangles, expected)
+
+    def test_choose_grid_size(self):
+        """
+        Square of 10x10 cells split in 2 triangles: a grid of n*n cells has
+        2*(10/n + 1)**2 * 100 / n**2 triangles per cell.
+        """
+        x, y = np.meshgrid(np.linspace(0, 1, 11), np.linspace(0, 1, 11))
+        V = np.arange(121).reshape(11, 11)[:-1,:-1].ravel()
+        trivtx = np.vstack([np.column_stack([V, V+1, V+12]),
+                            np.column_stack([V, V+12, V+11])])
+        TG = ga.Triangulation2D(x.ravel(), y.ravel(),
+                                trivtx.astype('int32'))
+
+        self.assertEqual(ga.triangulation.choose_grid_size(TG, 0, 8),
+                         (10, 10))
+        self.assertEqual(ga.triangulation.choose_grid_size(TG, 0, 18),
+                         (5, 5))
+
+        # Triangles per cell can't be less than 2.
+        self.assertEqual(ga.triangulation.choose_grid_size(TG, 0, 1),
+                         ga.triangulation.choose_grid_size(TG, 0, 4))
+
+        # Index of 200 triangles uses more than 20*200 bytes.
+        self.assertEqual(ga.triangulation.choose_grid_size(
+            TG, 0, 8, max_index_bytes=4000), (1, 1))
+
+    def test_statistics(self):
+        grid = ga.triangulation.build_grid(HOLE.triangulation, 8, 7)
+        locator = ga.TriangulationLocator(HOLE.triangulation, grid)
+        stats = locator.statistics()
+
+        count = np.diff(locator.celltri_idx)
+        self.assertEqual((stats['nx'], stats['ny']), (8, 7))
+        self.assertEqual(stats['ncell'], 56)
+        self.assertEqual(stats['mean'], len(locator.celltri) / 56)
+        self.assertEqual(stats['max'], count.max())
+        self.assertEqual(stats['histogram'].sum(), 56)
+        self.assertEqual(stats['histogram'][0], np.sum(count == 0))
+        self.assertEqual(stats['empty_fraction'], np.sum(count == 0) / 56)
+        self.assertEqual(stats['index_bytes'],
+                         4*len(locator.celltri) + 8*57 + 16*HOLE.NT)
+
+        locator = ga.TriangulationLocator(HOLE.triangulation, grid,
+                                          packed=True)
+        self.assertEqual(locator.statistics()['index_bytes'],
+                         stats['index_bytes'] + 48*HOLE.NT)
+
+    def test_update(self):
+        """
+        Updated locator is the same as a locator built on moved vertices
+        """
+        np.random.seed(0)
+        grid = ga.triangulation.build_grid(HOLE.triangulation, 8, 7)
+
+        # Move vertices inside the triangulation a little.
+        moved = (HOLE.x > 0.5) & (HOLE.x < 5.5) & \
+                (HOLE.y > 10.5) & (HOLE.y < 14.5)
+        x = HOLE.x + moved * np.random.uniform(-0.2, 0.2, HOLE.NV)
+        y = HOLE.y + moved * np.random.uniform(-0.2, 0.2, HOLE.NV)
+
+        for overlap, packed, barycentric in [(False, False, False),
+                                             (True, False, False),
+                                             (False, True, True)]:
+            TG = ga.Triangulation2D(HOLE.x.copy(), HOLE.y.copy(),
+                                    HOLE.trivtx)
+            locator = ga.TriangulationLocator(TG, grid, overlap=overlap,
+                                              packed=packed,
+                                              barycentric=barycentric)
+
+            npatched = locator.update(x, y, moved)
+            self.assertGreater(npatched, 0)
+            assert_equal(TG.x, x)
+
+            expected = ga.TriangulationLocator(
+                ga.Triangulation2D(x, y, HOLE.trivtx), grid,
+                edge_width=locator.edge_width, overlap=overlap)
+            assert_equal(np.asarray(locator.bounds), expected.bounds)
+            assert_equal(np.asarray(locator.celltri), expected.celltri)
+            assert_equal(np.asarray(locator.celltri_idx), expected.celltri_idx)
+            self.assertEqual(locator.pruned, expected.pruned)
+            if packed:
+                assert_equal(np.asarray(locator.tricoords),
+                             ga.triangulation.compute_packed_coordinates(TG))
+            if barycentric:
+                for a, b in zip([locator.gradx, locator.grady, locator.det],
+                                ga.triangulation.compute_interpolator(TG)):
+                    assert_equal(np.asarray(a), b)
+
+            # Moving back all vertices.
+            locator.update(HOLE.x, HOLE.y)
+            expected = ga.TriangulationLocator(HOLE.triangulation, grid,
+                                               overlap=overlap)
+            assert_equal(np.asarray(locator.celltri), expected.celltri)
+            assert_equal(np.asarray(locator.celltri_idx), expected.celltri_idx)
+
+    def test_update_out_of_grid(self):
+        TG = ga.Triangulation2D(HOLE.x.copy(), HOLE.y.copy(), HOLE.trivtx)
+        locator = ga.TriangulationLocator(TG)
+        xcenter, ycenter = ga.triangulation.compute_centers(TG)
+        xcenter = np.asarray(xcenter)
+        ycenter = np.asarray(ycenter)
+
+        with self.assertRaisesRegex(ValueError, 'grid must be at distance'):
+            locator.update(HOLE.x * 2, HOLE.y)
+
+        with self.assertRaisesRegex(ValueError, 'moved vertex flags'):
+            locator.update(HOLE.x + 0.01, HOLE.y, moved=[True])
+
+        # Failed updates leave the triangulation and the locator unchanged.
+        assert_equal(np.asarray(TG.x), HOLE.x)
+        assert_equal(np.asarray(TG.y), HOLE.y)
+        self.assertEqual(TG.bounding_box.xmax, HOLE.x.max())
+        assert_equal(locator.search_points(xcenter, ycenter),
+                     np.arange(TG.NT))
+
+    def test_update_copies_coordinates(self):
+        TG = ga.Triangulation2D(HOLE.x.copy(), HOLE.y.copy(), HOLE.trivtx)
+        locator = ga.TriangulationLocator(TG)
+
+        x = HOLE.x.copy()
+        y = HOLE.y.copy()
+        locator.update(x, y)
+        x[:] = 0
+        assert_equal(np.asarray(TG.x), HOLE.x)
+
+
 if __name__ == '__main__':
     unittest.main()
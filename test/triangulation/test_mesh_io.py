@@ -0,0 +1,335 @@
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+import numpy as np
+from numpy.testing import assert_equal
+
+import geomalgo as ga
+from geomalgo.data import step
+
+# Gmsh node tags, not contiguous.
+TAGS = 10*np.arange(step.NV) + 5
+
+
+def gmsh2(binary):
+    """Return STEP as a Gmsh 2.2 file content."""
+    label = step.boundary_edge_label
+    out = [b'$MeshFormat\n2.2 %d 8\n' % binary]
+    if binary:
+        out.append(struct.pack('<i', 1) + b'\n')
+    out.append(b'$EndMeshFormat\n$Nodes\n%d\n' % step.NV)
+    for V in range(step.NV):
+        if binary:
+            out.append(struct.pack('<iddd', TAGS[V], step.x[V], step.y[V], 0))
+        else:
+            out.append(b'%d %.17g %.17g 0\n'
+                       % (TAGS[V], step.x[V], step.y[V]))
+    if binary:
+        out.append(b'\n')
+    out.append(b'$EndNodes\n$Elements\n%d\n' % (len(label) + step.NT))
+    if binary:
+        out.append(struct.pack('<3i', 1, len(label), 2))
+        for R, (V0, V1, L) in enumerate(label):
+            out.append(struct.pack('<5i', R+1, L, 7, TAGS[V0], TAGS[V1]))
+        out.append(struct.pack('<3i', 2, step.NT, 2))
+        for T, (V0, V1, V2) in enumerate(step.trivtx):
+            out.append(struct.pack('<6i', 100+T, 4, 8, TAGS[V0], TAGS[V1],
+                                   TAGS[V2]))
+        out.append(b'\n')
+    else:
+        # A point element, to check it is skipped.
+        out[-1] = b'$EndNodes\n$Elements\n%d\n' % (len(label) + step.NT + 1)
+        out.append(b'1 15 2 9 1 %d\n' % TAGS[0])
+        for R, (V0, V1, L) in enumerate(label):
+            out.append(b'%d 1 2 %d 7 %d %d\n' % (R+2, L, TAGS[V0], TAGS[V1]))
+        for T, (V0, V1, V2) in enumerate(step.trivtx):
+            out.append(b'%d 2 2 4 8 %d %d %d\n' % (100+T, TAGS[V0], TAGS[V1],
+                                                   TAGS[V2]))
+    out.append(b'$EndElements\n')
+    return b''.join(out)
+
+
+def gmsh41(binary):
+    """
+    Return STEP as a Gmsh 4.1 file content, with one curve per label, and a
+    physical tag 100+label for labels 1 and 2 only.
+    """
+    label = step.boundary_edge_label
+    labels = [1, 2, 3]
+
+    def size(*values):
+        if binary:
+            return struct.pack('<%dQ' % len(values), *values)
+        return b' '.join(b'%d' % v for v in values) + b'\n'
+
+    def ints(*values):
+        if binary:
+            return struct.pack('<%di' % len(values), *values)
+        return b' '.join(b'%d' % v for v in values) + b'\n'
+
+    def doubles(*values):
+        if binary:
+            return struct.pack('<%dd' % len(values), *values)
+        return b' '.join(b'%.17g' % v for v in values) + b'\n'
+
+    out = [b'$MeshFormat\n4.1 %d 8\n' % binary]
+    if binary:
+        out.append(struct.pack('<i', 1) + b'\n')
+    out.append(b'$EndMeshFormat\n$Entities\n')
+    out.append(size(0, len(labels), 1, 0))
+    for L in labels:
+        out.append(ints(L) + doubles(0, 0, 0, 1, 1, 0))
+        if L < 3:
+            out.append(size(1) + ints(100+L))
+        else:
+            out.append(size(0))
+        out.append(size(0))
+    out.append(ints(1) + doubles(0, 0, 0, 1, 1, 0) + size(0) + size(0))
+    if binary:
+        out.append(b'\n')
+    out.append(b'$EndEntities\n$Nodes\n')
+    # Two node blocks.
+    out.append(size(2, step.NV, TAGS.min(), TAGS.max()))
+    for block in [range(0, 3), range(3, step.NV)]:
+        out.append(ints(2, 1, 0) + size(len(block)))
+        for V in block:
+            out.append(size(TAGS[V]))
+        for V in block:
+            out.append(doubles(step.x[V], step.y[V], 0))
+    if binary:
+        out.append(b'\n')
+    out.append(b'$EndNodes\n$Elements\n')
+    out.append(size(len(labels) + 1, len(label) + step.NT, 1,
+                    100 + step.NT))
+    for L in labels:
+        rows = label[label[:,2] == L]
+        out.append(ints(1, L, 1) + size(len(rows)))
+        for R, (V0, V1, _) in enumerate(rows):
+            out.append(size(R+1, TAGS[V0], TAGS[V1]))
+    out.append(ints(2, 1, 2) + size(step.NT))
+    for T, (V0, V1, V2) in enumerate(step.trivtx):
+        out.append(size(100+T, TAGS[V0], TAGS[V1], TAGS[V2]))
+    if binary:
+        out.append(b'\n')
+    out.append(b'$EndElements\n')
+    return b''.join(out)
+
+
+# METADATA block, as written by VTK 9 after data arrays.
+METADATA = b"""METADATA
+INFORMATION 2
+NAME L2_NORM_RANGE LOCATION vtkDataArray
+DATA 2 10 12.1655
+NAME L2_NORM_FINITE_RANGE LOCATION vtkDataArray
+DATA 2 10 12.1655
+
+"""
+
+
+def vtk(binary, new_cells, polydata=False, metadata=False):
+    """Return STEP as a VTK legacy file content."""
+    label = step.boundary_edge_label
+    nline = len(label)
+    ncell = nline + step.NT
+
+    def values(dtype, a):
+        if binary:
+            return np.asarray(a, dtype=dtype).tobytes() + b'\n'
+        return b' '.join(b'%.17g' % v for v in np.asarray(a).ravel()) + b'\n'
+
+    dataset = b'POLYDATA' if polydata else b'UNSTRUCTURED_GRID'
+    out = [b'# vtk DataFile Version %s\nstep\n%s\nDATASET %s\n'
+           % (b'5.1' if new_cells else b'3.0',
+              b'BINARY' if binary else b'ASCII', dataset)]
+    points = np.column_stack([step.x, step.y, np.zeros(step.NV)])
+    out.append(b'POINTS %d float\n' % step.NV + values('>f4', points))
+    if metadata:
+        out.append(METADATA)
+
+    lines = label[:,:2]
+    if polydata:
+        groups = [(b'LINES', lines), (b'POLYGONS', step.trivtx)]
+    else:
+        groups = [(b'CELLS', [list(v) for v in lines] +
+                             [list(v) for v in step.trivtx])]
+    for name, cells in groups:
+        cells = [list(c) for c in cells]
+        size = sum(len(c) for c in cells)
+        if new_cells:
+            offsets = np.cumsum([0] + [len(c) for c in cells])
+            out.append(b'%s %d %d\n' % (name, len(cells)+1, size))
+            out.append(b'OFFSETS vtktypeint64\n' + values('>i8', offsets))
+            out.append(b'CONNECTIVITY vtktypeint64\n' +
+                       values('>i8', np.concatenate(cells)))
+            if metadata:
+                out.append(METADATA)
+        else:
+            out.append(b'%s %d %d\n' % (name, len(cells), size + len(cells)))
+            out.append(values('>i4', np.concatenate([[len(c)] + c
+                                                     for c in cells])))
+    if not polydata:
+        out.append(b'CELL_TYPES %d\n' % ncell +
+                   values('>i4', [3]*nline + [5]*step.NT))
+
+    out.append(b'POINT_DATA %d\n' % step.NV)
+    out.append(b'SCALARS height float 1\nLOOKUP_TABLE default\n' +
+               values('>f4', step.y))
+    out.append(b'CELL_DATA %d\n' % ncell)
+    out.append(b'SCALARS quality float 1\nLOOKUP_TABLE default\n' +
+               values('>f4', np.ones(ncell)))
+    out.append(b'FIELD FieldData 1\nref 1 %d int\n' % ncell +
+               values('>i4', list(label[:,2]) + [0]*step.NT))
+    if metadata:
+        out.append(METADATA)
+    return b''.join(out)
+
+
+class TestMeshIO(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, name, content):
+        filename = os.path.join(self.tmpdir, name)
+        with open(filename, 'wb') as f:
+            f.write(content)
+        return filename
+
+    def check(self, TG, label, expected_label=step.boundary_edge_label):
+        assert_equal(np.asarray(TG.x), step.x)
+        assert_equal(np.asarray(TG.y), step.y)
+        assert_equal(np.asarray(TG.trivtx), step.trivtx)
+
+        self.assertEqual(label.dtype, np.int32)
+        assert_equal(label, expected_label)
+
+        # Labels are as expected by BoundaryEdges.add_label.
+        _, boundary_edges, _ = ga.build_edges(TG.trivtx, TG.NV)
+        boundary_edges.add_label(label)
+
+    def test_gmsh2(self):
+        for binary in [False, True]:
+            filename = self.write('step.msh', gmsh2(binary))
+            TG, label = ga.read_gmsh(filename)
+            self.check(TG, label)
+
+        # Vertex coordinates are read in place.
+        self.assertFalse(np.asarray(TG.x).flags.owndata)
+
+    def test_gmsh41(self):
+        expected_label = step.boundary_edge_label.copy()
+        expected_label[:,2] += 100
+        expected_label[expected_label[:,2] == 103, 2] = 3
+        order = np.argsort(step.boundary_edge_label[:,2], kind='stable')
+        expected_label = expected_label[order]
+
+        for binary in [False, True]:
+            filename = self.write('step.msh', gmsh41(binary))
+            TG, label = ga.read_gmsh(filename)
+            self.check(TG, label, expected_label)
+
+    def test_gmsh_errors(self):
+        content = gmsh2(False).replace(b'2.2 0 8', b'3.0 0 8')
+        filename = self.write('step.msh', content)
+        with self.assertRaisesRegex(ValueError, 'Unsupported Gmsh format'):
+            ga.read_gmsh(filename)
+
+        # Element refers to a missing node.
+        content = gmsh2(False).replace(b'\n%d ' % TAGS[7], b'\n3 ', 1)
+        filename = self.write('step.msh', content)
+        with self.assertRaisesRegex(ValueError, 'unknown node 75'):
+            ga.read_gmsh(filename)
+
+        content = gmsh2(False).replace(b'\n%d ' % TAGS[7], b'\nx ', 1)
+        filename = self.write('step.msh', content)
+        with self.assertRaisesRegex(ValueError, 'line 13: expected an integer'):
+            ga.read_gmsh(filename)
+
+    def test_gmsh_binary_errors(self):
+        header = gmsh2(True).split(b'$Nodes')[0]
+
+        # Element block of 2**30 triangles with 2 tags: its size overflows
+        # int32.
+        content = header + b'$Elements\n%d\n' % 2**30 + \
+                  struct.pack('<3i', 2, 2**30, 2) + b'\n$EndElements\n'
+        filename = self.write('step.msh', content)
+        with self.assertRaisesRegex(ValueError, '%d bytes' % (24 * 2**30)):
+            ga.read_gmsh(filename)
+
+        # Memory-mapped file ending with a number, on a page boundary.
+        content = header + b'$Nodes\n'
+        content += b'0' * (4096 - len(content) - 1) + b'5'
+        filename = self.write('step.msh', content)
+        with self.assertRaisesRegex(ValueError, 'bytes of binary data'):
+            ga.read_gmsh(filename)
+
+    def test_triangle(self):
+        label = step.boundary_edge_label
+        node = ['# step mesh', '%d 2 1 1' % step.NV]
+        node += ['%d %.17g %.17g 0.5 1' % (V+1, step.x[V], step.y[V])
+                 for V in range(step.NV)]
+        ele = ['%d 3 0' % step.NT]
+        ele += ['%d %d %d %d' % (T+1, V0+1, V1+1, V2+1)
+                for T, (V0, V1, V2) in enumerate(step.trivtx)]
+        # Intern edges have marker 0.
+        edge = ['%d 1' % (len(label) + 1), '1 2 5 0']
+        edge += ['%d %d %d %d' % (R+2, V0+1, V1+1, L)
+                 for R, (V0, V1, L) in enumerate(label)]
+        for ext, lines in [('.node', node), ('.ele', ele), ('.edge', edge)]:
+            self.write('step' + ext, '\n'.join(lines).encode())
+
+        basename = os.path.join(self.tmpdir, 'step')
+        TG, label = ga.read_triangle(basename)
+        self.check(TG, label)
+
+        TG, label = ga.read_triangle(basename + '.ele')
+        self.check(TG, label)
+
+        os.remove(basename + '.edge')
+        TG, label = ga.read_triangle(basename)
+        self.assertIsNone(label)
+
+    def test_vtk(self):
+        for binary in [False, True]:
+            for new_cells in [False, True]:
+                for polydata in [False, True]:
+                    content = vtk(binary, new_cells, polydata)
+                    filename = self.write('step.vtk', content)
+
+                    TG, label = ga.read_vtk(filename, label_name='ref')
+                    self.check(TG, label)
+
+                    # First cell data array is quality.
+                    TG, label = ga.read_vtk(filename)
+                    assert_equal(label[:,2], 1)
+
+    def test_vtk_metadata(self):
+        for binary in [False, True]:
+            content = vtk(binary, new_cells=True, metadata=True)
+            filename = self.write('step.vtk', content)
+            TG, label = ga.read_vtk(filename, label_name='ref')
+            self.check(TG, label)
+
+    def test_vtk_errors(self):
+        content = vtk(False, False).replace(b'UNSTRUCTURED_GRID',
+                                            b'STRUCTURED_POINTS')
+        filename = self.write('step.vtk', content)
+        with self.assertRaisesRegex(ValueError, 'expected DATASET'):
+            ga.read_vtk(filename)
+
+        # Unknown sections are not silently skipped.
+        content = vtk(False, True).replace(b'CELL_TYPES', b'CELL_KINDS')
+        filename = self.write('step.vtk', content)
+        with self.assertRaisesRegex(ValueError, 'expected a VTK section '
+                                    "keyword, got 'CELL_KINDS'"):
+            ga.read_vtk(filename)
+
+
+if __name__ == '__main__':
+    unittest.main()
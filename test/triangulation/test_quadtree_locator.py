@@ -0,0 +1,199 @@
+import unittest
+
+import numpy as np
+from numpy.testing import assert_equal
+
+import geomalgo as ga
+
+HOLE = ga.data.hole
+
+
+def hole_points():
+    """Random points, plus triangle vertices and edge middles."""
+    np.random.seed(0)
+    x = np.random.uniform(-1, 7, 1000)
+    y = np.random.uniform(9, 16, 1000)
+    xmiddle = 0.5*(HOLE.x[HOLE.trivtx[:,0]] + HOLE.x[HOLE.trivtx[:,1]])
+    ymiddle = 0.5*(HOLE.y[HOLE.trivtx[:,0]] + HOLE.y[HOLE.trivtx[:,1]])
+    x = np.concatenate([x, HOLE.x, xmiddle])
+    y = np.concatenate([y, HOLE.y, ymiddle])
+    return x, y
+
+
+class TestTriangulationQuadtreeLocator(unittest.TestCase):
+
+    def test_tri_center(self):
+        """
+        Check that center of triangles are found in their triangles
+        """
+        xcenter, ycenter = ga.triangulation.compute_centers(HOLE.triangulation)
+        NP = len(xcenter)
+
+        for max_triangles in [1, 4, 16, 100]:
+            locator = ga.TriangulationQuadtreeLocator(
+                HOLE.triangulation, max_triangles=max_triangles)
+            triangles = locator.search_points(xcenter, ycenter)
+            assert_equal(triangles, np.arange(NP))
+
+    def test_max_triangles(self):
+        locator = ga.TriangulationQuadtreeLocator(HOLE.triangulation,
+                                                  max_triangles=8)
+        count = np.diff(locator.nodetri_idx)
+        self.assertLessEqual(count.max(), 8)
+        self.assertEqual(np.asarray(locator.nodetri_idx).dtype, np.intp)
+
+        # Only leaves have triangles.
+        node_child = np.asarray(locator.node_child)
+        assert_equal(count[node_child != -1], 0)
+
+        stats = locator.statistics()
+        self.assertEqual(stats['nnode'], len(node_child))
+        self.assertEqual(stats['ncell'], np.sum(node_child == -1))
+        self.assertLessEqual(stats['max'], 8)
+
+        # Quadtree with a single leaf.
+        locator = ga.TriangulationQuadtreeLocator(HOLE.triangulation,
+                                                  max_triangles=HOLE.NT)
+        assert_equal(np.asarray(locator.node_child), [-1])
+        assert_equal(np.asarray(locator.nodetri), np.arange(HOLE.NT))
+        self.assertEqual(locator.leaf_triangles(3, 12), set(range(HOLE.NT)))
+
+    def test_same_as_grid(self):
+        """
+        Points are found as with the grid locator
+        """
+        x, y = hole_points()
+
+        locator = ga.TriangulationLocator(HOLE.triangulation)
+        expected = np.asarray(locator.search_points(x, y))
+
+        for max_triangles in [2, 8]:
+            quadtree = ga.TriangulationQuadtreeLocator(
+                HOLE.triangulation, max_triangles=max_triangles)
+            triangles = np.asarray(quadtree.search_points(x, y))
+            assert_equal(triangles != -1, expected != -1)
+
+            # Random points are not on edges, so they are found in the same
+            # triangles.
+            assert_equal(triangles[:1000], expected[:1000])
+
+    def test_graded(self):
+        """
+        Square mesh, with x spacing from 1e-6 to 0.1
+        """
+        n = 30
+        s = np.linspace(0, 1, n+1)
+        X, Y = np.meshgrid(s**4, s)
+        x = X.ravel()
+        y = Y.ravel()
+        I, J = np.meshgrid(np.arange(n), np.arange(n))
+        V = (J*(n+1) + I).ravel()
+        trivtx = np.vstack([np.column_stack([V, V+1, V+n+2]),
+                            np.column_stack([V, V+n+2, V+n+1])])
+        TG = ga.Triangulation2D(x, y, trivtx.astype('int32'))
+
+        locator = ga.TriangulationQuadtreeLocator(TG, max_triangles=8)
+
+        xcenter, ycenter = ga.triangulation.compute_centers(TG)
+        triangles = locator.search_points(xcenter, ycenter)
+        assert_equal(triangles, np.arange(TG.NT))
+
+        self.assertLessEqual(np.diff(locator.nodetri_idx).max(), 8)
+
+    def test_hints_and_threads(self):
+        TG = HOLE.triangulation
+        intern_edges, _, _ = ga.build_edges(HOLE.trivtx, HOLE.NV)
+        neighbours = ga.triangulation.compute_neighbours(TG, intern_edges)
+        x, y = hole_points()
+
+        locator = ga.TriangulationQuadtreeLocator(TG, max_triangles=4,
+                                                  neighbours=neighbours)
+        expected = np.asarray(locator.search_points(x, y))
+
+        triangles = locator.search_points(x, y, num_threads=4)
+        assert_equal(triangles, expected)
+
+        triangles = np.asarray(locator.search_points(x, y, hints=expected))
+        assert_equal(triangles, expected)
+
+        triangles = locator.search_points(x, y, order='hilbert')
+        assert_equal(triangles, expected)
+
+        locator = ga.TriangulationQuadtreeLocator(TG, max_triangles=4,
+                                                  neighbours=neighbours,
+                                                  packed=True)
+        triangles = locator.search_points(x, y, hints=expected)
+        assert_equal(triangles, expected)
+
+        locator = ga.TriangulationQuadtreeLocator(TG, max_triangles=4,
+                                                  neighbours=neighbours,
+                                                  barycentric=True)
+        triangles = np.asarray(locator.search_points(x, y))
+        assert_equal(triangles[:1000], expected[:1000])
+        self.assertTrue(np.all(triangles[1000:] != -1))
+
+    def test_interpolator(self):
+        TG = ga.Triangulation2D(HOLE.x, HOLE.y, HOLE.trivtx)
+        locator = ga.TriangulationQuadtreeLocator(TG, max_triangles=4)
+        interpolator = ga.TriangulationInterpolator(TG, locator, TG.NT)
+
+        xcenter, ycenter = ga.triangulation.compute_centers(TG)
+        nout = interpolator.set_points(xcenter, ycenter)
+        self.assertEqual(nout, 0)
+        assert_equal(interpolator.triangles, np.arange(TG.NT))
+
+    def test_update(self):
+        TG = ga.Triangulation2D(HOLE.x.copy(), HOLE.y.copy(), HOLE.trivtx)
+        locator = ga.TriangulationQuadtreeLocator(TG, max_triangles=4)
+
+        x = HOLE.x * 2
+        y = HOLE.y + 1
+        self.assertEqual(locator.update(x, y), TG.NT)
+        self.assertGreater(locator.xmax, x.max())
+
+        xcenter, ycenter = ga.triangulation.compute_centers(TG)
+        triangles = locator.search_points(xcenter, ycenter)
+        assert_equal(triangles, np.arange(TG.NT))
+
+    def test_inherited_methods(self):
+        """
+        Methods inherited from TriangulationLocator do not use its grid.
+        """
+        TG = HOLE.triangulation
+        _, boundary_edges, _ = ga.build_edges(HOLE.trivtx, HOLE.NV)
+        x = np.array([2.5, 3.5, 3, -1, 3, 7])
+        y = np.array([12.5, 12.5, 9, 12, 16, 12])
+
+        locator = ga.TriangulationLocator(TG, boundary_edges=boundary_edges)
+        expected = locator.search_nearest(x, y)
+
+        quadtree = ga.TriangulationQuadtreeLocator(
+            TG, max_triangles=4, boundary_edges=boundary_edges)
+        for a, b in zip(quadtree.search_nearest(x, y), expected):
+            assert_equal(a, b)
+
+        quadtree.set_boundary_edges(None)
+        quadtree.set_boundary_edges(boundary_edges)
+        quadtree.index_boundary_edges()
+        assert_equal(quadtree.search_nearest(x, y)[0], expected[0])
+
+        self.assertIsNone(quadtree.grid)
+        with self.assertRaisesRegex(NotImplementedError, 'leaf_triangles'):
+            quadtree.cell_to_triangles(0, 0)
+
+    def test_points_out(self):
+        """
+        Same points as TestTriangulationLocator.test_points_out
+        """
+        x = np.array([2.5, 3.5, 3, -1, 3, 7])
+        y = np.array([12.5, 12.5, 9, 12, 16, 12])
+
+        locator = ga.TriangulationQuadtreeLocator(HOLE.triangulation,
+                                                  max_triangles=4)
+        triangles = locator.search_points(x, y)
+
+        assert_equal(triangles, np.full(6, fill_value=-1, dtype='int32'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+
+import numpy as np
+from numpy.testing import assert_equal, assert_allclose
+
+import geomalgo as ga
+
+HOLE = ga.data.hole
+
+
+def linear_function(x, y):
+    return -4*np.asarray(x) + 7*np.asarray(y) - 16
+
+
+class TestRasterize(unittest.TestCase):
+
+    def test_hole(self):
+        TG = HOLE.triangulation
+        grid = ga.Grid2D(-1, 7, 80, 9, 16, 70)
+        vertdata = linear_function(HOLE.x, HOLE.y)
+
+        image, mask = ga.rasterize(TG, grid, vertdata)
+        self.assertEqual(image.shape, (70, 80))
+        self.assertEqual(mask.dtype, bool)
+
+        # Same pixels as locating cell centers.
+        gx = np.asarray(grid.x)
+        gy = np.asarray(grid.y)
+        xcenter = 0.5*(gx[:-1] + gx[1:])
+        ycenter = 0.5*(gy[:-1] + gy[1:])
+        X, Y = np.meshgrid(xcenter, ycenter)
+        locator = ga.TriangulationLocator(TG)
+        triangles = np.asarray(locator.search_points(X.ravel(), Y.ravel()))
+        assert_equal(mask, (triangles != -1).reshape(70, 80))
+
+        assert_allclose(image[mask], linear_function(X, Y)[mask])
+        self.assertTrue(np.all(np.isnan(image[~mask])))
+
+    def test_no_crack(self):
+        """
+        Pixel centers on shared edges and vertices are found
+        """
+        x = np.array([0., 1., 1., 0., 0.5])
+        y = np.array([0., 0., 1., 1., 0.5])
+        trivtx = np.array([[0, 1, 4], [1, 2, 4], [2, 3, 4], [3, 0, 4]],
+                          dtype='int32')
+        TG = ga.Triangulation2D(x, y, trivtx)
+
+        # Cell centers are on the diagonals, and on the square boundary.
+        grid = ga.Grid2D(-0.125, 1.125, 5, -0.125, 1.125, 5)
+        image, mask = ga.rasterize(TG, grid, np.ones(5, dtype='float32'),
+                                   fill_value=0)
+        self.assertTrue(np.all(mask))
+        self.assertEqual(image.dtype, np.float32)
+        assert_allclose(image, 1)
+
+        # Grid partly out of the triangulation.
+        grid = ga.Grid2D(0.5, 2.5, 2, -1.5, 0.5, 2)
+        image, mask = ga.rasterize(TG, grid, x, fill_value=-1)
+        assert_equal(mask, [[False, False], [True, False]])
+        assert_allclose(image, [[-1, -1], [1, -1]])
+
+        with self.assertRaisesRegex(ValueError, 'Expected 5 vertex values'):
+            ga.rasterize(TG, grid, x[:4])
+
+
+if __name__ == '__main__':
+    unittest.main()
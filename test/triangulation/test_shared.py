@@ -0,0 +1,111 @@
+import multiprocessing
+import unittest
+
+import numpy as np
+from numpy.testing import assert_equal
+
+import geomalgo as ga
+from geomalgo.data import hole
+
+
+def hole_points():
+    np.random.seed(0)
+    x = np.random.uniform(-1, 7, 500)
+    y = np.random.uniform(9, 16, 500)
+    return x, y
+
+
+def interpolate_in_worker(args):
+    """Load shared data by name, and interpolate vertex data."""
+    name, vertdata = args
+    shared = ga.load_shared(name)
+    interpolator = shared['point_interpolator']
+    pointdata = np.empty(interpolator.NP)
+    interpolator.interpolate(vertdata, pointdata, fill_value=0)
+    return pointdata
+
+
+class TestShared(unittest.TestCase):
+
+    def setUp(self):
+        self.TG = ga.Triangulation2D(hole.x, hole.y, hole.trivtx)
+        self.edges = ga.build_edges(hole.trivtx, hole.NV)
+        intern_edges, boundary_edges, edge_map = self.edges
+        self.neighbours = ga.triangulation.compute_neighbours(self.TG,
+                                                              intern_edges)
+        self.locator = ga.TriangulationLocator(self.TG,
+                                               neighbours=self.neighbours)
+        self.x, self.y = hole_points()
+        self.interpolator = ga.TriangulationInterpolator(
+            self.TG, self.locator, len(self.x))
+        self.interpolator.set_points(self.x, self.y)
+
+        self.shm = ga.save_shared(self.TG, edges=self.edges,
+                                  point_interpolator=self.interpolator)
+
+    def tearDown(self):
+        self.shm.close()
+        self.shm.unlink()
+
+    def test_load(self):
+        shared = ga.load_shared(self.shm.name)
+        self.assertEqual(set(shared), {'triangulation', 'edges',
+                                       'interpolator', 'locator',
+                                       'point_interpolator'})
+
+        TG = shared['triangulation']
+        assert_equal(np.asarray(TG.x), hole.x)
+        assert_equal(np.asarray(TG.y), hole.y)
+        assert_equal(np.asarray(TG.trivtx), hole.trivtx)
+
+        intern_edges, boundary_edges, edge_map = shared['edges']
+        assert_equal(np.asarray(intern_edges.vertices),
+                     np.asarray(self.edges[0].vertices))
+
+        locator = shared['locator']
+        self.assertIs(locator.TG, TG)
+        assert_equal(np.asarray(locator.search_points(self.x, self.y)),
+                     np.asarray(self.locator.search_points(self.x, self.y)))
+
+        interpolator = shared['point_interpolator']
+        assert_equal(np.asarray(interpolator.triangles),
+                     np.asarray(self.interpolator.triangles))
+        vertdata = hole.x + 2*hole.y
+        expected = np.empty(len(self.x))
+        self.interpolator.interpolate(vertdata, expected, fill_value=0)
+        pointdata = np.empty(len(self.x))
+        interpolator.interpolate(vertdata, pointdata, fill_value=0)
+        assert_equal(pointdata, expected)
+
+    def test_copy_on_write(self):
+        """
+        Modifying arrays of a process does not modify the shared block.
+        """
+        shared = ga.load_shared(self.shm.name)
+        if 'shared_memory' in shared:
+            self.skipTest('shared memory is not a file')
+        np.asarray(shared['triangulation'].x)[:] = 0
+
+        shared = ga.load_shared(self.shm.name)
+        assert_equal(np.asarray(shared['triangulation'].x), hole.x)
+
+    def test_workers(self):
+        vertdata = hole.x + 2*hole.y
+        expected = np.empty(len(self.x))
+        self.interpolator.interpolate(vertdata, expected, fill_value=0)
+
+        with multiprocessing.get_context('spawn').Pool(2) as pool:
+            results = pool.map(interpolate_in_worker,
+                               [(self.shm.name, vertdata)]*2)
+
+        for pointdata in results:
+            assert_equal(pointdata, expected)
+
+    def test_errors(self):
+        with self.assertRaisesRegex(ValueError, 'locator differs'):
+            ga.save_shared(self.TG, locator=ga.TriangulationLocator(self.TG),
+                           point_interpolator=self.interpolator)
+
+
+if __name__ == '__main__':
+    unittest.main()
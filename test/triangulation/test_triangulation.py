@@ -32,6 +32,99 @@ class TestTriangulation(unittest.TestCase):
         TG = ga.Triangulation2D(STEP.x, STEP.y, STEP.trivtx)
         x, y, trivtx = TG.to_numpy()
 
+    def test_derived(self):
+        TG = ga.Triangulation2D(STEP.x.copy(), STEP.y.copy(), STEP.trivtx)
+        self.assertEqual(TG.derived, {})
+
+        bb = TG.bounding_box
+        self.assertIs(TG.bounding_box, bb)
+        self.assertEqual((bb.xmin, bb.xmax, bb.ymin, bb.ymax),
+                         (STEP.x.min(), STEP.x.max(),
+                          STEP.y.min(), STEP.y.max()))
+        self.assertEqual(TG.edge_min_max,
+                         ga.triangulation.compute_edge_min_max(TG))
+        np.testing.assert_equal(TG.signed_area,
+                                ga.triangulation.compute_signed_area(TG))
+        np.testing.assert_equal(TG.centers,
+                                ga.triangulation.compute_centers(TG))
+        np.testing.assert_equal(TG.interpolator,
+                                ga.triangulation.compute_interpolator(TG))
+
+        # Locator and interpolator share the cached arrays.
+        locator = ga.TriangulationLocator(TG, barycentric=True)
+        interpolator = ga.TriangulationInterpolator(TG, locator, 1)
+        self.assertIs(interpolator.gradx.base, TG.interpolator[0])
+
+        # Moving vertices forgets derived geometry.
+        ga.triangulation.util.set_coordinates(TG, STEP.x + 1, STEP.y)
+        self.assertEqual(TG.derived, {})
+        self.assertEqual(TG.bounding_box.xmin, STEP.x.min() + 1)
+
+        TG.signed_area
+        TG.invalidate()
+        self.assertEqual(TG.derived, {})
+
+    def test_vertex_adjacency(self):
+        # Vertex 1 has 4 neighbours, 0 and 2 have 3, 3 and 4 have 2.
+        trivtx = np.array([[0, 1, 2], [1, 0, 3], [2, 1, 4]], dtype='int32')
+        adj_idx, adj = ga.triangulation.compute_vertex_adjacency(trivtx, 5)
+        np.testing.assert_equal(adj_idx, [0, 3, 7, 10, 12, 14])
+        np.testing.assert_equal(adj, [3, 2, 1,
+                                      3, 4, 0, 2,
+                                      4, 0, 1,
+                                      0, 1,
+                                      2, 1])
+
+    def test_reorder(self):
+        # Square mesh, with vertices and triangles shuffled.
+        n = 20
+        s = np.linspace(0, 1, n+1)
+        X, Y = np.meshgrid(s, s)
+        I, J = np.meshgrid(np.arange(n), np.arange(n))
+        V = (J*(n+1) + I).ravel()
+        trivtx = np.vstack([np.column_stack([V, V+1, V+n+2]),
+                            np.column_stack([V, V+n+2, V+n+1])])
+        np.random.seed(0)
+        vshuffle = np.random.permutation(len(X.ravel()))
+        tshuffle = np.random.permutation(len(trivtx))
+        inverse = np.argsort(vshuffle)
+        TG = ga.Triangulation2D(X.ravel()[vshuffle], Y.ravel()[vshuffle],
+                                inverse[trivtx[tshuffle]].astype('int32'))
+        x, y, trivtx = TG.to_numpy()
+
+        def spread(trivtx, reduce=np.mean):
+            return reduce(np.ptp(trivtx, axis=1))
+
+        for method in ['hilbert', 'rcm']:
+            TG2, vperm, vinv, tperm, tinv = TG.reorder(method)
+            self.assertEqual((TG2.NV, TG2.NT), (TG.NV, TG.NT))
+
+            np.testing.assert_equal(TG2.x, x[vperm])
+            np.testing.assert_equal(TG2.y, y[vperm])
+            np.testing.assert_equal(TG2.trivtx, vinv[trivtx[tperm]])
+            np.testing.assert_equal(vperm[vinv], np.arange(TG.NV))
+            np.testing.assert_equal(tperm[tinv], np.arange(TG.NT))
+
+            # Triangle data is remapped, and orientation is kept.
+            area = ga.triangulation.compute_signed_area(TG)
+            area2 = ga.triangulation.compute_signed_area(TG2)
+            np.testing.assert_allclose(area2, area[tperm])
+            np.testing.assert_allclose(area2[tinv], area)
+
+            self.assertLess(spread(TG2.trivtx), spread(trivtx) / 5)
+
+        # RCM of a structured mesh has a bandwidth of about a row.
+        TG2 = TG.reorder('rcm')[0]
+        self.assertLessEqual(spread(TG2.trivtx, np.max), 2*(n+2))
+
+        # Isolated vertices are numbered last.
+        trivtx = np.array([[0, 1, 2]], dtype='int32')
+        np.testing.assert_equal(
+            ga.triangulation.compute_rcm_order(trivtx, 4), [2, 1, 0, 3])
+
+        with self.assertRaisesRegex(ValueError, "method must be"):
+            TG.reorder('random')
+
     def test_to_matplotlib(self):
         TG = ga.Triangulation2D(STEP.x, STEP.y, STEP.trivtx)
         tri = TG.to_matplotlib()
@@ -1,7 +1,7 @@
 import unittest
 from math import sqrt
 
-from numpy.testing import assert_allclose
+from numpy.testing import assert_allclose, assert_equal
 
 import geomalgo as ga
 
@@ -50,6 +50,19 @@ class TestUtil(unittest.TestCase):
         self.assertAlmostEqual(edge_min, 1)
         self.assertAlmostEqual(edge_max, sqrt(3.25))
 
+    def test_compute_neighbours(self):
+        TG = ga.Triangulation2D(STEP.x, STEP.y, STEP.trivtx)
+        intern_edges, _, _ = ga.build_edges(STEP.trivtx, STEP.NV)
+
+        neighbours = ga.triangulation.compute_neighbours(TG, intern_edges)
+
+        assert_equal(neighbours, [[-1,  2, -1],
+                                  [-1,  3,  2],
+                                  [ 1,  4,  0],
+                                  [-1, -1,  1],
+                                  [ 2,  5, -1],
+                                  [-1, -1,  4]])
+
 
 if __name__ == '__main__':
     unittest.main()